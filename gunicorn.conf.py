@@ -0,0 +1,52 @@
+"""gunicorn settings, read from the working directory: run `gunicorn`.
+
+GUNICORN_WORKER_CLASS
+    gthread (default): train_station.wsgi, GUNICORN_THREADS threads
+    per worker. uvicorn: train_station.asgi on uvicorn workers, for
+    the async endpoints.
+GUNICORN_WORKERS
+    fixed number of workers, sized from the CPUs and memory (see
+    train_station.workers) by default, at most GUNICORN_MAX_WORKERS,
+    GUNICORN_WORKER_MEMORY_MB each.
+GUNICORN_BIND, GUNICORN_TIMEOUT
+    address to listen on and seconds a request may take.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from train_station import workers as sizing  # noqa: E402
+
+os.environ.setdefault(
+    "DJANGO_SETTINGS_MODULE", "train_station.settings.production"
+)
+
+asynchronous = os.environ.get("GUNICORN_WORKER_CLASS") == "uvicorn"
+if asynchronous:
+    wsgi_app = "train_station.asgi:application"
+    worker_class = "uvicorn.workers.UvicornWorker"
+    # async requests may end on another thread than the one holding
+    # the connection, which would then never be closed
+    os.environ.setdefault("CONN_MAX_AGE", "0")
+else:
+    wsgi_app = "train_station.wsgi:application"
+    worker_class = "gthread"
+    threads = int(os.environ.get("GUNICORN_THREADS", 4))
+
+workers = int(os.environ.get("GUNICORN_WORKERS", 0)) or sizing.worker_count(
+    sizing.cpu_count(),
+    sizing.memory_bytes(),
+    int(os.environ.get("GUNICORN_WORKER_MEMORY_MB", 256)) << 20,
+    asynchronous=asynchronous,
+    max_workers=int(os.environ.get("GUNICORN_MAX_WORKERS", 0)) or None,
+)
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = timeout
+keepalive = 5
+# recycle workers now and then, staggered, so slow leaks never pile up
+max_requests = 1000
+max_requests_jitter = 100
+accesslog = "-"
@@ -8,7 +8,8 @@ from .models import (
     Station,
     Route,
     Crew,
-    Order
+    Order,
+    SeatHold
 )
 
 
@@ -20,3 +21,4 @@ admin.site.register(Station)
 admin.site.register(Route)
 admin.site.register(Crew)
 admin.site.register(Order)
+admin.site.register(SeatHold)
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class TrainConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "train"
+
+    def ready(self):
+        import train.signals  # noqa: F401
+        from train import metrics
+
+        metrics.instrument_serializers()
@@ -0,0 +1,187 @@
+"""Async read endpoints for the ASGI server.
+
+Under uvicorn workers (see README) a request waiting on the database,
+the cache or a slow client only holds a coroutine, not a thread, so one
+worker keeps many mobile clients open. The authentication, permission
+and throttle policies are the ones of the sync viewsets.
+
+Django 4.0 has async cache methods but no async queryset API yet: the
+queries run through sync_to_async, which is what the async ORM of later
+Django versions does as well. Only they do, the views build and
+serialize the payloads on the event loop.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import get_object_or_404
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+from rest_framework import mixins
+from rest_framework.generics import GenericAPIView
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from train import metrics
+from train.cache import CachedReadMixin
+from train.coroutines import markcoroutinefunction
+from train.models import Station, Trip
+from train.permissions import IsAdminOrIfAuthenticatedReadOnly
+from train.readers import RowListMixin
+from train.renderers import SeatMapBinaryRenderer
+from train.seats import SeatMap
+from train.serializers import (
+    StationSerializer,
+    TripListOrRetrieveSerializer,
+    TripSeatMapSerializer
+)
+from train.views import StationViewSet, TripViewSet
+
+
+class AsyncAPIView(GenericAPIView):
+    """APIView whose handlers are coroutines.
+
+    Django runs it on the event loop under ASGI (and in a loop of its
+    own under WSGI), the sync DRF policies run through sync_to_async.
+    """
+
+    permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # view() returns the dispatch coroutine, Django 4.0 only awaits
+        # it when marked (4.1 does it itself for async views)
+        return markcoroutinefunction(view)
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            handler = getattr(
+                self, request.method.lower(), self.http_method_not_allowed
+            )
+            if not asyncio.iscoroutinefunction(handler):
+                # OPTIONS and the 405 of APIView
+                handler = sync_to_async(handler)
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(
+            request, response, *args, **kwargs
+        )
+        return self.response
+
+
+class AsyncTripListView(RowListMixin, AsyncAPIView):
+    queryset = TripViewSet.queryset
+    serializer_class = TripListOrRetrieveSerializer
+    row_reader = TripViewSet.row_reader
+
+    def get_queryset(self):
+        return TripViewSet.filter_by_days(
+            super().get_queryset(), self.request.query_params
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "departure_time",
+                type=str,
+                description="Filter by departure_time. "
+                            "Example: ?departure_time=2000-12-1"
+            ),
+            OpenApiParameter(
+                "arrival_time",
+                type=str,
+                description="Filter by arrival_time. "
+                            "Example: ?arrival_time=2000-12-1"
+            )
+        ]
+    )
+    async def get(self, request, *args, **kwargs):
+        """Same as /trips/, served by an async view"""
+        queryset = self.row_queryset(
+            self.filter_queryset(self.get_queryset())
+        )
+        page = await sync_to_async(self.paginate_queryset)(queryset)
+        rows = await sync_to_async(list)(queryset) if page is None else page
+        related = await sync_to_async(self.row_reader.related)(rows)
+        with metrics.serializing():
+            data = self.row_reader.represent(rows, related)
+
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+
+class AsyncTripSeatsView(AsyncAPIView):
+    queryset = Trip.objects.select_related("train")
+    serializer_class = TripSeatMapSerializer
+    renderer_classes = (
+        api_settings.DEFAULT_RENDERER_CLASSES + [SeatMapBinaryRenderer]
+    )
+
+    @extend_schema(
+        responses={
+            200: TripSeatMapSerializer,
+            (200, SeatMapBinaryRenderer.media_type): OpenApiTypes.BINARY,
+        }
+    )
+    async def get(self, request, pk):
+        """Same as /trips/<id>/seats/, served by an async view"""
+        trip = await sync_to_async(get_object_or_404)(self.queryset, pk=pk)
+        seat_map = await sync_to_async(SeatMap.for_trip)(trip)
+        return TripViewSet.seat_map_response(request, seat_map)
+
+
+class AsyncStationListView(
+    CachedReadMixin,
+    mixins.ListModelMixin,
+    AsyncAPIView
+):
+    queryset = Station.objects.all()
+    serializer_class = StationSerializer
+    cache_models = StationViewSet.cache_models
+    basename = "async-station"
+    action = "list"
+
+    def get_queryset(self):
+        name = self.request.query_params.get("name")
+        queryset = super().get_queryset()
+
+        if name:
+            queryset = queryset.filter(name__icontains=name)
+
+        return queryset
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "name",
+                type=str,
+                description="Filter by name. Example: ?name=qwe"
+            )
+        ]
+    )
+    async def get(self, request, *args, **kwargs):
+        """Same as /stations/, served from the cache by an async view"""
+        return await self.acached_response(self.alist, request)
+
+    async def alist(self, request):
+        """ListModelMixin.list with the queries through sync_to_async"""
+        queryset = self.filter_queryset(self.get_queryset())
+        page = await sync_to_async(self.paginate_queryset)(queryset)
+        stations = (
+            await sync_to_async(list)(queryset) if page is None else page
+        )
+        data = self.get_serializer(stations, many=True).data
+
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
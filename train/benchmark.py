@@ -0,0 +1,488 @@
+"""Benchmark of the browsing and booking hot paths of the API.
+
+seed() fills the database with a realistic timetable: at scale 1.0
+2000 stations, 100k trips and 2M tickets, written with bulk_create.
+run() then calls the viewsets the way the router does (without the
+throttles, which would stop a benchmark after 30 requests) and reports
+the query count and latency percentiles of every case as a dict ready
+to be dumped as JSON. compare() diffs two such reports. Both report
+their progress to log, the train.benchmark logger unless given.
+
+Seeding writes a lot of rows, run it against a disposable database.
+"""
+import logging
+import platform
+import random
+import time
+from datetime import datetime, timedelta
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from train import geo
+from train.models import (
+    CargoOccupancy,
+    Crew,
+    Order,
+    Route,
+    Station,
+    TableVersion,
+    Ticket,
+    Train,
+    TrainType,
+    Trip
+)
+from train.views import OrderViewSet, TicketViewSet, TripViewSet
+
+logger = logging.getLogger("train.benchmark")
+
+BENCH_EMAIL = "bench{}@bench.local"
+
+SIZES = {
+    "stations": 2000,
+    "train_types": 5,
+    "trains": 500,
+    "routes": 10000,
+    "crews": 1000,
+    "users": 1000,
+    "trips": 100000,
+    "tickets": 2000000,
+}
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def scaled_sizes(scale):
+    return {
+        name: max(2, int(size * scale)) for name, size in SIZES.items()
+    }
+
+
+def _bulk_create(model, objects, batch_size):
+    """bulk_create that also fills the primary keys on backends which
+    do not return them (nothing else writes while seeding)
+    """
+    created = model.objects.bulk_create(objects, batch_size=batch_size)
+    if created and created[0].pk is None:
+        ids = model.objects.order_by("-id").values_list(
+            "id", flat=True
+        )[:len(created)]
+        for obj, pk in zip(created, reversed(ids)):
+            obj.pk = pk
+    return created
+
+
+def seed(scale=1.0, batch_size=5000, random_seed=0, log=logger.info):
+    """Fill the database, returns the number of rows of every table"""
+    sizes = scaled_sizes(scale)
+    rng = random.Random(random_seed)
+    start = timezone.make_aware(datetime(2030, 1, 1))
+
+    with transaction.atomic():
+        stations = []
+        for number in range(sizes["stations"]):
+            latitude = rng.uniform(44.5, 52)
+            longitude = rng.uniform(22.5, 40)
+            stations.append(Station(
+                name=f"Station {number}",
+                latitude=latitude,
+                longitude=longitude,
+                geohash=geo.encode(latitude, longitude),
+            ))
+        station_ids = [
+            station.pk
+            for station in _bulk_create(Station, stations, batch_size)
+        ]
+
+        train_types = _bulk_create(
+            TrainType,
+            [
+                TrainType(name=f"Type {number}")
+                for number in range(sizes["train_types"])
+            ],
+            batch_size,
+        )
+        trains = _bulk_create(
+            Train,
+            [
+                Train(
+                    name=f"Train {number}",
+                    cargo_num=rng.randint(8, 20),
+                    places_in_cargo=rng.choice((36, 54, 64, 80)),
+                    train_type=rng.choice(train_types),
+                )
+                for number in range(sizes["trains"])
+            ],
+            batch_size,
+        )
+
+        pairs = set()
+        while len(pairs) < min(
+                sizes["routes"], len(station_ids) * (len(station_ids) - 1)
+        ):
+            source, destination = rng.sample(station_ids, 2)
+            pairs.add((source, destination))
+        routes = _bulk_create(
+            Route,
+            [
+                Route(
+                    source_id=source,
+                    destination_id=destination,
+                    distance=rng.randint(20, 1200),
+                )
+                for source, destination in sorted(pairs)
+            ],
+            batch_size,
+        )
+
+        crew_ids = [
+            crew.pk
+            for crew in _bulk_create(
+                Crew,
+                [
+                    Crew(first_name=f"First{number}", last_name="Bench")
+                    for number in range(sizes["crews"])
+                ],
+                batch_size,
+            )
+        ]
+
+        password = make_password("bench")
+        user_model = get_user_model()
+        user_ids = [
+            user.pk
+            for user in _bulk_create(
+                user_model,
+                [
+                    user_model(
+                        email=BENCH_EMAIL.format(number), password=password
+                    )
+                    for number in range(sizes["users"])
+                ],
+                batch_size,
+            )
+        ]
+        log(
+            f"seeded {len(station_ids)} stations, {len(routes)} routes, "
+            f"{len(trains)} trains, {len(user_ids)} users"
+        )
+
+        tickets_per_trip = sizes["tickets"] / sizes["trips"]
+        seconds = 90 * 24 * 3600
+        created_tickets = 0
+        for first in range(0, sizes["trips"], batch_size):
+            count = min(batch_size, sizes["trips"] - first)
+            trips = []
+            sold = []
+            for _ in range(count):
+                train = rng.choice(trains)
+                departure_time = start + timedelta(
+                    seconds=rng.randrange(seconds)
+                )
+                sold_count = min(
+                    train.capacity,
+                    int(rng.uniform(0, 2 * tickets_per_trip)),
+                )
+                trips.append(Trip(
+                    route=rng.choice(routes),
+                    train=train,
+                    departure_time=departure_time,
+                    arrival_time=departure_time + timedelta(
+                        minutes=rng.randint(30, 720)
+                    ),
+                    sold_count=sold_count,
+                ))
+                sold.append(sold_count)
+            trips = _bulk_create(Trip, trips, batch_size)
+
+            trip_crew = Trip.crews.through
+            trip_crew.objects.bulk_create(
+                [
+                    trip_crew(trip_id=trip.pk, crew_id=crew_id)
+                    for trip in trips
+                    for crew_id in rng.sample(crew_ids, 2)
+                ],
+                batch_size=batch_size,
+            )
+
+            # seats are sold from the front of the train, in orders
+            # of one to four tickets
+            seats = []
+            occupancy = []
+            for trip, sold_count in zip(trips, sold):
+                places = trip.train.places_in_cargo
+                seats.extend(
+                    (trip.pk, index // places + 1, index % places + 1)
+                    for index in range(sold_count)
+                )
+                occupancy.extend(
+                    CargoOccupancy(
+                        trip_id=trip.pk,
+                        cargo=cargo,
+                        sold=min(places, sold_count - (cargo - 1) * places),
+                    )
+                    for cargo in range(1, -(-sold_count // places) + 1)
+                )
+            CargoOccupancy.objects.bulk_create(
+                occupancy, batch_size=batch_size
+            )
+            orders = []
+            order_sizes = []
+            taken = 0
+            while taken < len(seats):
+                order_sizes.append(min(rng.randint(1, 4), len(seats) - taken))
+                taken += order_sizes[-1]
+                orders.append(Order(user_id=rng.choice(user_ids)))
+            orders = _bulk_create(Order, orders, batch_size)
+
+            tickets = []
+            seat_iter = iter(seats)
+            for order, size in zip(orders, order_sizes):
+                for _ in range(size):
+                    trip_id, cargo, seat = next(seat_iter)
+                    tickets.append(Ticket(
+                        trip_id=trip_id, cargo=cargo, seat=seat, order=order
+                    ))
+            Ticket.objects.bulk_create(tickets, batch_size=batch_size)
+            created_tickets += len(tickets)
+            log(f"seeded {first + count} trips, {created_tickets} tickets")
+
+        TableVersion.bump(Station, TrainType, Train, Route, Trip)
+
+    return table_sizes()
+
+
+def table_sizes():
+    return {
+        model._meta.model_name: model.objects.count()
+        for model in (Station, Route, Train, Trip, Order, Ticket)
+    }
+
+
+def _percentile(ordered, percent):
+    """Nearest-rank percentile of a sorted list"""
+    rank = max(1, -(-percent * len(ordered) // 100))
+    return ordered[rank - 1]
+
+
+def _summary(timings):
+    ordered = sorted(timings)
+    summary = {
+        f"p{percent}": round(_percentile(ordered, percent) * 1000, 3)
+        for percent in PERCENTILES
+    }
+    summary["min"] = round(ordered[0] * 1000, 3)
+    summary["max"] = round(ordered[-1] * 1000, 3)
+    summary["mean"] = round(sum(ordered) / len(ordered) * 1000, 3)
+    return summary
+
+
+def _server_name():
+    """A host the settings allow, pagination builds absolute links"""
+    for host in settings.ALLOWED_HOSTS:
+        if host != "*":
+            return host.lstrip(".")
+    return "localhost"
+
+
+class Case:
+    """One benchmarked request, built fresh for every iteration"""
+
+    def __init__(self, name, viewset, actions, method, path, data=None,
+                 user=None, cleanup=None):
+        self.name = name
+        self.view = viewset.as_view(actions, throttle_classes=())
+        self.method = method
+        self.path = path
+        self.data = data
+        self.user = user
+        self.cleanup = cleanup
+
+    def request(self):
+        factory = APIRequestFactory(SERVER_NAME=_server_name())
+        request = getattr(factory, self.method)(
+            self.path, self.data, format="json"
+        )
+        force_authenticate(request, self.user)
+        return request
+
+    def call(self):
+        response = self.view(self.request())
+        response.render()
+        if response.status_code >= 400:
+            raise AssertionError(
+                f"{self.name}: HTTP {response.status_code} "
+                f"{response.content[:500]!r}"
+            )
+        return response
+
+    def undo(self, response):
+        """Revert the writes of the request, so it can be repeated"""
+        if self.cleanup:
+            self.cleanup(response)
+
+
+def _delete_order(response):
+    Order.objects.filter(pk=response.data["id"]).delete()
+
+
+def cases(order_sizes=(1, 10, 50), random_seed=0):
+    rng = random.Random(random_seed)
+    user_model = get_user_model()
+    user_id = Order.objects.values_list("user_id", flat=True).first()
+    user = (
+        user_model.objects.filter(pk=user_id).first()
+        or user_model.objects.order_by("id").first()
+    )
+    if user is None:
+        raise ValueError("Nothing to benchmark, seed the database first")
+
+    trip_ids = list(Trip.objects.values_list("id", flat=True)[:1000])
+    day = timezone.localtime(
+        Trip.objects.order_by("departure_time").values_list(
+            "departure_time", flat=True
+        ).first()
+    ).date()
+
+    benchmarks = [
+        Case(
+            "trip_list",
+            TripViewSet, {"get": "list"}, "get",
+            "/api/train/trips/", {"limit": 20}, user,
+        ),
+        Case(
+            "trip_list_deep_offset",
+            TripViewSet, {"get": "list"}, "get",
+            "/api/train/trips/",
+            {"limit": 20, "offset": len(trip_ids) // 2},
+            user,
+        ),
+        Case(
+            "trip_list_cursor",
+            TripViewSet, {"get": "list"}, "get",
+            "/api/train/trips/", {"pagination": "cursor"}, user,
+        ),
+        Case(
+            "trip_list_by_departure_day",
+            TripViewSet, {"get": "list"}, "get",
+            "/api/train/trips/",
+            {"limit": 20, "departure_time": day.isoformat()},
+            user,
+        ),
+        Case(
+            "ticket_list_by_trips",
+            TicketViewSet, {"get": "list"}, "get",
+            "/api/train/tickets/",
+            {
+                "limit": 50,
+                "trips": ",".join(
+                    str(trip_id)
+                    for trip_id in rng.sample(trip_ids, min(10, len(trip_ids)))
+                ),
+            },
+            user,
+        ),
+        Case(
+            "order_list",
+            OrderViewSet, {"get": "list"}, "get",
+            "/api/train/orders/", None, user,
+        ),
+    ]
+
+    for size in order_sizes:
+        trip = Trip.objects.select_related("train").with_tickets_available(
+        ).filter(tickets_available__gte=size).order_by("id").first()
+        if trip is None:
+            continue
+        # seats are sold from the front, book the last free ones
+        capacity = trip.train.capacity
+        places = trip.train.places_in_cargo
+        tickets = [
+            {
+                "trip": trip.pk,
+                "cargo": index // places + 1,
+                "seat": index % places + 1,
+            }
+            for index in range(capacity - size, capacity)
+        ]
+        benchmarks.append(Case(
+            f"order_create_{size}_tickets",
+            OrderViewSet, {"post": "create"}, "post",
+            "/api/train/orders/", {"tickets": tickets}, user,
+            cleanup=_delete_order,
+        ))
+
+    return benchmarks
+
+
+def run(iterations=30, warmup=3, order_sizes=(1, 10, 50), only=None,
+        log=logger.info):
+    """{"meta": ..., "results": {case: {"queries": n, "latency_ms": ...}}}"""
+    results = {}
+    for case in cases(order_sizes):
+        if only and case.name not in only:
+            continue
+
+        for _ in range(warmup):
+            case.undo(case.call())
+
+        # counted apart, capturing the queries slows them down
+        with CaptureQueriesContext(connection) as queries:
+            response = case.call()
+        case.undo(response)
+
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            response = case.call()
+            timings.append(time.perf_counter() - started)
+            case.undo(response)
+
+        results[case.name] = {
+            "queries": len(queries),
+            "iterations": iterations,
+            "latency_ms": _summary(timings),
+        }
+        log(
+            f"{case.name}: {len(queries)} queries, "
+            f"p50 {results[case.name]['latency_ms']['p50']} ms"
+        )
+
+    return {
+        "meta": {
+            "created_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "django": django.get_version(),
+            "python": platform.python_version(),
+            "rows": table_sizes(),
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, report, tolerance=0.2):
+    """Regressions of report against baseline: more queries, or a p50
+    more than tolerance slower
+    """
+    regressions = []
+    for name, result in report["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        if result["queries"] > before["queries"]:
+            regressions.append(
+                f"{name}: {before['queries']} -> {result['queries']} queries"
+            )
+        p50_before = before["latency_ms"]["p50"]
+        p50 = result["latency_ms"]["p50"]
+        if p50 > p50_before * (1 + tolerance):
+            regressions.append(
+                f"{name}: p50 {p50_before} -> {p50} ms"
+            )
+    return regressions
@@ -0,0 +1,118 @@
+"""Read-through cache of the serialized reference data.
+
+Cached payloads are keyed by the version of every model they are built
+from, its TableVersion row. A transaction writing to one of these
+models bumps that row on commit (see train.signals), which orphans all
+the payloads built from the old data: nothing has to be found and
+deleted, and any cache backend works. The versions are read from the
+database, so a write served by one worker expires the payloads cached
+by every other worker, even when each has its own LocMemCache. The key
+doubles as ETag, so a client revalidating with If-None-Match gets its
+304 for that one query.
+"""
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from train.models import TableVersion
+
+
+def model_versions(models):
+    """The TableVersion of each of models, in one query"""
+    versions = TableVersion.current(*models)
+    return [str(versions[model]) for model in models]
+
+
+def model_version(model):
+    return model_versions([model])[0]
+
+
+class CachedReadMixin:
+    """Caches the list and retrieve responses of a read-mostly viewset.
+
+    cache_models lists every model the serialized payload is built from.
+    """
+
+    cache_models = ()
+
+    def cache_key(self, request):
+        return self._cache_key(request, model_versions(self.cache_models))
+
+    async def acache_key(self, request):
+        return self._cache_key(
+            request, await sync_to_async(model_versions)(self.cache_models)
+        )
+
+    def _cache_key(self, request, versions):
+        versions = ".".join(versions)
+        digest = hashlib.md5(
+            "|".join(
+                (
+                    versions,
+                    # pagination links are absolute
+                    request.build_absolute_uri(),
+                    request.accepted_renderer.format,
+                )
+            ).encode()
+        ).hexdigest()
+        key = f"refdata:{self.basename}:{self.action}:{digest}"
+        return key, f'"{digest}"'
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        key, etag = self.cache_key(request)
+        if etag in parse_etags(request.META.get("HTTP_IF_NONE_MATCH", "")):
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED,
+                headers={"ETag": etag}
+            )
+
+        data = cache.get(key)
+        if data is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            cache.set(key, response.data, settings.REFERENCE_CACHE_TIMEOUT)
+        else:
+            response = Response(data)
+
+        response["ETag"] = etag
+        return response
+
+    async def acached_response(self, handler, request, *args, **kwargs):
+        """cached_response for async views, handler is a coroutine
+        function"""
+        key, etag = await self.acache_key(request)
+        if etag in parse_etags(request.META.get("HTTP_IF_NONE_MATCH", "")):
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED,
+                headers={"ETag": etag}
+            )
+
+        data = await cache.aget(key)
+        if data is None:
+            response = await handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            await cache.aset(
+                key, response.data, settings.REFERENCE_CACHE_TIMEOUT
+            )
+        else:
+            response = Response(data)
+
+        response["ETag"] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            super(CachedReadMixin, self).list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super(CachedReadMixin, self).retrieve, request, *args, **kwargs
+        )
@@ -0,0 +1,19 @@
+"""Marking of callables that return a coroutine.
+
+Django 4.0 and our async-capable middlewares tell async callables apart
+with asyncio.iscoroutinefunction. An object whose __call__ returns a
+coroutine (a view function, a middleware instance) has to be marked for
+it to say so: with inspect.markcoroutinefunction from Python 3.12 on,
+with the private marker of asyncio before (what asgiref does as well).
+"""
+import asyncio
+import inspect
+import sys
+
+
+def markcoroutinefunction(func):
+    """Marks func as returning a coroutine, returns func"""
+    if sys.version_info >= (3, 12):
+        return inspect.markcoroutinefunction(func)
+    func._is_coroutine = asyncio.coroutines._is_coroutine
+    return func
@@ -0,0 +1,8 @@
+"""SQLite with pooled connections, see train.db.pool"""
+from django.db.backends.sqlite3 import base
+
+from train.db.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    pass
@@ -0,0 +1,310 @@
+"""Process-wide pool of database connections.
+
+Django opens a connection per thread and, with CONN_MAX_AGE = 0,
+closes it at the end of every request. With the pooled backends
+(train.db.backends.postgresql, and sqlite3 for tests and development)
+opening takes an idle connection from the pool of the worker process
+and closing gives it back, so a request no longer pays for the
+connection setup.
+
+The pool keeps at least MIN_SIZE connections open and never more than
+MAX_SIZE. A thread finding all of them in use waits up to TIMEOUT
+seconds, then fails with PoolTimeout. A connection idle for more than
+CHECK_AFTER seconds is checked with a SELECT 1 before being handed
+out, one idle for more than MAX_IDLE is closed (down to MIN_SIZE).
+stats() reports how often and how long threads waited.
+"""
+import threading
+import time
+from collections import deque
+
+from django.db.utils import OperationalError
+
+DEFAULTS = {
+    "MIN_SIZE": 1,
+    "MAX_SIZE": 10,
+    "TIMEOUT": 5.0,
+    "CHECK_AFTER": 30.0,
+    "MAX_IDLE": 600.0,
+}
+
+
+class PoolTimeout(OperationalError):
+    """No connection got free within the pool timeout"""
+
+
+def check_connection(connection):
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+    finally:
+        cursor.close()
+
+
+def reset_connection(connection):
+    """Ends whatever transaction a request left open"""
+    connection.rollback()
+
+
+class ConnectionPool:
+    def __init__(
+            self,
+            name,
+            min_size=DEFAULTS["MIN_SIZE"],
+            max_size=DEFAULTS["MAX_SIZE"],
+            timeout=DEFAULTS["TIMEOUT"],
+            check_after=DEFAULTS["CHECK_AFTER"],
+            max_idle=DEFAULTS["MAX_IDLE"],
+            check=check_connection,
+            reset=reset_connection,
+            clock=time.monotonic,
+    ):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError(
+                f"Pool {name}: need 0 <= MIN_SIZE <= MAX_SIZE, MAX_SIZE >= 1"
+            )
+        self.name = name
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_after = check_after
+        self.max_idle = max_idle
+        self._check = check
+        self._reset = reset
+        self._clock = clock
+
+        self._lock = threading.Condition()
+        # (connection, returned at), the most recently returned last
+        self._idle = deque()
+        # open connections, idle or in use, and the ones being opened
+        self._size = 0
+        self._waiting = 0
+        self._closed = False
+
+        self._requests = 0
+        self._connects = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait_time = 0.0
+        self._timeouts = 0
+        self._failed_checks = 0
+
+    def _reserve(self):
+        """An idle connection with its idle time, or (None, None) once a
+        slot for a new one is reserved; waits while the pool is full"""
+        waited_since = None
+        with self._lock:
+            try:
+                while True:
+                    if self._idle:
+                        connection, returned_at = self._idle.pop()
+                        return connection, self._clock() - returned_at
+                    if self._size < self.max_size:
+                        self._size += 1
+                        return None, None
+
+                    now = self._clock()
+                    if waited_since is None:
+                        waited_since = now
+                        self._waits += 1
+                    remaining = self.timeout - (now - waited_since)
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(
+                            f"Pool {self.name}: all {self.max_size} "
+                            f"connections in use for {self.timeout}s"
+                        )
+                    self._waiting += 1
+                    try:
+                        self._lock.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+            finally:
+                if waited_since is not None:
+                    waited = self._clock() - waited_since
+                    self._wait_time += waited
+                    self._max_wait_time = max(self._max_wait_time, waited)
+
+    def acquire(self, connect):
+        """A connection of the pool, new ones are opened with connect()"""
+        with self._lock:
+            self._requests += 1
+
+        while True:
+            connection, idle_for = self._reserve()
+            if connection is None:
+                return self._open(connect)
+            if idle_for < self.check_after or self._usable(connection):
+                return connection
+            self._discard(connection)
+
+    def fill(self, connect):
+        """Opens connections until MIN_SIZE are, returns how many"""
+        opened = 0
+        while True:
+            with self._lock:
+                if self._closed or self._size >= self.min_size:
+                    return opened
+                self._size += 1
+            connection = self._open(connect)
+            self.release(connection)
+            opened += 1
+
+    def _open(self, connect):
+        # outside the lock, connecting may take a while
+        try:
+            connection = connect()
+        except BaseException:
+            with self._lock:
+                self._size -= 1
+                self._lock.notify()
+            raise
+        with self._lock:
+            self._connects += 1
+        return connection
+
+    def _usable(self, connection):
+        try:
+            self._check(connection)
+        except Exception:
+            with self._lock:
+                self._failed_checks += 1
+            return False
+        return True
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._size -= 1
+            self._lock.notify()
+
+    def release(self, connection, check=False):
+        """Give a connection back, check it first if it raised errors"""
+        try:
+            self._reset(connection)
+        except Exception:
+            self._discard(connection)
+            return
+        if self._closed or check and not self._usable(connection):
+            self._discard(connection)
+            return
+
+        expired = []
+        with self._lock:
+            now = self._clock()
+            self._idle.append((connection, now))
+            while (
+                    self._size - len(expired) > self.min_size
+                    and now - self._idle[0][1] > self.max_idle
+            ):
+                expired.append(self._idle.popleft()[0])
+            self._lock.notify()
+        for connection in expired:
+            self._discard(connection)
+
+    def close(self):
+        """Closes the idle connections, the ones in use are closed when
+        they are given back"""
+        with self._lock:
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+            self._closed = True
+        for connection in idle:
+            self._discard(connection)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "waiting": self._waiting,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "requests": self._requests,
+                "connects": self._connects,
+                "waits": self._waits,
+                "wait_seconds_total": round(self._wait_time, 6),
+                "wait_seconds_max": round(self._max_wait_time, 6),
+                "timeouts": self._timeouts,
+                "failed_checks": self._failed_checks,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, database, key, options):
+    """The pool of this process for one set of connection parameters"""
+    with _pools_lock:
+        pool = _pools.get((alias, key))
+        if pool is None:
+            options = {**DEFAULTS, **options}
+            pool = _pools[(alias, key)] = ConnectionPool(
+                f"{alias}:{database}",
+                min_size=options["MIN_SIZE"],
+                max_size=options["MAX_SIZE"],
+                timeout=options["TIMEOUT"],
+                check_after=options["CHECK_AFTER"],
+                max_idle=options["MAX_IDLE"],
+            )
+        return pool
+
+
+def close_pools(alias=None):
+    """Closes the pools of a database alias (or all), their connections
+    in use are closed when given back"""
+    with _pools_lock:
+        pools = [
+            (key, pool) for key, pool in _pools.items()
+            if alias is None or key[0] == alias
+        ]
+        for key, _ in pools:
+            del _pools[key]
+    for _, pool in pools:
+        pool.close()
+
+
+def pool_stats():
+    """{pool name: stats} of the pools of this process"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.name: pool.stats() for pool in pools}
+
+
+class PooledDatabaseWrapperMixin:
+    """Mixed into a DatabaseWrapper: connections come from the pool of
+    their parameters, settings_dict["POOL"] configures it."""
+
+    def _pool(self, conn_params):
+        return get_pool(
+            self.alias,
+            conn_params.get("database", self.settings_dict["NAME"]),
+            repr(sorted(conn_params.items())),
+            self.settings_dict.get("POOL", {}),
+        )
+
+    def get_new_connection(self, conn_params):
+        pool = self._pool(conn_params)
+        self._connection_pool = pool
+
+        def connect():
+            return super(PooledDatabaseWrapperMixin, self).get_new_connection(
+                conn_params
+            )
+
+        connection = pool.acquire(connect)
+        pool.fill(connect)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self._connection_pool.release(
+                    self.connection, check=self.errors_occurred
+                )
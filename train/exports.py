@@ -0,0 +1,114 @@
+"""Flat CSV / NDJSON exports of tickets and orders for reconciliation.
+
+Rows are read as values_list() tuples through a server-side cursor
+(QuerySet.iterator) and turned into lines one at a time, so memory
+stays flat however large the export is.
+"""
+import csv
+import json
+from datetime import datetime, timedelta
+
+from django.db.models import Count
+from django.utils import timezone
+
+from train.models import Order, Ticket
+
+CONTENT_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+EXPORTS = {
+    "tickets": (
+        lambda: Ticket.objects.order_by("order__created_at", "id"),
+        "order__created_at",
+        (
+            ("ticket_id", "id"),
+            ("order_id", "order_id"),
+            ("ordered_at", "order__created_at"),
+            ("user_email", "order__user__email"),
+            ("trip_id", "trip_id"),
+            ("source", "trip__route__source__name"),
+            ("destination", "trip__route__destination__name"),
+            ("train", "trip__train__name"),
+            ("departure_time", "trip__departure_time"),
+            ("arrival_time", "trip__arrival_time"),
+            ("cargo", "cargo"),
+            ("seat", "seat"),
+        ),
+    ),
+    "orders": (
+        lambda: Order.objects.annotate(
+            tickets_count=Count("tickets")
+        ).order_by("created_at", "id"),
+        "created_at",
+        (
+            ("order_id", "id"),
+            ("created_at", "created_at"),
+            ("user_email", "user__email"),
+            ("tickets", "tickets_count"),
+        ),
+    ),
+}
+
+
+def export_rows(kind, date_from=None, date_to=None, chunk_size=2000):
+    """(header, rows) of an export, date_to is inclusive"""
+    get_queryset, date_field, columns = EXPORTS[kind]
+    queryset = get_queryset()
+
+    if date_from:
+        queryset = queryset.filter(
+            **{f"{date_field}__gte": _start_of_day(date_from)}
+        )
+    if date_to:
+        day_after = date_to + timedelta(days=1)
+        queryset = queryset.filter(
+            **{f"{date_field}__lt": _start_of_day(day_after)}
+        )
+
+    header = [name for name, field in columns]
+    rows = queryset.values_list(
+        *(field for name, field in columns)
+    ).iterator(chunk_size=chunk_size)
+    return header, rows
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def _value(value):
+    if isinstance(value, datetime):
+        return timezone.localtime(value).isoformat()
+    return value
+
+
+class _Echo:
+    """File-like object handing back what csv.writer writes"""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(header, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow([_value(value) for value in row])
+
+
+def ndjson_lines(header, rows):
+    for row in rows:
+        yield json.dumps(
+            dict(zip(header, (_value(value) for value in row))),
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ) + "\n"
+
+
+def export_lines(kind, output, **filters):
+    header, rows = export_rows(kind, **filters)
+    if output == "ndjson":
+        return ndjson_lines(header, rows)
+    return csv_lines(header, rows)
@@ -0,0 +1,92 @@
+"""Geohash helpers backing the nearby-station search.
+
+A geohash prefix is a lat/lon cell, so the stations of a cell are an
+indexed ``geohash LIKE 'prefix%'`` range scan. A circle of radius r is
+covered by the 3x3 block of the cells around its center, at the finest
+precision whose cells are still at least r wide and high.
+"""
+import math
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+MAX_PRECISION = 12
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def encode(latitude, longitude, precision=MAX_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    geohash = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(geohash) < precision:
+        value, value_range = (
+            (longitude, lon_range) if even else (latitude, lat_range)
+        )
+        middle = (value_range[0] + value_range[1]) / 2
+        if value >= middle:
+            bits = bits * 2 + 1
+            value_range[0] = middle
+        else:
+            bits *= 2
+            value_range[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(geohash)
+
+
+def cell_size(precision):
+    """(height, width) of a geohash cell in degrees"""
+    lat_bits = 5 * precision // 2
+    lon_bits = 5 * precision - lat_bits
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    half_chord = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(half_chord))
+
+
+def covering_cells(latitude, longitude, radius_km):
+    """Geohash prefixes whose union covers the circle.
+
+    An empty set means the circle is too large (or too close to a pole)
+    to be covered by 3x3 cells, the caller should scan everything.
+    """
+    farthest_latitude = min(90.0, abs(latitude) + radius_km / KM_PER_DEGREE)
+    parallel_km = KM_PER_DEGREE * math.cos(math.radians(farthest_latitude))
+
+    precision = 0
+    for candidate in range(1, MAX_PRECISION + 1):
+        height, width = cell_size(candidate)
+        if (
+            height * KM_PER_DEGREE < radius_km
+            or width * parallel_km < radius_km
+        ):
+            break
+        precision = candidate
+
+    if not precision:
+        return set()
+
+    height, width = cell_size(precision)
+    cells = set()
+    for lat_step in (-1, 0, 1):
+        cell_latitude = latitude + lat_step * height
+        if not -90 <= cell_latitude <= 90:
+            continue
+        for lon_step in (-1, 0, 1):
+            cell_longitude = (
+                (longitude + lon_step * width + 180) % 360 - 180
+            )
+            cells.add(encode(cell_latitude, cell_longitude, precision))
+    return cells
@@ -0,0 +1,248 @@
+"""GTFS feed of the timetable, rebuilt incrementally.
+
+Every text file of the feed is generated into GTFS_ROOT/parts from a
+server-side cursor, row by row, and the parts are then streamed into
+GTFS_ROOT/gtfs.zip. manifest.json remembers the TableVersion of the
+source tables of each part: a build only regenerates the parts whose
+sources changed since, and leaves the zip alone if none did.
+
+Every Trip is a GTFS trip with two stop times, the source and the
+destination of its route, on the service day of its local departure
+date. trains.txt is not part of GTFS, it describes the trains for
+import_timetable and is ignored by other consumers.
+"""
+import csv
+import json
+import os
+import shutil
+import zipfile
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from train.models import (
+    Route,
+    Station,
+    TableVersion,
+    Train,
+    TrainType,
+    Trip
+)
+
+FEED_NAME = "gtfs.zip"
+MANIFEST_NAME = "manifest.json"
+RAIL_ROUTE_TYPE = 2
+
+
+def feed_path(root=None):
+    return os.path.join(root or settings.GTFS_ROOT, FEED_NAME)
+
+
+def _service_day(departure_time):
+    """Service date of a trip and its local midnight"""
+    day = timezone.localtime(departure_time).date()
+    return day, timezone.make_aware(
+        datetime.combine(day, datetime.min.time())
+    )
+
+
+def _gtfs_time(elapsed):
+    """HH:MM:SS since the service day midnight, may be past 24:00:00"""
+    minutes, seconds = divmod(int(elapsed.total_seconds()), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+def agency_rows(chunk_size):
+    agency = settings.GTFS_AGENCY
+    yield ["agency_id", "agency_name", "agency_url", "agency_timezone"]
+    yield [
+        agency["agency_id"],
+        agency["agency_name"],
+        agency["agency_url"],
+        settings.TIME_ZONE,
+    ]
+
+
+def stops_rows(chunk_size):
+    yield ["stop_id", "stop_name", "stop_lat", "stop_lon"]
+    yield from Station.objects.order_by("id").values_list(
+        "id", "name", "latitude", "longitude"
+    ).iterator(chunk_size=chunk_size)
+
+
+def routes_rows(chunk_size):
+    agency_id = settings.GTFS_AGENCY["agency_id"]
+    yield [
+        "route_id",
+        "agency_id",
+        "route_short_name",
+        "route_long_name",
+        "route_type",
+    ]
+    for route_id, source, destination in Route.objects.order_by(
+            "id"
+    ).values_list(
+        "id", "source__name", "destination__name"
+    ).iterator(chunk_size=chunk_size):
+        yield [
+            route_id,
+            agency_id,
+            "",
+            f"{source} - {destination}",
+            RAIL_ROUTE_TYPE,
+        ]
+
+
+def trains_rows(chunk_size):
+    yield ["train_name", "train_type", "cargo_num", "places_in_cargo"]
+    yield from Train.objects.order_by("id").values_list(
+        "name", "train_type__name", "cargo_num", "places_in_cargo"
+    ).iterator(chunk_size=chunk_size)
+
+
+def trips_rows(chunk_size):
+    yield ["route_id", "service_id", "trip_id", "trip_short_name"]
+    for trip_id, route_id, train, departure_time in Trip.objects.order_by(
+            "id"
+    ).values_list(
+        "id", "route_id", "train__name", "departure_time"
+    ).iterator(chunk_size=chunk_size):
+        day, _ = _service_day(departure_time)
+        yield [route_id, day.strftime("%Y%m%d"), trip_id, train]
+
+
+def stop_times_rows(chunk_size):
+    yield [
+        "trip_id",
+        "arrival_time",
+        "departure_time",
+        "stop_id",
+        "stop_sequence",
+        "shape_dist_traveled",
+    ]
+    for (
+            trip_id,
+            departure_time,
+            arrival_time,
+            source_id,
+            destination_id,
+            distance,
+    ) in Trip.objects.order_by("id").values_list(
+        "id",
+        "departure_time",
+        "arrival_time",
+        "route__source_id",
+        "route__destination_id",
+        "route__distance",
+    ).iterator(chunk_size=chunk_size):
+        _, midnight = _service_day(departure_time)
+        departure = _gtfs_time(departure_time - midnight)
+        arrival = _gtfs_time(arrival_time - midnight)
+        yield [trip_id, departure, departure, source_id, 1, 0]
+        yield [trip_id, arrival, arrival, destination_id, 2, distance]
+
+
+def calendar_dates_rows(chunk_size):
+    yield ["service_id", "date", "exception_type"]
+    days = Trip.objects.annotate(
+        day=TruncDate(
+            "departure_time", tzinfo=timezone.get_current_timezone()
+        )
+    ).order_by("day").values_list("day", flat=True).distinct()
+    for day in days.iterator(chunk_size=chunk_size):
+        service_id = day.strftime("%Y%m%d")
+        yield [service_id, service_id, 1]
+
+
+FILES = (
+    ("agency.txt", (), agency_rows),
+    ("stops.txt", (Station,), stops_rows),
+    ("routes.txt", (Route, Station), routes_rows),
+    ("trains.txt", (Train, TrainType), trains_rows),
+    ("trips.txt", (Trip, Train), trips_rows),
+    ("stop_times.txt", (Trip, Route), stop_times_rows),
+    ("calendar_dates.txt", (Trip,), calendar_dates_rows),
+)
+
+
+def _read_manifest(root):
+    try:
+        with open(os.path.join(root, MANIFEST_NAME)) as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_atomically(path, write, mode="w"):
+    """Readers of path only ever see a complete file"""
+    tmp = f"{path}.tmp"
+    kwargs = {"newline": "", "encoding": "utf-8"} if mode == "w" else {}
+    with open(tmp, mode, **kwargs) as tmp_file:
+        write(tmp_file)
+    os.replace(tmp, path)
+
+
+def _write_zip(path, parts):
+    def write(zip_file):
+        with zipfile.ZipFile(zip_file, "w", zipfile.ZIP_DEFLATED) as archive:
+            for name, part in parts:
+                with open(part, "rb") as source, archive.open(
+                        name, "w"
+                ) as target:
+                    shutil.copyfileobj(source, target, 1 << 20)
+
+    _write_atomically(path, write, mode="wb")
+
+
+def build_feed(root=None, force=False, chunk_size=2000):
+    """Bring the feed up to date, returns the names of the rebuilt files"""
+    root = root or settings.GTFS_ROOT
+    parts_dir = os.path.join(root, "parts")
+    os.makedirs(parts_dir, exist_ok=True)
+
+    manifest = _read_manifest(root)
+    # read before the data, a write racing with the build only makes
+    # the next build regenerate its files once more
+    versions = TableVersion.current(
+        *{model for _, sources, _ in FILES for model in sources}
+    )
+    feed_settings = [settings.TIME_ZONE, settings.GTFS_AGENCY]
+
+    rebuilt = []
+    parts = []
+    for name, sources, rows in FILES:
+        part = os.path.join(parts_dir, name)
+        parts.append((name, part))
+        fingerprint = {
+            "sources": {
+                model._meta.label: versions[model] for model in sources
+            },
+            "settings": feed_settings,
+        }
+        if (
+            not force
+            and manifest.get(name) == fingerprint
+            and os.path.exists(part)
+        ):
+            continue
+
+        _write_atomically(
+            part,
+            lambda part_file: csv.writer(part_file).writerows(
+                rows(chunk_size)
+            ),
+        )
+        manifest[name] = fingerprint
+        rebuilt.append(name)
+
+    feed = feed_path(root)
+    if rebuilt or not os.path.exists(feed):
+        _write_zip(feed, parts)
+    _write_atomically(
+        os.path.join(root, MANIFEST_NAME),
+        lambda manifest_file: json.dump(manifest, manifest_file, indent=2),
+    )
+    return rebuilt
@@ -0,0 +1,69 @@
+"""Health checks of a worker, for load balancers and orchestrators.
+
+A live worker answers at all. A ready worker also reaches the database
+and the cache; it is taken out of rotation while it does not. Why a
+check failed is logged to "train.health", not answered.
+"""
+import logging
+import uuid
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+logger = logging.getLogger("train.health")
+
+
+class HealthCheckError(Exception):
+    pass
+
+
+def check_database(alias=DEFAULT_DB_ALIAS):
+    connection = connections[alias]
+    connection.ensure_connection()
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+        if cursor.fetchone() != (1,):
+            raise HealthCheckError("SELECT 1 did not return 1")
+
+
+def check_cache():
+    key = f"health:{uuid.uuid4().hex}"
+    cache.set(key, 1, 10)
+    try:
+        if cache.get(key) != 1:
+            raise HealthCheckError("a value just set was not read back")
+    finally:
+        cache.delete(key)
+
+
+def check_migrations(alias=DEFAULT_DB_ALIAS):
+    executor = MigrationExecutor(connections[alias])
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    if plan:
+        raise HealthCheckError(
+            f"{len(plan)} unapplied migration(s), the first is "
+            f"{plan[0][0].app_label}.{plan[0][0].name}"
+        )
+
+
+CHECKS = (
+    ("database", check_database),
+    ("cache", check_cache),
+)
+
+
+def run_checks():
+    """{check name: "ok" or "failed"}, and whether all passed"""
+    results = {}
+    healthy = True
+    for name, check in CHECKS:
+        try:
+            check()
+        except Exception:
+            logger.exception("%s health check failed", name)
+            results[name] = "failed"
+            healthy = False
+        else:
+            results[name] = "ok"
+    return results, healthy
@@ -0,0 +1,221 @@
+"""Journey planning over the timetable with the Connection Scan Algorithm.
+
+Every Trip is a timetabled connection source -> destination of its
+route. The connections are kept in memory sorted by departure, built
+once per process and patched on Trip/Route writes (see train.signals).
+Writes made by other processes are picked up by a full reload once the
+index is older than JOURNEY_INDEX_MAX_AGE seconds.
+"""
+import bisect
+import math
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+from train.models import Route, Trip
+
+Connection = namedtuple(
+    "Connection",
+    ["departure", "arrival", "source", "destination", "trip_id"]
+)
+
+Itinerary = namedtuple("Itinerary", ["departure", "arrival", "trip_ids"])
+
+
+class ConnectionIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connections = None
+        self._routes = {}
+        self._trips = {}
+        self._loaded_at = 0.0
+
+    def _load(self):
+        routes = Route.objects.values_list(
+            "id", "source_id", "destination_id"
+        )
+        self._routes = {
+            route_id: (source_id, destination_id)
+            for route_id, source_id, destination_id in routes
+        }
+        self._trips = {}
+        connections = []
+        for trip in Trip.objects.values_list(
+                "id", "route_id", "departure_time", "arrival_time"
+        ).iterator(chunk_size=10000):
+            connection = self._connection(*trip)
+            self._trips[connection.trip_id] = connection
+            connections.append(connection)
+        connections.sort()
+        self._connections = connections
+        self._loaded_at = time.monotonic()
+
+    def _connection(self, trip_id, route_id, departure_time, arrival_time):
+        source_id, destination_id = self._routes[route_id]
+        return Connection(
+            departure_time.timestamp(),
+            arrival_time.timestamp(),
+            source_id,
+            destination_id,
+            trip_id,
+        )
+
+    def connections(self):
+        with self._lock:
+            if (
+                self._connections is None
+                or time.monotonic() - self._loaded_at
+                > settings.JOURNEY_INDEX_MAX_AGE
+            ):
+                self._load()
+            return self._connections
+
+    def invalidate(self):
+        with self._lock:
+            self._connections = None
+
+    def update_trip(self, trip_id):
+        with self._lock:
+            if self._connections is None:
+                return
+
+            trip = Trip.objects.filter(pk=trip_id).values_list(
+                "id", "route_id", "departure_time", "arrival_time"
+            ).first()
+            # copy on write: searches keep scanning the list they started on
+            connections = list(self._connections)
+            self._discard(connections, trip_id)
+            if trip is not None:
+                if trip[1] not in self._routes:
+                    self._connections = None
+                    return
+                connection = self._connection(*trip)
+                bisect.insort(connections, connection)
+                self._trips[trip_id] = connection
+            self._connections = connections
+
+    def remove_trip(self, trip_id):
+        with self._lock:
+            if self._connections is None:
+                return
+
+            connections = list(self._connections)
+            self._discard(connections, trip_id)
+            self._connections = connections
+
+    def _discard(self, connections, trip_id):
+        connection = self._trips.pop(trip_id, None)
+        if connection is not None:
+            position = bisect.bisect_left(connections, connection)
+            if (
+                position < len(connections)
+                and connections[position] == connection
+            ):
+                del connections[position]
+
+    def search(
+            self,
+            source_id,
+            destination_id,
+            departure,
+            min_connection=0,
+            max_legs=4,
+            max_duration=math.inf
+    ):
+        """Find journeys leaving source_id at departure or later.
+
+        Returns (earliest_arrival, fewest_transfers) Itinerary pair,
+        both None if destination_id is unreachable with max_legs trips
+        arriving within max_duration seconds of departure. Changing
+        trains takes at least min_connection seconds.
+
+        A round scans the connections departing between the earliest
+        arrival improved by the previous round and the arrival cutoff,
+        rounds stop once none improves an arrival.
+        """
+        connections = self.connections()
+        deadline = departure + max_duration
+        start = bisect.bisect_left(connections, (departure,))
+        stop = bisect.bisect_left(connections, (deadline,))
+        # rounds[k] holds the earliest arrivals with at most k + 1 trips
+        # and the connection that improved each of them in that round
+        rounds = []
+        previous = {source_id: departure}
+
+        for _ in range(max_legs):
+            current = dict(previous)
+            improved = {}
+            for position in range(start, stop):
+                connection = connections[position]
+                if connection.departure >= current.get(
+                        destination_id, math.inf
+                ):
+                    break
+
+                source = connection.source
+                ready = previous.get(source)
+                if ready is None:
+                    continue
+                if source != source_id:
+                    ready += min_connection
+                if (
+                    connection.departure >= ready
+                    and connection.arrival <= deadline
+                    and connection.arrival < current.get(
+                        connection.destination, math.inf
+                    )
+                ):
+                    current[connection.destination] = connection.arrival
+                    improved[connection.destination] = connection
+
+            rounds.append((current, improved))
+            if not improved:
+                break
+            previous = current
+            # the next round only adds connections from the stations this
+            # one improved, leaving once they are reached
+            start = bisect.bisect_left(
+                connections,
+                (min(connection.arrival for connection in improved.values()),),
+                start,
+                stop
+            )
+
+        reached = [
+            legs for legs, (arrivals, improved) in enumerate(rounds)
+            if destination_id in arrivals
+        ]
+        if not reached:
+            return None, None
+
+        earliest = rounds[-1][0][destination_id]
+        fastest = next(
+            legs for legs in reached
+            if rounds[legs][0][destination_id] == earliest
+        )
+        return (
+            self._itinerary(rounds, fastest, source_id, destination_id),
+            self._itinerary(rounds, reached[0], source_id, destination_id),
+        )
+
+    @staticmethod
+    def _itinerary(rounds, legs, source_id, destination_id):
+        trip_ids = []
+        arrival = rounds[legs][0][destination_id]
+        station = destination_id
+        departure = None
+        while station != source_id:
+            improved = rounds[legs][1]
+            if station in improved:
+                connection = improved[station]
+                trip_ids.append(connection.trip_id)
+                departure = connection.departure
+                station = connection.source
+            legs -= 1
+        trip_ids.reverse()
+        return Itinerary(departure, arrival, trip_ids)
+
+
+journey_index = ConnectionIndex()
@@ -0,0 +1,104 @@
+import json
+
+from django.core.management import BaseCommand, CommandError
+
+from train import benchmark
+
+
+class Command(BaseCommand):
+    """Django command that benchmarks the hot API paths"""
+    help = (  # noqa: VNE003
+        "Seed a realistic data volume (--seed, writes millions of rows: "
+        "use a disposable database) and report query counts and latency "
+        "percentiles of the trip, ticket and order endpoints as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed",
+            action="store_true",
+            help="Seed the database before the run",
+        )
+        parser.add_argument(
+            "--seed-only",
+            action="store_true",
+            help="Seed the database and exit",
+        )
+        parser.add_argument(
+            "--scale",
+            type=float,
+            default=1.0,
+            help="1.0 seeds 2000 stations, 100k trips and 2M tickets",
+        )
+        parser.add_argument("--iterations", type=int, default=30)
+        parser.add_argument("--warmup", type=int, default=3)
+        parser.add_argument(
+            "--order-sizes",
+            default="1,10,50",
+            help="Ticket counts of the benchmarked order creations",
+        )
+        parser.add_argument(
+            "--case",
+            action="append",
+            dest="cases",
+            help="Only run this case (repeatable)",
+        )
+        parser.add_argument(
+            "--output",
+            help="Write the JSON report to this file instead of stdout",
+        )
+        parser.add_argument(
+            "--baseline",
+            help="JSON report to compare with, fails on regressions",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.2,
+            help="Allowed p50 slowdown against the baseline (0.2 = 20%%)",
+        )
+
+    def log(self, message):
+        # stdout is the JSON report when there is no --output
+        self.stderr.write(message)
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        if options["seed"] or options["seed_only"]:
+            rows = benchmark.seed(options["scale"], log=self.log)
+            self.log(f"database rows: {rows}")
+            if options["seed_only"]:
+                return
+
+        try:
+            report = benchmark.run(
+                iterations=options["iterations"],
+                warmup=options["warmup"],
+                order_sizes=[
+                    int(size)
+                    for size in options["order_sizes"].split(",")
+                    if size
+                ],
+                only=options["cases"],
+                log=self.log,
+            )
+        except ValueError as error:
+            raise CommandError(error)
+
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(report, file, indent=2)
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
+
+        if options["baseline"]:
+            with open(options["baseline"]) as file:
+                baseline = json.load(file)
+            regressions = benchmark.compare(
+                baseline, report, options["tolerance"]
+            )
+            if regressions:
+                raise CommandError(
+                    "Regressions against the baseline:\n"
+                    + "\n".join(regressions)
+                )
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management import BaseCommand
+
+from train import gtfs
+
+
+class Command(BaseCommand):
+    """Django command that builds the GTFS feed of the timetable"""
+    help = (  # noqa: VNE003
+        "Build the GTFS zip served at /api/train/gtfs.zip, regenerating "
+        "only the files whose source tables changed since the last build."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Regenerate every file",
+        )
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        start = time.perf_counter()
+        rebuilt = gtfs.build_feed(
+            force=options["force"], chunk_size=options["chunk_size"]
+        )
+        elapsed = time.perf_counter() - start
+
+        if rebuilt:
+            self.stdout.write(self.style.SUCCESS(
+                f"Rebuilt {', '.join(rebuilt)} in {elapsed:.2f}s"
+            ))
+        else:
+            self.stdout.write("GTFS feed is up to date")
@@ -0,0 +1,147 @@
+from datetime import date, datetime, timedelta
+
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from train.models import Crew, Order, Station, Train, TrainType, Trip
+
+
+class RolledBack(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    """Django command that prints the query plans of the API filters"""
+    help = (  # noqa: VNE003
+        "EXPLAIN the queries behind the list filters of the train API, "
+        "before (no index / __date casts) and after the index plan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--analyze",
+            action="store_true",
+            help="Run EXPLAIN ANALYZE (PostgreSQL only), shows real timings",
+        )
+        parser.add_argument(
+            "--date",
+            type=date.fromisoformat,
+            default=date.today(),
+            help="Day used for the departure/arrival filters",
+        )
+        parser.add_argument(
+            "--search",
+            default="ki",
+            help="Text used for the name filters",
+        )
+        parser.add_argument(
+            "--without-indexes",
+            action="store_true",
+            help="Also explain each query with its indexes dropped, inside "
+                 "a transaction that is rolled back (PostgreSQL only). "
+                 "Takes exclusive table locks: do not run against a live "
+                 "database.",
+        )
+
+    def cases(self, day, search):
+        start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+        end = start + timedelta(days=1)
+        user_id = Order.objects.values_list("user_id", flat=True).first()
+        trips = Trip.objects.with_tickets_available()
+
+        return [
+            (
+                "trips ?departure_time= (__date cast)",
+                trips.filter(departure_time__date=day),
+                [],
+            ),
+            (
+                "trips ?departure_time= (range)",
+                trips.filter(
+                    departure_time__gte=start, departure_time__lt=end
+                ),
+                ["trip_departure_time_idx"],
+            ),
+            (
+                "trips ?arrival_time= (__date cast)",
+                trips.filter(arrival_time__date=day),
+                [],
+            ),
+            (
+                "trips ?arrival_time= (range)",
+                trips.filter(arrival_time__gte=start, arrival_time__lt=end),
+                ["trip_arrival_time_idx"],
+            ),
+            (
+                "orders of a user, newest first",
+                Order.objects.filter(user_id=user_id)[:10],
+                ["order_user_created_at_idx"],
+            ),
+            (
+                "stations ?name=",
+                Station.objects.filter(name__icontains=search),
+                ["station_name_trgm_idx"],
+            ),
+            (
+                "train types ?name=",
+                TrainType.objects.filter(name__icontains=search),
+                ["traintype_name_trgm_idx"],
+            ),
+            (
+                "crews ?first_name=",
+                Crew.objects.filter(first_name__icontains=search),
+                ["crew_first_name_trgm_idx"],
+            ),
+            (
+                "trains ?train_type=",
+                Train.objects.select_related("train_type").filter(
+                    train_type__name__icontains=search
+                ),
+                ["traintype_name_trgm_idx"],
+            ),
+        ]
+
+    def explain(self, queryset, analyze):
+        if analyze:
+            return queryset.explain(analyze=True)
+        return queryset.explain()
+
+    def explain_without(self, queryset, indexes, analyze):
+        plan = None
+        try:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    for index in indexes:
+                        cursor.execute(f'DROP INDEX IF EXISTS "{index}"')
+                plan = self.explain(queryset, analyze)
+                raise RolledBack
+        except RolledBack:
+            return plan
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        postgresql = connection.vendor == "postgresql"
+        analyze = options["analyze"] and postgresql
+        without_indexes = options["without_indexes"] and postgresql
+        if (options["analyze"] or options["without_indexes"]) and (
+                not postgresql
+        ):
+            self.stdout.write(self.style.WARNING(
+                "--analyze and --without-indexes need PostgreSQL, ignored"
+            ))
+
+        for title, queryset, indexes in self.cases(
+                options["date"], options["search"]
+        ):
+            self.stdout.write(self.style.MIGRATE_HEADING(title))
+            if without_indexes and indexes:
+                self.stdout.write(
+                    self.style.HTTP_INFO(f"without {', '.join(indexes)}:")
+                )
+                self.stdout.write(
+                    self.explain_without(queryset, indexes, analyze)
+                )
+                self.stdout.write(self.style.HTTP_INFO("with indexes:"))
+            self.stdout.write(self.explain(queryset, analyze))
+            self.stdout.write("")
@@ -0,0 +1,47 @@
+from datetime import date
+
+from django.core.management import BaseCommand
+
+from train import exports
+
+
+class Command(BaseCommand):
+    """Django command that exports tickets or orders as CSV or NDJSON"""
+    help = (  # noqa: VNE003
+        "Stream every ticket or order (optionally by order date) to a file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(exports.EXPORTS))
+        parser.add_argument(
+            "--output", choices=["csv", "ndjson"], default="csv"
+        )
+        parser.add_argument(
+            "--from", dest="date_from", type=date.fromisoformat
+        )
+        parser.add_argument("--to", dest="date_to", type=date.fromisoformat)
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument(
+            "--file", help="Write to this file instead of stdout"
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        header, rows = exports.export_rows(
+            options["kind"],
+            date_from=options["date_from"],
+            date_to=options["date_to"],
+            chunk_size=options["chunk_size"],
+        )
+        lines = (
+            exports.ndjson_lines(header, rows)
+            if options["output"] == "ndjson"
+            else exports.csv_lines(header, rows)
+        )
+
+        if options["file"]:
+            with open(options["file"], "w", newline="") as file:
+                file.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending="")
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management import BaseCommand, CommandError
+
+from train.timetable import TimetableError, TimetableImporter, read_timetable
+
+
+class Command(BaseCommand):
+    """Django command that bulk imports a timetable of trips"""
+    help = (  # noqa: VNE003
+        "Import trips (with their stations, routes, trains and crews) "
+        "from a CSV file or a GTFS-like feed, updating the trips that "
+        "already exist."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            help="CSV file, or GTFS-like feed directory or zip",
+        )
+        parser.add_argument(
+            "--format",
+            dest="fmt",
+            choices=["csv", "gtfs"],
+            help="Default: csv for *.csv paths, gtfs otherwise",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        start = time.perf_counter()
+        try:
+            stats = TimetableImporter(options["batch_size"]).run(
+                read_timetable(options["path"], options["fmt"])
+            )
+        except (TimetableError, OSError) as error:
+            raise CommandError(error)
+        elapsed = time.perf_counter() - start
+
+        for name, count in stats.items():
+            if name != "rows":
+                self.stdout.write(f"{name.replace('_', ' ')}: {count}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats['rows']} rows in {elapsed:.2f}s "
+            f"({stats['rows'] / elapsed if elapsed else 0:.0f} rows/s)"
+        ))
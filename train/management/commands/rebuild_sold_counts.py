@@ -0,0 +1,103 @@
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+
+from train.models import CargoOccupancy, Ticket, Trip
+
+
+class Command(BaseCommand):
+    """Django command that recounts Trip.sold_count and the
+    CargoOccupancy summary from the tickets"""
+    help = (  # noqa: VNE003
+        "Rebuild (or with --check only verify) Trip.sold_count and the "
+        "sold seats of every cargo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Report drifted counters and fail instead of fixing them.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        with transaction.atomic():
+            drifted = self.rebuild_trips(options["batch_size"])
+            drifted_cargos = self.rebuild_cargos(options["batch_size"])
+
+            if options["check"]:
+                if drifted or drifted_cargos:
+                    raise CommandError(
+                        f"{len(drifted)} trip counter(s) and "
+                        f"{len(drifted_cargos)} cargo counter(s) out of sync"
+                    )
+            else:
+                Trip.objects.bulk_update(
+                    drifted,
+                    ["sold_count"],
+                    batch_size=options["batch_size"]
+                )
+                CargoOccupancy.objects.bulk_update(
+                    [row for row in drifted_cargos if row.pk],
+                    ["sold"],
+                    batch_size=options["batch_size"]
+                )
+                CargoOccupancy.objects.bulk_create(
+                    [row for row in drifted_cargos if not row.pk],
+                    batch_size=options["batch_size"]
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(drifted)} trip counter(s) and {len(drifted_cargos)} "
+            f"cargo counter(s) "
+            f"{'out of sync' if options['check'] else 'rebuilt'}"
+        ))
+
+    def rebuild_trips(self, batch_size):
+        sold = dict(
+            Ticket.objects.order_by().values_list(
+                "trip"
+            ).annotate(count=Count("id"))
+        )
+        drifted = []
+        trips = Trip.objects.select_for_update().only("id", "sold_count")
+        for trip in trips.iterator(chunk_size=batch_size):
+            actual = sold.get(trip.id, 0)
+            if trip.sold_count != actual:
+                self.stdout.write(
+                    f"Trip {trip.id}: sold_count={trip.sold_count}, "
+                    f"tickets={actual}"
+                )
+                trip.sold_count = actual
+                drifted.append(trip)
+        return drifted
+
+    def rebuild_cargos(self, batch_size):
+        """Drifted CargoOccupancy rows, unsaved ones are missing"""
+        sold = {
+            (trip_id, cargo): count
+            for trip_id, cargo, count in Ticket.objects.order_by(
+            ).values_list("trip", "cargo").annotate(count=Count("id"))
+        }
+        drifted = []
+        rows = CargoOccupancy.objects.select_for_update()
+        for row in rows.iterator(chunk_size=batch_size):
+            actual = sold.pop((row.trip_id, row.cargo), 0)
+            if row.sold != actual:
+                self.stdout.write(
+                    f"Trip {row.trip_id} cargo {row.cargo}: "
+                    f"sold={row.sold}, tickets={actual}"
+                )
+                row.sold = actual
+                drifted.append(row)
+
+        for (trip_id, cargo), actual in sold.items():
+            self.stdout.write(
+                f"Trip {trip_id} cargo {cargo}: sold=0, tickets={actual}"
+            )
+            drifted.append(
+                CargoOccupancy(trip_id=trip_id, cargo=cargo, sold=actual)
+            )
+        return drifted
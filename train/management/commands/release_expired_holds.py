@@ -0,0 +1,20 @@
+from django.core.management import BaseCommand
+
+from train.reservations import release_expired_holds
+
+
+class Command(BaseCommand):
+    """Django command that frees the seats of expired holds"""
+    help = (  # noqa: VNE003
+        "Delete expired seat holds in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        released = release_expired_holds(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Released {released} expired hold(s)")
+        )
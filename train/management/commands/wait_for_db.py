@@ -1,21 +1,89 @@
 import time
 
-from django.core.management import BaseCommand
-from django.db import connections
-from django.db.utils import OperationalError
+from django.core.management import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from train import health
 
 
 class Command(BaseCommand):
     """Django command that waits for database to be available"""
+    help = (  # noqa: VNE003
+        "Wait until the database accepts connections and answers "
+        "SELECT 1 (optionally until the cache works and every migration "
+        "is applied too), retrying with exponential backoff."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Database alias to wait for.",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=60,
+            help="Give up (exit code 1) after this many seconds.",
+        )
+        parser.add_argument(
+            "--initial-delay",
+            type=float,
+            default=0.1,
+            help="Seconds before the first retry, doubled every retry.",
+        )
+        parser.add_argument(
+            "--max-delay",
+            type=float,
+            default=5,
+            help="Longest pause between two attempts.",
+        )
+        parser.add_argument(
+            "--cache",
+            action="store_true",
+            help="Also wait for the default cache to work.",
+        )
+        parser.add_argument(
+            "--migrations",
+            action="store_true",
+            help="Also wait until no migration is left to apply.",
+        )
+
     def handle(self, *args, **options):
         """Handle the command"""
+        alias = options["database"]
+        checks = [("Database", lambda: health.check_database(alias))]
+        if options["cache"]:
+            checks.append(("Cache", health.check_cache))
+        if options["migrations"]:
+            checks.append(
+                ("Migrations", lambda: health.check_migrations(alias))
+            )
+
+        deadline = time.monotonic() + options["timeout"]
+        delay = options["initial_delay"]
         self.stdout.write("Waiting for database...")
-        db_conn = None
-        while not db_conn:
-            try:
-                db_conn = connections["default"]
-            except OperationalError:
-                self.stdout.write("Database unavailable, waiting 1 second...")
-                time.sleep(1)
-
-        self.stdout.write(self.style.SUCCESS("Database available!"))
+        for name, check in checks:
+            while True:
+                try:
+                    check()
+                    break
+                except Exception as exc:
+                    if isinstance(exc, DatabaseError):
+                        # the next attempt must open a new connection
+                        connections[alias].close()
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise CommandError(
+                            f"{name} not ready after {options['timeout']}s: "
+                            f"{exc}"
+                        )
+                    pause = min(delay, remaining)
+                    self.stdout.write(
+                        f"{name} unavailable ({exc}), "
+                        f"waiting {pause:.1f} seconds..."
+                    )
+                    time.sleep(pause)
+                    delay = min(delay * 2, options["max_delay"])
+
+            self.stdout.write(self.style.SUCCESS(f"{name} available!"))
@@ -0,0 +1,397 @@
+"""Per-request performance metrics of a worker process.
+
+RequestMetricsMiddleware times every request and tags it with the view
+that served it, `TripViewSet.list` for instance. Besides the wall time
+it records the time spent in SQL and the number of queries (through
+connection.execute_wrapper), the time spent turning objects into
+serializer data and the size of the response body. The numbers of a
+request go out in its Server-Timing header, the totals per view in the
+Prometheus text format at /metrics/.
+
+The totals are kept per worker process, like the connection pool stats:
+a scrape reports the worker that answered it.
+
+Under ASGI the middleware stays async. The ORM runs the queries of a
+request on the connections of the thread of its sync_to_async calls, so
+the query wrappers are installed and removed in that thread.
+"""
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+from rest_framework.serializers import BaseSerializer
+
+from train.coroutines import markcoroutinefunction
+from train.db.pool import pool_stats
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+METHODS = frozenset(
+    ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS")
+)
+
+_current = ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    """What one request spent its time on"""
+
+    __slots__ = ("db_time", "queries", "serializer_time", "_depth")
+
+    def __init__(self):
+        self.db_time = 0.0
+        self.queries = 0
+        self.serializer_time = 0.0
+        self._depth = 0
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+    def server_timing(self, duration):
+        return (
+            f'db;dur={self.db_time * 1000:.3f};desc="{self.queries} queries", '
+            f"serializer;dur={self.serializer_time * 1000:.3f}, "
+            f"total;dur={duration * 1000:.3f}"
+        )
+
+
+def current():
+    """The metrics of the request being served, None outside of one"""
+    return _current.get()
+
+
+@contextmanager
+def serializing():
+    """Counts the block as serializer time of the request, unless it is
+    part of a serialization already counted"""
+    metrics = _current.get()
+    if metrics is None or metrics._depth:
+        yield
+        return
+
+    # queries of lazily loaded relations count as db time only
+    db_time = metrics.db_time
+    metrics._depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics._depth -= 1
+        metrics.serializer_time += (
+            time.perf_counter() - start - (metrics.db_time - db_time)
+        )
+
+
+_serializer_data = BaseSerializer.data
+
+
+def _timed_serializer_data(serializer):
+    with serializing():
+        return _serializer_data.fget(serializer)
+
+
+def instrument_serializers():
+    """Times serializer.data of every serializer, top level only: the
+    nested ones are part of the serializer that renders them. Installed
+    by TrainConfig.ready()"""
+    BaseSerializer.data = property(_timed_serializer_data)
+
+
+def uninstrument_serializers():
+    BaseSerializer.data = _serializer_data
+
+
+def watch_queries(record_query):
+    """Wraps the queries of every connection of the current thread in
+    record_query until the returned ExitStack is closed"""
+    wrappers = ExitStack()
+    for connection in connections.all():
+        wrappers.enter_context(connection.execute_wrapper(record_query))
+    return wrappers
+
+
+def view_name(view_func, method):
+    """ViewSet.action of a DRF view, the function name of the others"""
+    cls = getattr(view_func, "cls", None)
+    if cls is None:
+        return getattr(view_func, "__name__", type(view_func).__name__)
+    action = (getattr(view_func, "actions", None) or {}).get(method.lower())
+    return f"{cls.__name__}.{action or method.lower()}"
+
+
+def request_view_name(request):
+    """view_name of the view resolved for request, "unresolved" if none"""
+    if request.resolver_match is None:
+        return "unresolved"
+    return view_name(request.resolver_match.func, request.method)
+
+
+def response_size(response):
+    if not response.streaming:
+        return len(response.content)
+    return int(response.get("Content-Length", 0))
+
+
+class ViewTotals:
+    __slots__ = (
+        "count",
+        "duration",
+        "buckets",
+        "db_time",
+        "queries",
+        "serializer_time",
+        "response_bytes",
+    )
+
+    def __init__(self, buckets):
+        self.count = 0
+        self.duration = 0.0
+        # not cumulative, the last one is +Inf
+        self.buckets = [0] * (buckets + 1)
+        self.db_time = 0.0
+        self.queries = 0
+        self.serializer_time = 0.0
+        self.response_bytes = 0
+
+
+class Registry:
+    """Totals per (view, method, status) of one process"""
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.bucket_bounds = buckets
+        self._lock = threading.Lock()
+        self._totals = {}
+
+    def observe(self, labels, duration, metrics, size):
+        bucket = bisect_left(self.bucket_bounds, duration)
+        with self._lock:
+            totals = self._totals.get(labels)
+            if totals is None:
+                totals = self._totals[labels] = ViewTotals(
+                    len(self.bucket_bounds)
+                )
+            totals.count += 1
+            totals.duration += duration
+            totals.buckets[bucket] += 1
+            totals.db_time += metrics.db_time
+            totals.queries += metrics.queries
+            totals.serializer_time += metrics.serializer_time
+            totals.response_bytes += size
+
+    def snapshot(self):
+        """{(view, method, status): ViewTotals}, copied"""
+        with self._lock:
+            snapshot = {}
+            for labels, totals in self._totals.items():
+                copy = snapshot[labels] = ViewTotals(0)
+                for name in ViewTotals.__slots__:
+                    setattr(copy, name, getattr(totals, name))
+                copy.buckets = list(totals.buckets)
+            return snapshot
+
+    def clear(self):
+        with self._lock:
+            self._totals.clear()
+
+
+registry = Registry()
+
+
+class RequestMetricsMiddleware:
+    """Goes first in MIDDLEWARE, so the wall time covers the others"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(self.get_response):
+            # as django.utils.deprecation.MiddlewareMixin
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            with watch_queries(metrics.record_query):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.observe(request, response, metrics, start)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            wrappers = await sync_to_async(
+                watch_queries, thread_sensitive=True
+            )(metrics.record_query)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(wrappers.close, thread_sensitive=True)()
+        finally:
+            _current.reset(token)
+        return self.observe(request, response, metrics, start)
+
+    def observe(self, request, response, metrics, start):
+        duration = time.perf_counter() - start
+        method = request.method if request.method in METHODS else "OTHER"
+        registry.observe(
+            (request_view_name(request), method, str(response.status_code)),
+            duration,
+            metrics,
+            response_size(response),
+        )
+        timing = metrics.server_timing(duration)
+        if response.has_header("Server-Timing"):
+            timing = f"{response['Server-Timing']}, {timing}"
+        response["Server-Timing"] = timing
+        return response
+
+
+def _label_value(value):
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\n", "\\n")
+    )
+
+
+def _labels(**labels):
+    return ",".join(
+        f'{name}="{_label_value(value)}"' for name, value in labels.items()
+    )
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+class _Family:
+    def __init__(self, name, kind, help_text):
+        self.lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        self.name = name
+
+    def add(self, value, suffix="", **labels):
+        self.lines.append(
+            f"{self.name}{suffix}{{{_labels(**labels)}}} {_number(value)}"
+        )
+
+
+def render(registry=registry, pools=None):
+    """The request totals and the connection pool stats, in the
+    Prometheus text exposition format"""
+    requests = _Family(
+        "train_http_requests_total", "counter", "Requests served."
+    )
+    durations = _Family(
+        "train_http_request_duration_seconds",
+        "histogram",
+        "Wall time of the requests.",
+    )
+    db_time = _Family(
+        "train_http_request_db_seconds_total",
+        "counter",
+        "Time the requests spent in SQL queries.",
+    )
+    queries = _Family(
+        "train_http_request_db_queries_total",
+        "counter",
+        "SQL queries run by the requests.",
+    )
+    serializer_time = _Family(
+        "train_http_request_serializer_seconds_total",
+        "counter",
+        "Time the requests spent serializing, SQL excluded.",
+    )
+    response_bytes = _Family(
+        "train_http_response_bytes_total",
+        "counter",
+        "Size of the response bodies.",
+    )
+    bounds = [_number(bound) for bound in registry.bucket_bounds] + ["+Inf"]
+
+    for (view, method, status), totals in sorted(
+            registry.snapshot().items()
+    ):
+        labels = {"view": view, "method": method, "status": status}
+        requests.add(totals.count, **labels)
+        cumulative = 0
+        for bound, count in zip(bounds, totals.buckets):
+            cumulative += count
+            durations.add(cumulative, "_bucket", **labels, le=bound)
+        durations.add(totals.duration, "_sum", **labels)
+        durations.add(totals.count, "_count", **labels)
+        db_time.add(totals.db_time, **labels)
+        queries.add(totals.queries, **labels)
+        serializer_time.add(totals.serializer_time, **labels)
+        response_bytes.add(totals.response_bytes, **labels)
+    families = [
+        requests,
+        durations,
+        db_time,
+        queries,
+        serializer_time,
+        response_bytes,
+    ]
+
+    pools = pool_stats() if pools is None else pools
+    if pools:
+        connections_family = _Family(
+            "train_db_pool_connections",
+            "gauge",
+            "Open connections of the pool, idle or in use.",
+        )
+        waiting = _Family(
+            "train_db_pool_waiting",
+            "gauge",
+            "Threads waiting for a connection.",
+        )
+        counters = [
+            (key, _Family(f"train_db_pool_{key}_total", "counter", text))
+            for key, text in (
+                ("requests", "Connections asked from the pool."),
+                ("connects", "Connections opened."),
+                ("waits", "Times a thread had to wait for a connection."),
+                ("timeouts", "Waits that ran into the pool timeout."),
+                ("failed_checks", "Idle connections found broken."),
+            )
+        ]
+        wait_time = _Family(
+            "train_db_pool_wait_seconds_total",
+            "counter",
+            "Time threads spent waiting for a connection.",
+        )
+        for pool, stats in sorted(pools.items()):
+            connections_family.add(stats["idle"], pool=pool, state="idle")
+            connections_family.add(stats["in_use"], pool=pool, state="in_use")
+            waiting.add(stats["waiting"], pool=pool)
+            for key, family in counters:
+                family.add(stats[key], pool=pool)
+            wait_time.add(stats["wait_seconds_total"], pool=pool)
+        families += [connections_family, waiting, wait_time]
+        families += [family for _, family in counters]
+
+    return "\n".join(
+        line for family in families for line in family.lines
+    ) + "\n"
@@ -0,0 +1,30 @@
+# Generated by Django 4.0.4 on 2026-10-18 19:47
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_sold_count(apps, schema_editor):
+    Trip = apps.get_model('train', 'Trip')
+    Ticket = apps.get_model('train', 'Ticket')
+    sold = Ticket.objects.filter(
+        trip=OuterRef('pk')
+    ).order_by().values('trip').annotate(count=Count('id')).values('count')
+    Trip.objects.update(sold_count=Coalesce(Subquery(sold), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('train', '0003_alter_train_cargo_num_alter_route_unique_together'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trip',
+            name='sold_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_sold_count, migrations.RunPython.noop),
+    ]
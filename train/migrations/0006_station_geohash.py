@@ -0,0 +1,30 @@
+# Generated by Django 4.0.4 on 2026-10-18 20:05
+
+from django.db import migrations, models
+
+from train import geo
+
+
+def fill_geohash(apps, schema_editor):
+    Station = apps.get_model('train', 'Station')
+    stations = list(Station.objects.only('latitude', 'longitude'))
+    for station in stations:
+        station.geohash = geo.encode(station.latitude, station.longitude)
+    Station.objects.bulk_update(stations, ['geohash'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('train', '0005_seathold'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='station',
+            name='geohash',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=12),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_geohash, migrations.RunPython.noop),
+    ]
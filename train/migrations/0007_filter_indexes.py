@@ -0,0 +1,53 @@
+# Generated by Django 4.0.4 on 2026-10-18 19:57
+
+from django.db import migrations, models
+
+# (index, table, column) searched with __icontains, which PostgreSQL
+# runs as UPPER("column"::text) LIKE UPPER('%value%'): a trigram index
+# on that exact expression lets it skip the sequential scan
+TRIGRAM_INDEXES = [
+    ('station_name_trgm_idx', 'train_station', 'name'),
+    ('traintype_name_trgm_idx', 'train_traintype', 'name'),
+    ('crew_first_name_trgm_idx', 'train_crew', 'first_name'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" '
+            f'USING gin ((UPPER("{column}"::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('train', '0006_station_geohash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', '-created_at'], name='order_user_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['departure_time', 'id'], name='trip_departure_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['arrival_time'], name='trip_arrival_time_idx'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.0.4 on 2026-10-18 20:13
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def fill_cargo_occupancy(apps, schema_editor):
+    CargoOccupancy = apps.get_model('train', 'CargoOccupancy')
+    Ticket = apps.get_model('train', 'Ticket')
+    sold = Ticket.objects.order_by().values('trip', 'cargo').annotate(
+        count=Count('id')
+    )
+    CargoOccupancy.objects.bulk_create(
+        (
+            CargoOccupancy(
+                trip_id=row['trip'], cargo=row['cargo'], sold=row['count']
+            )
+            for row in sold.iterator(chunk_size=2000)
+        ),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('train', '0008_tableversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CargoOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cargo', models.IntegerField()),
+                ('sold', models.IntegerField(default=0)),
+                ('trip', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cargo_occupancy', to='train.trip')),
+            ],
+            options={
+                'ordering': ['cargo'],
+                'unique_together': {('trip', 'cargo')},
+            },
+        ),
+        migrations.RunPython(fill_cargo_occupancy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.0.4 on 2026-10-18 21:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('train', '0009_cargooccupancy'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['route', 'departure_time', 'id'], name='trip_route_departure_idx'),
+        ),
+    ]
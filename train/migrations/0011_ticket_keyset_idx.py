@@ -0,0 +1,17 @@
+# Generated by Django 4.0.4 on 2026-10-18 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('train', '0010_trip_route_departure_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['trip', 'cargo', 'seat', 'id'], name='ticket_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.0.4 on 2026-10-18 23:55
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('train', '0011_ticket_keyset_idx'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='route',
+            options={'ordering': ['distance']},
+        ),
+    ]
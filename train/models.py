@@ -1,7 +1,16 @@
+import threading
+from collections import Counter
+
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, Count, F, Q, Value, When
 from django.conf import settings
 
+from train import geo
+
+# tables written by the transaction of the thread, see bump_on_commit
+_pending_bumps = threading.local()
+
 
 class Crew(models.Model):
     first_name = models.CharField(max_length=63)
@@ -33,12 +42,27 @@ class Order(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["user", "-created_at"],
+                name="order_user_created_at_idx"
+            ),
+        ]
 
 
 class Station(models.Model):
     name = models.CharField(max_length=63)
     latitude = models.FloatField()
     longitude = models.FloatField()
+    geohash = models.CharField(
+        max_length=geo.MAX_PRECISION,
+        db_index=True,
+        editable=False
+    )
+
+    def save(self, *args, **kwargs):
+        self.geohash = geo.encode(self.latitude, self.longitude)
+        return super(Station, self).save(*args, **kwargs)
 
     def __str__(self):
         return self.name
@@ -83,6 +107,45 @@ class Route(models.Model):
         ordering = ["distance", ]
 
 
+TICKETS_AVAILABLE = (
+    F("train__cargo_num") * F("train__places_in_cargo") - F("sold_count")
+)
+
+
+class TripQuerySet(models.QuerySet):
+    def with_tickets_available(self):
+        return self.annotate(tickets_available=TICKETS_AVAILABLE)
+
+    def search(
+            self,
+            source,
+            destination,
+            departure_after,
+            departure_before,
+            min_seats=1,
+            train_type=None
+    ):
+        """Trips from source to destination (station ids) leaving in
+        [departure_after, departure_before) with min_seats free seats.
+
+        One query: the route is found on its (source, destination)
+        unique index, its trips on (route, departure_time, id).
+        """
+        queryset = self.filter(
+            route__source_id=source,
+            route__destination_id=destination,
+            departure_time__gte=departure_after,
+            departure_time__lt=departure_before
+        ).alias(
+            free_seats=TICKETS_AVAILABLE
+        ).filter(free_seats__gte=min_seats)
+
+        if train_type is not None:
+            queryset = queryset.filter(train__train_type_id=train_type)
+
+        return queryset.order_by("departure_time", "id")
+
+
 class Trip(models.Model):
     route = models.ForeignKey(
         Route,
@@ -101,10 +164,137 @@ class Trip(models.Model):
         blank=True,
         related_name="trips"
     )
+    sold_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = TripQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.route} {self.departure_time}-{self.arrival_time}"
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["departure_time", "id"],
+                name="trip_departure_time_idx"
+            ),
+            models.Index(
+                fields=["arrival_time"],
+                name="trip_arrival_time_idx"
+            ),
+            models.Index(
+                fields=["route", "departure_time", "id"],
+                name="trip_route_departure_idx"
+            ),
+        ]
+
+    @property
+    def free_seats_by_cargo(self) -> dict:
+        """{cargo: free seats}, prefetch cargo_occupancy for lists"""
+        sold = {row.cargo: row.sold for row in self.cargo_occupancy.all()}
+        return {
+            cargo: self.train.places_in_cargo - sold.get(cargo, 0)
+            for cargo in range(1, self.train.cargo_num + 1)
+        }
+
+    @staticmethod
+    def adjust_sold_count(deltas):
+        """Apply {trip_id: delta} to the denormalized sold_count.
+
+        Must run in the transaction that writes the tickets.
+        """
+        for trip_id, delta in deltas.items():
+            if delta:
+                Trip.objects.filter(pk=trip_id).update(
+                    sold_count=F("sold_count") + delta
+                )
+
+    @staticmethod
+    def adjust_sold_seats(deltas):
+        """Apply {(trip_id, cargo): delta} to sold_count and to the
+        CargoOccupancy summary, in two queries plus one per trip.
+
+        Must run in the transaction that writes the tickets.
+        """
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if not deltas:
+            return
+
+        CargoOccupancy.objects.bulk_create(
+            [
+                CargoOccupancy(trip_id=trip_id, cargo=cargo)
+                for trip_id, cargo in deltas
+            ],
+            ignore_conflicts=True
+        )
+        rows = [Q(trip_id=trip_id, cargo=cargo) for trip_id, cargo in deltas]
+        CargoOccupancy.objects.filter(
+            Q(*rows, _connector=Q.OR)
+        ).update(
+            sold=F("sold") + Case(
+                *(
+                    When(row, then=Value(delta))
+                    for row, delta in zip(rows, deltas.values())
+                ),
+                default=Value(0)
+            )
+        )
+
+        per_trip = Counter()
+        for (trip_id, cargo), delta in deltas.items():
+            per_trip[trip_id] += delta
+        Trip.adjust_sold_count(per_trip)
+
+
+class CargoOccupancy(models.Model):
+    """Seats sold in one cargo of a trip.
+
+    Maintained with Trip.adjust_sold_seats on every ticket write, so
+    the free seats of every cargo of a page of trips are one query.
+    """
+
+    trip = models.ForeignKey(
+        Trip,
+        on_delete=models.CASCADE,
+        related_name="cargo_occupancy"
+    )
+    cargo = models.IntegerField()
+    sold = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.trip_id} (row: {self.cargo}): {self.sold} sold"
+
+    class Meta:
+        unique_together = ("trip", "cargo")
+        ordering = ["cargo"]
+
+
+class TicketQuerySet(models.QuerySet):
+    def sold_seats(self):
+        """{(trip_id, cargo): tickets} of the tickets, in one query"""
+        return {
+            (trip_id, cargo): count
+            for trip_id, cargo, count in self.order_by().values_list(
+                "trip_id", "cargo"
+            ).annotate(count=Count("id"))
+        }
+
+    def release_seats(self):
+        """Take the tickets out of the sold counts of their trips, before
+        they are deleted.
+
+        Aggregated per (trip, cargo): a handful of queries however many
+        tickets there are. Tickets deleted along with their trip need
+        not be released.
+        """
+        Trip.adjust_sold_seats(
+            {seat: -count for seat, count in self.sold_seats().items()}
+        )
+
+    def delete(self):
+        with transaction.atomic(using=self.db):
+            self.release_seats()
+            return super(TicketQuerySet, self).delete()
+
 
 class Ticket(models.Model):
     cargo = models.IntegerField()
@@ -120,6 +310,10 @@ class Ticket(models.Model):
         related_name="tickets"
     )
 
+    # no delete signals on Ticket: they would disable the fast (one
+    # query) delete of the tickets of deleted trips and orders
+    objects = TicketQuerySet.as_manager()
+
     @staticmethod
     def validate_ticket(cargo, seat, train, error_to_raise):
         for ticket_attr_value, ticket_attr_name, train_attr_name in [
@@ -153,9 +347,30 @@ class Ticket(models.Model):
             update_fields=None,
     ):
         self.full_clean()
-        return super(Ticket, self).save(
-            force_insert, force_update, using, update_fields
-        )
+        with transaction.atomic(using=using):
+            previous = None
+            if not self._state.adding:
+                previous = Ticket.objects.filter(
+                    pk=self.pk
+                ).values_list("trip_id", "cargo").first()
+
+            result = super(Ticket, self).save(
+                force_insert, force_update, using, update_fields
+            )
+
+            current = (self.trip_id, self.cargo)
+            if previous != current:
+                deltas = {current: 1}
+                if previous is not None:
+                    deltas[previous] = -1
+                Trip.adjust_sold_seats(deltas)
+
+        return result
+
+    def delete(self, using=None, keep_parents=False):
+        with transaction.atomic(using=using):
+            Trip.adjust_sold_seats({(self.trip_id, self.cargo): -1})
+            return super(Ticket, self).delete(using, keep_parents)
 
     def __str__(self):
         return (
@@ -165,3 +380,105 @@ class Ticket(models.Model):
     class Meta:
         unique_together = ("trip", "cargo", "seat")
         ordering = ["cargo", "seat"]
+        indexes = [
+            # keyset pages of /tickets/
+            models.Index(
+                fields=["trip", "cargo", "seat", "id"],
+                name="ticket_keyset_idx"
+            ),
+        ]
+
+
+class SeatHold(models.Model):
+    """Seat reserved for a user until expires_at, then freed."""
+
+    cargo = models.IntegerField()
+    seat = models.IntegerField()
+    trip = models.ForeignKey(
+        Trip,
+        on_delete=models.CASCADE,
+        related_name="holds"
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="seat_holds"
+    )
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return (
+            f"{str(self.trip)} (row: {self.cargo}, seat: {self.seat}) "
+            f"held until {self.expires_at}"
+        )
+
+    class Meta:
+        unique_together = ("trip", "cargo", "seat")
+        ordering = ["expires_at"]
+
+
+class TableVersion(models.Model):
+    """Change counter of a table, bumped by every transaction writing
+    to it once it commits.
+
+    Lets artifacts built from the tables (the GTFS feed) find out which
+    of their sources changed since they were built.
+    """
+
+    table = models.CharField(max_length=63, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.table} v{self.version}"
+
+    @staticmethod
+    def bump(*tables):
+        names = {model._meta.db_table for model in tables}
+        if TableVersion.objects.filter(table__in=names).update(
+                version=F("version") + 1
+        ) < len(names):
+            names -= set(
+                TableVersion.objects.filter(table__in=names).values_list(
+                    "table", flat=True
+                )
+            )
+            for table in names:
+                TableVersion.objects.get_or_create(
+                    table=table, defaults={"version": 1}
+                )
+
+    @staticmethod
+    def bump_on_commit(*tables):
+        """bump(*tables) once the transaction commits.
+
+        The tables written by a transaction are collected by a single
+        on_commit callback and bumped together, in one UPDATE: the
+        version rows are neither updated nor locked once per write.
+        """
+        pending = getattr(_pending_bumps, "tables", None)
+        if pending is None or not any(
+                # gone with a rolled back savepoint otherwise
+                callback[1] is TableVersion._bump_pending
+                for callback in transaction.get_connection().run_on_commit
+        ):
+            _pending_bumps.tables = set(tables)
+            transaction.on_commit(TableVersion._bump_pending)
+        else:
+            pending.update(tables)
+
+    @staticmethod
+    def _bump_pending():
+        tables, _pending_bumps.tables = _pending_bumps.tables, None
+        TableVersion.bump(*tables)
+
+    @staticmethod
+    def current(*tables):
+        """{model: version} of the given models"""
+        versions = dict(
+            TableVersion.objects.filter(
+                table__in=[model._meta.db_table for model in tables]
+            ).values_list("table", "version")
+        )
+        return {
+            model: versions.get(model._meta.db_table, 0) for model in tables
+        }
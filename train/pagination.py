@@ -0,0 +1,192 @@
+import base64
+import json
+from urllib import parse
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class TripSearchPagination(LimitOffsetPagination):
+    """LimitOffsetPagination with a page even when ?limit= is not given:
+    only the trips of the page get their free seats counted"""
+
+    default_limit = 20
+    max_limit = 100
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination seeking on the full ordering of the view.
+
+    Unlike DRF's CursorPagination (and OFFSET based paginations), the
+    cursor holds the values of every ordering field of the boundary row,
+    so any page is one ``WHERE a >= x AND (a > x OR (a = x AND ...))
+    LIMIT n`` query on the ordering index, however deep it is.
+    """
+
+    page_size = 10
+    max_page_size = 100
+    ordering = ("id",)
+    mode_query_param = "pagination"
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Invalid cursor"
+
+    @classmethod
+    def is_requested(cls, request):
+        return (
+            request.query_params.get(cls.mode_query_param) == "cursor"
+            or cls.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.model = queryset.model
+        self.ordering = tuple(getattr(view, "keyset_ordering", self.ordering))
+        page_size = self.get_page_size(request)
+
+        position, reverse = self.decode_cursor(request)
+        ordering = (
+            tuple(self._reverse(field) for field in self.ordering)
+            if reverse else self.ordering
+        )
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(position, ordering))
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {
+                    "type": "string", "nullable": True, "format": "uri"
+                },
+                "results": schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            url = self.request.build_absolute_uri()
+            return remove_query_param(url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    @staticmethod
+    def _reverse(field):
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+    @staticmethod
+    def _after(position, ordering):
+        """Rows strictly after position in the given ordering.
+
+        The OR expansion of (a, b, id) > (x, y, z), for any mix of
+        directions, ANDed with a >= x: implied by the expansion, it is
+        the range the database seeks to on the index led by a.
+        """
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+
+        first = ordering[0]
+        lookup = "lte" if first.startswith("-") else "gte"
+        return Q(**{f"{first.lstrip('-')}__{lookup}": position[0]}) & condition
+
+    @staticmethod
+    def _value(row, name):
+        if isinstance(row, dict):
+            return row[name]
+        return getattr(row, name)
+
+    def encode_cursor(self, row, reverse):
+        position = [
+            self._value(row, field.lstrip("-")) for field in self.ordering
+        ]
+        payload = json.dumps(
+            {"p": position, "r": reverse},
+            default=lambda value: value.isoformat(),
+            separators=(",", ":"),
+        )
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode("ascii")
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.mode_query_param, "cursor")
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            payload = json.loads(
+                base64.urlsafe_b64decode(parse.unquote(encoded).encode())
+            )
+            if len(payload["p"]) != len(self.ordering):
+                raise ValueError("Cursor does not match the ordering")
+            position = [
+                self.model._meta.get_field(field.lstrip("-")).to_python(value)
+                for field, value in zip(self.ordering, payload["p"])
+            ]
+            return position, bool(payload["r"])
+        except (TypeError, ValueError, KeyError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class KeysetPaginationMixin:
+    """Lets clients opt in to KeysetPagination on a list endpoint
+    with ?pagination=cursor, ordered by keyset_ordering.
+    """
+
+    keyset_ordering = ("id",)
+
+    @property
+    def paginator(self):
+        if (
+            not hasattr(self, "_paginator")
+            and self.request is not None
+            and KeysetPagination.is_requested(self.request)
+        ):
+            self._paginator = KeysetPagination()
+        return super(KeysetPaginationMixin, self).paginator
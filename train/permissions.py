@@ -1,3 +1,8 @@
+import ipaddress
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
 from rest_framework.permissions import SAFE_METHODS, BasePermission
 
 
@@ -11,3 +16,26 @@ class IsAdminOrIfAuthenticatedReadOnly(BasePermission):
             )
             or (request.user and request.user.is_staff)
         )
+
+
+def is_monitoring_client(request):
+    """The client address is in MONITORING_ALLOWED_IPS"""
+    try:
+        address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network, strict=False)
+        for network in settings.MONITORING_ALLOWED_IPS
+    )
+
+
+def monitoring_only(view):
+    """403 for the clients outside MONITORING_ALLOWED_IPS"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not is_monitoring_client(request):
+            raise PermissionDenied
+        return view(request, *args, **kwargs)
+
+    return wrapper
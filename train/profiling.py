@@ -0,0 +1,213 @@
+"""Sampled detection of N+1 and slow queries in live traffic.
+
+QueryProfilerMiddleware watches a random QUERY_PROFILER_SAMPLE_RATE share
+of the requests. The queries of a watched request are grouped by shape
+(the SQL with its parameters left out, IN lists collapsed): a shape run
+more than QUERY_PROFILER_REPEAT_THRESHOLD times, or a single query
+slower than QUERY_PROFILER_SLOW_MS, is logged to the "train.queries"
+logger as one JSON line. A finding names the serializer fields being
+rendered when the query ran, `CrewListOrRetrieveSerializer.trips` for
+instance, and the line of our code that ran it.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework.serializers import Serializer
+
+from train import metrics
+from train.coroutines import markcoroutinefunction
+
+logger = logging.getLogger("train.queries")
+
+_IN_LIST = re.compile(r"IN \((?:%s, )*%s\)")
+_TO_REPRESENTATION = Serializer.to_representation.__code__
+_SQL_MAX_LENGTH = 2000
+# frames of the instrumentation itself, never the origin of a query
+_OWN_FILES = frozenset((__file__, metrics.__file__))
+
+
+def sql_shape(sql):
+    """The SQL of a query, without the length of its IN lists"""
+    return _IN_LIST.sub("IN (...)", sql)
+
+
+def serializer_fields(frame):
+    """Serializer.field of the fields being rendered, outermost first"""
+    fields = []
+    while frame is not None:
+        if frame.f_code is _TO_REPRESENTATION:
+            field = frame.f_locals.get("field")
+            if field is not None:
+                serializer = type(frame.f_locals["self"]).__name__
+                fields.append(f"{serializer}.{field.field_name}")
+        frame = frame.f_back
+    return fields[::-1]
+
+
+def code_location(frame):
+    """path:line in function of the innermost frame of the project"""
+    root = os.path.join(str(settings.BASE_DIR), "")
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (
+                filename.startswith(root)
+                and filename not in _OWN_FILES
+                and "site-packages" not in filename
+        ):
+            return (
+                f"{os.path.relpath(filename, root)}:{frame.f_lineno} "
+                f"in {frame.f_code.co_name}"
+            )
+        frame = frame.f_back
+    return None
+
+
+def query_origin():
+    frame = sys._getframe(1)
+    return {
+        "fields": serializer_fields(frame),
+        "location": code_location(frame),
+    }
+
+
+class QueryShape:
+    __slots__ = ("count", "duration", "origin")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.origin = None
+
+
+class QueryProfile:
+    """The queries run on every connection while entered, by shape"""
+
+    def __init__(self, repeat_threshold, slow_ms):
+        self.repeat_threshold = repeat_threshold
+        self.slow = slow_ms / 1000
+        self.shapes = {}
+        self.slow_queries = []
+        self._wrappers = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        """Watches the connections of the current thread"""
+        self._wrappers = metrics.watch_queries(self.record_query)
+
+    def stop(self):
+        self._wrappers.close()
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self._record(sql, time.perf_counter() - start)
+
+    def _record(self, sql, duration):
+        key = sql_shape(sql)
+        shape = self.shapes.get(key)
+        if shape is None:
+            shape = self.shapes[key] = QueryShape()
+        shape.count += 1
+        shape.duration += duration
+        # where the first repetition comes from: the first run of a
+        # shape is often a legitimate one
+        if shape.count == min(2, self.repeat_threshold + 1):
+            shape.origin = query_origin()
+        if duration >= self.slow:
+            self.slow_queries.append(
+                {"seconds": round(duration, 6), "sql": sql, **query_origin()}
+            )
+
+    def findings(self):
+        findings = []
+        for sql, shape in self.shapes.items():
+            if shape.count > self.repeat_threshold:
+                findings.append({
+                    "kind": "repeated_query",
+                    "count": shape.count,
+                    "seconds": round(shape.duration, 6),
+                    "sql": sql[:_SQL_MAX_LENGTH],
+                    **shape.origin,
+                })
+        for query in self.slow_queries:
+            findings.append({
+                "kind": "slow_query",
+                **query,
+                "sql": query["sql"][:_SQL_MAX_LENGTH],
+            })
+        return findings
+
+
+def _profile():
+    return QueryProfile(
+        settings.QUERY_PROFILER_REPEAT_THRESHOLD,
+        settings.QUERY_PROFILER_SLOW_MS,
+    )
+
+
+def _sampled():
+    return random.random() < settings.QUERY_PROFILER_SAMPLE_RATE
+
+
+def _log_findings(request, profile):
+    for finding in profile.findings():
+        logger.warning(json.dumps({
+            "view": metrics.request_view_name(request),
+            "method": request.method,
+            "path": request.path,
+            **finding,
+        }))
+
+
+class QueryProfilerMiddleware:
+    """Watches the queries of a sample of the requests, see the module"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(self.get_response):
+            # as django.utils.deprecation.MiddlewareMixin
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not _sampled():
+            return self.get_response(request)
+
+        with _profile() as profile:
+            response = self.get_response(request)
+        _log_findings(request, profile)
+        return response
+
+    async def __acall__(self, request):
+        if not _sampled():
+            return await self.get_response(request)
+
+        # in the thread the ORM runs the queries of the request in
+        profile = _profile()
+        await sync_to_async(profile.start, thread_sensitive=True)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(profile.stop, thread_sensitive=True)()
+        _log_findings(request, profile)
+        return response
@@ -0,0 +1,175 @@
+"""values() read path of the /trips/ and /tickets/ lists.
+
+TripListOrRetrieveSerializer and TicketListSerializer build a model
+instance per row and run every field through get_attribute and
+to_representation, most of the CPU time of a page. The readers fetch
+values() rows instead and build the same dicts with extractors set up
+once: item getters for the columns, the to_representation of the DRF
+field where the serializer formats the value (datetimes). The JSON is
+byte for byte the one of the serializers, test_readers pins it.
+
+Crews and cargo occupancy are read for the whole page, one query each.
+"""
+from operator import itemgetter
+
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from train import metrics
+from train.models import CargoOccupancy, Trip
+from train.renderers import fast_renderer_classes
+
+_datetime = serializers.DateTimeField().to_representation
+
+
+def crews_by_trip(trip_ids):
+    """{trip_id: [{"full_name": ...}]}, as CrewForTripSerializer"""
+    crews = {}
+    for trip_id, first_name, last_name in Trip.crews.through.objects.filter(
+            trip_id__in=trip_ids
+    ).order_by("crew_id").values_list(
+        "trip_id", "crew__first_name", "crew__last_name"
+    ):
+        crews.setdefault(trip_id, []).append(
+            {"full_name": f"{first_name} {last_name}"}
+        )
+    return crews
+
+
+def sold_by_trip(trip_ids):
+    """{trip_id: {cargo: sold}} of the CargoOccupancy summary"""
+    sold = {}
+    for trip_id, cargo, count in CargoOccupancy.objects.filter(
+            trip_id__in=trip_ids
+    ).values_list("trip_id", "cargo", "sold"):
+        sold.setdefault(trip_id, {})[cargo] = count
+    return sold
+
+
+class TripRows:
+    """TripListOrRetrieveSerializer data of values() rows.
+
+    prefix reads the trip of the rows of another model, "trip__" for
+    the trip of tickets.
+    """
+
+    columns = (
+        "id",
+        "route",
+        "train__name",
+        "train__cargo_num",
+        "train__places_in_cargo",
+        "departure_time",
+        "arrival_time",
+        "sold_count",
+    )
+
+    def __init__(self, prefix=""):
+        self.fields = tuple(prefix + column for column in self.columns)
+        self.trip_id = itemgetter(self.fields[0])
+        self._values = itemgetter(*self.fields)
+
+    def related(self, rows):
+        """(crews, sold) of the trips of rows, the queries of by_id"""
+        trip_ids = {self.trip_id(row) for row in rows}
+        return crews_by_trip(trip_ids), sold_by_trip(trip_ids)
+
+    def by_id(self, rows, related=None):
+        """{trip_id: data} of the trips of rows, each built once.
+
+        related is the related() of rows when already read.
+        """
+        crews, sold = self.related(rows) if related is None else related
+
+        trips = {}
+        for row in rows:
+            (
+                trip_id,
+                route,
+                train,
+                cargo_num,
+                places_in_cargo,
+                departure_time,
+                arrival_time,
+                sold_count,
+            ) = self._values(row)
+            if trip_id in trips:
+                continue
+
+            sold_by_cargo = sold.get(trip_id, {})
+            trips[trip_id] = {
+                "id": trip_id,
+                "route": route,
+                "train": train,
+                "departure_time": _datetime(departure_time),
+                "arrival_time": _datetime(arrival_time),
+                "crews": crews.get(trip_id, []),
+                "tickets_available": (
+                    cargo_num * places_in_cargo - sold_count
+                ),
+                "free_seats_by_cargo": {
+                    str(cargo): places_in_cargo - sold_by_cargo.get(cargo, 0)
+                    for cargo in range(1, cargo_num + 1)
+                },
+            }
+        return trips
+
+    def represent(self, rows, related=None):
+        trips = self.by_id(rows, related)
+        return [trips[self.trip_id(row)] for row in rows]
+
+
+class TicketRows:
+    """TicketListSerializer data of values() rows"""
+
+    def __init__(self):
+        self.trip_rows = TripRows("trip__")
+        # trip_id for the keyset of the ticket list
+        self.fields = (
+            ("id", "cargo", "seat", "trip_id") + self.trip_rows.fields
+        )
+        self._values = itemgetter("id", "cargo", "seat", "trip__id")
+
+    def represent(self, rows):
+        trips = self.trip_rows.by_id(rows)
+        tickets = []
+        for row in rows:
+            ticket_id, cargo, seat, trip_id = self._values(row)
+            tickets.append({
+                "id": ticket_id,
+                "cargo": cargo,
+                "seat": seat,
+                "trip": trips[trip_id],
+            })
+        return tickets
+
+
+class RowListMixin:
+    """Serves the list action from the values() rows of row_reader
+    instead of the serializer, both paginations included.
+    """
+
+    row_reader = None
+    renderer_classes = fast_renderer_classes()
+
+    def list(self, request, *args, **kwargs):
+        return self.row_response(self.filter_queryset(self.get_queryset()))
+
+    def row_queryset(self, queryset):
+        """queryset as the values() rows of row_reader"""
+        return queryset.prefetch_related(None).values(
+            *self.row_reader.fields
+        )
+
+    def row_response(self, queryset):
+        """The (paginated) response of the rows of queryset"""
+        queryset = self.row_queryset(queryset)
+
+        page = self.paginate_queryset(queryset)
+        rows = list(queryset) if page is None else page
+        with metrics.serializing():
+            data = self.row_reader.represent(rows)
+
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
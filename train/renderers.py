@@ -0,0 +1,57 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer encoding with one encoder built at import time.
+
+    JSONRenderer builds a JSONEncoder per response through json.dumps.
+    The bytes are the same, indented responses are left to JSONRenderer.
+    """
+
+    _encode = JSONEncoder(
+        ensure_ascii=JSONRenderer.ensure_ascii,
+        allow_nan=not JSONRenderer.strict,
+        separators=(",", ":") if JSONRenderer.compact else (", ", ": "),
+    ).encode
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None:
+            return super(FastJSONRenderer, self).render(
+                data, accepted_media_type, renderer_context
+            )
+
+        # like JSONRenderer: U+2028 and U+2029 are not valid in JavaScript
+        return self._encode(data).replace(
+            "\u2028", "\\u2028"
+        ).replace("\u2029", "\\u2029").encode()
+
+
+def fast_renderer_classes():
+    """The default renderers with FastJSONRenderer for JSONRenderer"""
+    return [
+        FastJSONRenderer if renderer is JSONRenderer else renderer
+        for renderer in api_settings.DEFAULT_RENDERER_CLASSES
+    ]
+
+
+class SeatMapBinaryRenderer(BaseRenderer):
+    """Renders a seat map as the raw packed bitmap."""
+
+    media_type = "application/octet-stream"
+    # the attribute DRF negotiates ?format= on
+    format = "bin"  # noqa: VNE003
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, (bytes, bytearray)):
+            return bytes(data)
+
+        # errors (404, 401, ...) are still reported as JSON
+        return JSONRenderer().render(data)
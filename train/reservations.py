@@ -0,0 +1,194 @@
+"""Seat inventory: holds with a TTL and bookings.
+
+Every write to the seats of a trip locks the trip row first
+(SELECT ... FOR UPDATE), which makes the trip the unit of inventory:
+bookings of different trips never wait for each other, bookings of the
+same trip are serialized instead of racing into the unique constraint.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from train.models import Order, SeatHold, Ticket, Trip
+
+SEAT_SOLD_MESSAGE = "The fields trip, cargo, seat must make a unique set."
+SEAT_HELD_MESSAGE = "The seat is held by another passenger."
+
+
+def lock_trips(trip_ids):
+    # a stable lock order keeps concurrent multi-trip bookings
+    # from deadlocking
+    list(
+        Trip.objects.select_for_update().filter(
+            pk__in=trip_ids
+        ).order_by("pk").values_list("pk", flat=True)
+    )
+
+
+def _seats_filter(seats, prefix=""):
+    condition = Q()
+    for trip_id, cargo, seat in seats:
+        condition |= Q(
+            **{
+                f"{prefix}trip_id": trip_id,
+                f"{prefix}cargo": cargo,
+                f"{prefix}seat": seat,
+            }
+        )
+    return condition
+
+
+def find_unavailable_seats(seats, user=None):
+    """Map each sold or held (by someone else than user) seat
+    of the (trip_id, cargo, seat) seats to the reason it is unavailable.
+    """
+    seats = set(seats)
+    if not seats:
+        return {}
+
+    unavailable = {}
+    held = SeatHold.objects.filter(
+        _seats_filter(seats), expires_at__gt=timezone.now()
+    )
+    if user is not None:
+        held = held.exclude(user=user)
+    for seat in held.order_by().values_list("trip_id", "cargo", "seat"):
+        unavailable[seat] = SEAT_HELD_MESSAGE
+
+    sold = Ticket.objects.filter(_seats_filter(seats))
+    for seat in sold.order_by().values_list("trip_id", "cargo", "seat"):
+        unavailable[seat] = SEAT_SOLD_MESSAGE
+
+    return unavailable
+
+
+def _raise_for_unavailable(seats, unavailable):
+    raise ValidationError(
+        [
+            {"non_field_errors": [unavailable[seat]]}
+            if seat in unavailable else {}
+            for seat in seats
+        ]
+    )
+
+
+def hold_seats(user, trip, seats, ttl=None):
+    """Reserve the (cargo, seat) seats of trip for user.
+
+    Holds the user already has on these seats are extended.
+    Raises ValidationError with one entry per seat if any is taken.
+    """
+    expires_at = timezone.now() + (ttl or settings.SEAT_HOLD_TTL)
+    seats = [(trip.id, cargo, seat) for cargo, seat in seats]
+
+    with transaction.atomic():
+        lock_trips([trip.id])
+        SeatHold.objects.filter(
+            trip=trip, expires_at__lte=timezone.now()
+        ).delete()
+
+        unavailable = find_unavailable_seats(seats, user)
+        if unavailable:
+            _raise_for_unavailable(seats, unavailable)
+
+        own = SeatHold.objects.filter(_seats_filter(seats), user=user)
+        own.update(expires_at=expires_at)
+        extended = set(own.values_list("trip_id", "cargo", "seat"))
+        SeatHold.objects.bulk_create(
+            SeatHold(
+                trip=trip,
+                cargo=cargo,
+                seat=seat,
+                user=user,
+                expires_at=expires_at
+            )
+            for trip_id, cargo, seat in dict.fromkeys(seats)
+            if (trip_id, cargo, seat) not in extended
+        )
+
+        return list(SeatHold.objects.filter(_seats_filter(seats)))
+
+
+def book_tickets(user, tickets_data):
+    """Create an order of user with the tickets, consuming user's holds.
+
+    tickets_data are dicts with trip (a Trip), cargo and seat
+    that already passed Ticket.validate_ticket.
+    """
+    seats = [
+        (ticket_data["trip"].id, ticket_data["cargo"], ticket_data["seat"])
+        for ticket_data in tickets_data
+    ]
+
+    with transaction.atomic():
+        lock_trips({trip_id for trip_id, cargo, seat in seats})
+
+        unavailable = find_unavailable_seats(seats, user)
+        if unavailable:
+            _raise_for_unavailable(seats, unavailable)
+
+        order = Order.objects.create(user=user)
+        try:
+            with transaction.atomic():
+                tickets = Ticket.objects.bulk_create(
+                    Ticket(order=order, **ticket_data)
+                    for ticket_data in tickets_data
+                )
+        except IntegrityError:
+            # tickets written around the inventory lock, e.g. by an admin
+            _raise_for_unavailable(
+                seats, dict.fromkeys(seats, SEAT_SOLD_MESSAGE)
+            )
+
+        SeatHold.objects.filter(_seats_filter(seats), user=user).delete()
+        Trip.adjust_sold_seats(
+            Counter((ticket.trip_id, ticket.cargo) for ticket in tickets)
+        )
+
+        return order
+
+
+def confirm_holds(user, trip=None):
+    """Turn the live holds of user (on trip only, if given) into an order.
+
+    Returns None if there is nothing to confirm.
+    """
+    with transaction.atomic():
+        holds = SeatHold.objects.select_related("trip").filter(
+            user=user, expires_at__gt=timezone.now()
+        )
+        if trip is not None:
+            holds = holds.filter(trip=trip)
+        tickets_data = [
+            {"trip": hold.trip, "cargo": hold.cargo, "seat": hold.seat}
+            for hold in holds.order_by("trip_id", "cargo", "seat")
+        ]
+        if not tickets_data:
+            return None
+
+        return book_tickets(user, tickets_data)
+
+
+def release_expired_holds(batch_size=1000):
+    """Delete expired holds in batches, returns how many were deleted.
+
+    Rows locked by a concurrent booking are skipped (SKIP LOCKED),
+    so several workers can sweep at the same time without waiting.
+    """
+    released = 0
+    while True:
+        with transaction.atomic():
+            expired = list(
+                SeatHold.objects.select_for_update(
+                    skip_locked=True
+                ).filter(
+                    expires_at__lte=timezone.now()
+                ).order_by().values_list("pk", flat=True)[:batch_size]
+            )
+            if not expired:
+                return released
+            released += SeatHold.objects.filter(pk__in=expired).delete()[0]
@@ -0,0 +1,66 @@
+import base64
+
+from django.utils import timezone
+
+
+class SeatMap:
+    """Packed bitmap of the taken seats of a trip.
+
+    Seat ``(cargo, seat)`` maps to bit
+    ``(cargo - 1) * places_in_cargo + (seat - 1)``, bits are packed
+    most significant first, a set bit means the seat is taken
+    (sold or held).
+    """
+
+    def __init__(self, cargo_num: int, places_in_cargo: int):
+        self.cargo_num = cargo_num
+        self.places_in_cargo = places_in_cargo
+        self.taken = 0
+        self._bits = bytearray((cargo_num * places_in_cargo + 7) // 8)
+
+    @classmethod
+    def for_trip(cls, trip):
+        seat_map = cls(trip.train.cargo_num, trip.train.places_in_cargo)
+        taken = trip.tickets.order_by().values_list("cargo", "seat").union(
+            trip.holds.filter(
+                expires_at__gt=timezone.now()
+            ).order_by().values_list("cargo", "seat"),
+            all=True
+        )
+        for cargo, seat in taken:
+            try:
+                seat_map.take(cargo, seat)
+            except IndexError:
+                # the train was resized after the ticket was sold
+                continue
+        return seat_map
+
+    @property
+    def capacity(self) -> int:
+        return self.cargo_num * self.places_in_cargo
+
+    def _position(self, cargo, seat):
+        if not (
+            1 <= cargo <= self.cargo_num
+            and 1 <= seat <= self.places_in_cargo
+        ):
+            raise IndexError(f"No seat {seat} in cargo {cargo}")
+        return (cargo - 1) * self.places_in_cargo + (seat - 1)
+
+    def take(self, cargo, seat):
+        position = self._position(cargo, seat)
+        mask = 0x80 >> (position % 8)
+        if not self._bits[position // 8] & mask:
+            self._bits[position // 8] |= mask
+            self.taken += 1
+
+    def is_taken(self, cargo, seat) -> bool:
+        position = self._position(cargo, seat)
+        return bool(self._bits[position // 8] & (0x80 >> (position % 8)))
+
+    def to_bytes(self) -> bytes:
+        return bytes(self._bits)
+
+    @property
+    def bitmap(self) -> str:
+        return base64.b64encode(self._bits).decode("ascii")
@@ -1,6 +1,10 @@
-from django.db import transaction
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
+from rest_framework.relations import MANY_RELATION_KWARGS
 
 from train.models import (
     Ticket,
@@ -10,11 +14,57 @@ from train.models import (
     Route,
     Station,
     Order,
-    Crew
+    Crew,
+    SeatHold
 )
+from train.reservations import SEAT_SOLD_MESSAGE, book_tickets, hold_seats
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """ManyRelatedField looking all the primary keys up in one query.
+
+    ManyRelatedField runs a query per key. Input the child cannot take
+    as is (a custom pk_field, keys of the wrong type, unknown keys) goes
+    through it all the same, for its error messages.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, "__iter__"):
+            self.fail("not_a_list", input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail("empty")
+
+        child = self.child_relation
+        queryset = child.get_queryset()
+        try:
+            if child.pk_field is not None or any(
+                    isinstance(item, bool) for item in data
+            ):
+                raise TypeError
+            keys = [queryset.model._meta.pk.to_python(item) for item in data]
+        except (TypeError, DjangoValidationError):
+            return super().to_internal_value(data)
+
+        objects = queryset.in_bulk(keys)
+        if len(objects) < len(set(keys)):
+            return super().to_internal_value(data)
+        return [objects[key] for key in keys]
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """PrimaryKeyRelatedField whose many=True is a BulkManyRelatedField"""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {"child_relation": cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
 
 
 class CrewSerializer(serializers.ModelSerializer):
+    serializer_related_field = BulkPrimaryKeyRelatedField
 
     class Meta:
         model = Crew
@@ -39,6 +89,21 @@ class StationSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
+class NearbyStationsSearchSerializer(serializers.Serializer):
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lon = serializers.FloatField(min_value=-180, max_value=180)
+    radius_km = serializers.FloatField(
+        default=10,
+        min_value=0,
+        max_value=1000
+    )
+    limit = serializers.IntegerField(default=10, min_value=1, max_value=100)
+
+
+class NearbyStationSerializer(StationSerializer):
+    distance_km = serializers.FloatField(read_only=True)
+
+
 class TrainSerializer(serializers.ModelSerializer):
     class Meta:
         model = Train
@@ -78,6 +143,8 @@ class RouteListOrRetrieveSerializers(RouteSerializer):
 
 
 class TripSerializer(serializers.ModelSerializer):
+    serializer_related_field = BulkPrimaryKeyRelatedField
+
     class Meta:
         model = Trip
         fields = (
@@ -100,6 +167,11 @@ class TripListOrRetrieveSerializer(TripSerializer):
     train = serializers.CharField(source="train.name", read_only=True)
     crews = CrewForTripSerializer(many=True, read_only=True)
     tickets_available = serializers.IntegerField(read_only=True)
+    free_seats_by_cargo = serializers.DictField(
+        child=serializers.IntegerField(),
+        read_only=True,
+        help_text="Free seats of every cargo, by cargo number"
+    )
 
     class Meta(TripSerializer.Meta):
         fields = (
@@ -109,10 +181,57 @@ class TripListOrRetrieveSerializer(TripSerializer):
             "departure_time",
             "arrival_time",
             "crews",
-            "tickets_available"
+            "tickets_available",
+            "free_seats_by_cargo"
         )
 
 
+class TripSearchSerializer(serializers.Serializer):
+    source = serializers.IntegerField(help_text="Station id")
+    destination = serializers.IntegerField(help_text="Station id")
+    departure_after = serializers.DateTimeField()
+    departure_before = serializers.DateTimeField(
+        required=False,
+        help_text="Exclusive, a day after departure_after by default"
+    )
+    min_seats = serializers.IntegerField(default=1, min_value=1)
+    train_type = serializers.IntegerField(
+        required=False,
+        help_text="Train type id"
+    )
+
+    def validate(self, attrs):
+        departure_after = attrs["departure_after"]
+        departure_before = attrs.setdefault(
+            "departure_before", departure_after + timedelta(days=1)
+        )
+        if departure_before <= departure_after:
+            raise ValidationError(
+                {"departure_before": "departure_before must be "
+                                     "after departure_after"}
+            )
+        if departure_before - departure_after > (
+                settings.TRIP_SEARCH_MAX_WINDOW
+        ):
+            raise ValidationError(
+                {"departure_before": "The departure window is at most "
+                                     f"{settings.TRIP_SEARCH_MAX_WINDOW.days}"
+                                     " days"}
+            )
+        return attrs
+
+
+class TripSeatMapSerializer(serializers.Serializer):
+    cargo_num = serializers.IntegerField(read_only=True)
+    places_in_cargo = serializers.IntegerField(read_only=True)
+    taken = serializers.IntegerField(read_only=True)
+    bitmap = serializers.CharField(
+        read_only=True,
+        help_text="Base64 of the packed bitmap of taken seats, "
+                  "one bit per seat, cargo by cargo, MSB first"
+    )
+
+
 class TicketSerializer(serializers.ModelSerializer):
     def validate(self, attrs):
         data = super(TicketSerializer, self).validate(attrs=attrs)
@@ -133,20 +252,91 @@ class TicketListSerializer(TicketSerializer):
     trip = TripListOrRetrieveSerializer(many=False, read_only=True)
 
 
+class TicketBulkListSerializer(serializers.ListSerializer):
+    """Validates a whole booking with one query for the trips (and their
+    trains). Seat availability is checked under the inventory lock
+    when the order is booked, see train.reservations.book_tickets.
+    """
+
+    def to_internal_value(self, data):
+        # errors raised from validate() would be collapsed
+        # into non_field_errors, these are reported per seat
+        tickets = super(TicketBulkListSerializer, self).to_internal_value(
+            data
+        )
+        trips = Trip.objects.select_related("train").in_bulk(
+            {ticket["trip_id"] for ticket in tickets}
+        )
+        errors = [{} for _ in tickets]
+        seats = set()
+
+        for error, ticket in zip(errors, tickets):
+            trip = trips.get(ticket["trip_id"])
+            if trip is None:
+                error["trip"] = [
+                    serializers.PrimaryKeyRelatedField.default_error_messages[
+                        "does_not_exist"
+                    ].format(pk_value=ticket["trip_id"])
+                ]
+                continue
+
+            try:
+                Ticket.validate_ticket(
+                    ticket["cargo"],
+                    ticket["seat"],
+                    trip.train,
+                    ValidationError
+                )
+            except ValidationError as exc:
+                error.update(serializers.as_serializer_error(exc))
+                continue
+
+            seat = (trip.id, ticket["cargo"], ticket["seat"])
+            if seat in seats:
+                error["non_field_errors"] = [SEAT_SOLD_MESSAGE]
+            seats.add(seat)
+
+        if any(errors):
+            raise ValidationError(errors)
+
+        for ticket in tickets:
+            ticket["trip"] = trips[ticket.pop("trip_id")]
+
+        return tickets
+
+
+class TicketBulkSerializer(TicketSerializer):
+    trip = serializers.IntegerField(source="trip_id")
+
+    class Meta(TicketSerializer.Meta):
+        # seats are checked for the whole booking at once
+        # by TicketBulkListSerializer
+        validators = []
+        list_serializer_class = TicketBulkListSerializer
+
+    def validate(self, attrs):
+        return attrs
+
+
 class OrderSerializer(serializers.ModelSerializer):
-    tickets = TicketSerializer(many=True, read_only=False, allow_empty=False)
+    tickets = TicketBulkSerializer(
+        many=True,
+        read_only=False,
+        allow_empty=False
+    )
 
     class Meta:
         model = Order
         fields = ("id", "tickets", "created_at")
 
     def create(self, validated_data):
-        with transaction.atomic():
-            tickets_data = validated_data.pop("tickets")
-            order = Order.objects.create(**validated_data)
-            for ticket_data in tickets_data:
-                Ticket.objects.create(order=order, **ticket_data)
-            return order
+        try:
+            return book_tickets(
+                validated_data["user"],
+                validated_data["tickets"]
+            )
+        except ValidationError as exc:
+            raise ValidationError({"tickets": exc.detail})
 
 
 class OrderListSerializer(OrderSerializer):
@@ -164,3 +354,123 @@ class TrainTypeListOrRetrieveSerializer(TrainTypeSerializer):
             "name",
             "trains"
         )
+
+
+class SeatHoldSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SeatHold
+        fields = ("id", "trip", "cargo", "seat", "expires_at")
+        read_only_fields = fields
+
+
+class SeatSerializer(serializers.Serializer):
+    cargo = serializers.IntegerField()
+    seat = serializers.IntegerField()
+
+
+class HoldSeatsSerializer(serializers.Serializer):
+    trip = serializers.PrimaryKeyRelatedField(
+        queryset=Trip.objects.select_related("train")
+    )
+    seats = SeatSerializer(many=True, allow_empty=False)
+
+    def validate(self, attrs):
+        errors = []
+        for seat in attrs["seats"]:
+            try:
+                Ticket.validate_ticket(
+                    seat["cargo"],
+                    seat["seat"],
+                    attrs["trip"].train,
+                    ValidationError
+                )
+            except ValidationError as exc:
+                errors.append(serializers.as_serializer_error(exc))
+            else:
+                errors.append({})
+
+        if any(errors):
+            raise ValidationError({"seats": errors})
+
+        return attrs
+
+    def create(self, validated_data):
+        try:
+            return hold_seats(
+                validated_data["user"],
+                validated_data["trip"],
+                [(seat["cargo"], seat["seat"])
+                 for seat in validated_data["seats"]]
+            )
+        except ValidationError as exc:
+            raise ValidationError({"seats": exc.detail})
+
+
+class JourneySearchSerializer(serializers.Serializer):
+    source = serializers.PrimaryKeyRelatedField(
+        queryset=Station.objects.all()
+    )
+    destination = serializers.PrimaryKeyRelatedField(
+        queryset=Station.objects.all()
+    )
+    departure = serializers.DateTimeField(required=False)
+    min_connection = serializers.IntegerField(
+        required=False,
+        min_value=0,
+        help_text="Minutes needed to change trains"
+    )
+    max_transfers = serializers.IntegerField(
+        default=3,
+        min_value=0,
+        max_value=5
+    )
+
+    def validate(self, attrs):
+        if attrs["source"] == attrs["destination"]:
+            raise ValidationError(
+                {"destination": "destination must differ from source"}
+            )
+        return attrs
+
+
+class JourneyLegSerializer(serializers.ModelSerializer):
+    trip = serializers.IntegerField(source="id", read_only=True)
+    source = serializers.CharField(source="route.source.name", read_only=True)
+    destination = serializers.CharField(
+        source="route.destination.name",
+        read_only=True
+    )
+    train = serializers.CharField(source="train.name", read_only=True)
+
+    class Meta:
+        model = Trip
+        fields = (
+            "trip",
+            "route",
+            "source",
+            "destination",
+            "train",
+            "departure_time",
+            "arrival_time"
+        )
+
+
+class ItinerarySerializer(serializers.Serializer):
+    departure_time = serializers.DateTimeField(read_only=True)
+    arrival_time = serializers.DateTimeField(read_only=True)
+    transfers = serializers.IntegerField(read_only=True)
+    legs = JourneyLegSerializer(many=True, read_only=True)
+
+
+class JourneySerializer(serializers.Serializer):
+    earliest_arrival = ItinerarySerializer(read_only=True, allow_null=True)
+    fewest_transfers = ItinerarySerializer(read_only=True, allow_null=True)
+
+
+class ExportSerializer(serializers.Serializer):
+    output = serializers.ChoiceField(
+        choices=["csv", "ndjson"],
+        default="csv"
+    )
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
@@ -0,0 +1,52 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from train.journeys import journey_index
+from train.models import (
+    Order,
+    Route,
+    Station,
+    TableVersion,
+    Train,
+    TrainType,
+    Trip
+)
+
+
+@receiver(pre_delete, sender=Order)
+def release_order_seats(sender, instance, **kwargs):
+    # the tickets of the order are then fast-deleted, see Ticket.objects
+    instance.tickets.release_seats()
+
+
+@receiver(post_save, sender=Trip)
+def index_trip(sender, instance, **kwargs):
+    trip_id = instance.pk
+    transaction.on_commit(lambda: journey_index.update_trip(trip_id))
+
+
+@receiver(post_delete, sender=Trip)
+def unindex_trip(sender, instance, **kwargs):
+    trip_id = instance.pk
+    transaction.on_commit(lambda: journey_index.remove_trip(trip_id))
+
+
+@receiver(post_save, sender=Route)
+@receiver(post_delete, sender=Route)
+def reindex_routes(sender, **kwargs):
+    transaction.on_commit(journey_index.invalidate)
+
+
+@receiver(post_save, sender=Station)
+@receiver(post_delete, sender=Station)
+@receiver(post_save, sender=TrainType)
+@receiver(post_delete, sender=TrainType)
+@receiver(post_save, sender=Train)
+@receiver(post_delete, sender=Train)
+@receiver(post_save, sender=Route)
+@receiver(post_delete, sender=Route)
+@receiver(post_save, sender=Trip)
+@receiver(post_delete, sender=Trip)
+def bump_table_version(sender, **kwargs):
+    TableVersion.bump_on_commit(sender)
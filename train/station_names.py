@@ -0,0 +1,146 @@
+"""Station name search: resolves what a user typed to station ids.
+
+Names are compared in a normalized form: casefolded, Ukrainian Cyrillic
+transliterated to Latin (the official 2010 scheme, so "Київ" is "kyiv")
+and diacritics stripped, so "КИЇВ", "Kyiv" and "kyïv" are all the same
+name. A query matches the names that start with it, or one of whose
+words does ("pas" finds "Kyiv-Pasazhyrskyi"); only when none does it is
+matched fuzzily ("Kiev" finds "Kyiv").
+
+The index is built once per process and kept in memory. It is tagged
+with the TableVersion of Station, read from the database and bumped by
+every transaction writing stations, so it is rebuilt after writes made
+by any process.
+"""
+import bisect
+import difflib
+import re
+import threading
+import unicodedata
+
+from django.conf import settings
+
+from train.cache import model_version
+from train.models import Station
+
+TRANSLITERATION = {
+    "а": "a", "б": "b", "в": "v", "г": "h", "ґ": "g", "д": "d", "е": "e",
+    "є": "ie", "ж": "zh", "з": "z", "и": "y", "і": "i", "ї": "i", "й": "i",
+    "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p", "р": "r",
+    "с": "s", "т": "t", "у": "u", "ф": "f", "х": "kh", "ц": "ts",
+    "ч": "ch", "ш": "sh", "щ": "shch", "ь": "", "ю": "iu", "я": "ia",
+    # Russian spellings still found in old timetables
+    "ё": "e", "ы": "y", "э": "e", "ъ": "",
+}
+# at the start of a word
+INITIAL_TRANSLITERATION = {
+    "є": "ye", "ї": "yi", "й": "y", "ю": "yu", "я": "ya",
+}
+APOSTROPHES = re.compile("['’ʼ`]")
+SEPARATORS = re.compile(r"[\W_]+")
+
+
+def _transliterate(text):
+    letters = []
+    previous = ""
+    for letter in text:
+        if not previous.isalpha():
+            latin = INITIAL_TRANSLITERATION.get(letter)
+        elif letter == "г" and previous == "з":
+            # зг is zgh, not zh
+            latin = "gh"
+        else:
+            latin = None
+        if latin is None:
+            latin = TRANSLITERATION.get(letter, letter)
+        letters.append(latin)
+        if not APOSTROPHES.match(letter):
+            previous = letter
+    return "".join(letters)
+
+
+def normalize(name):
+    """Searchable form of a station name, "" if it has no letters or
+    digits"""
+    text = _transliterate(name.casefold())
+    text = "".join(
+        letter for letter in unicodedata.normalize("NFKD", text)
+        if not unicodedata.combining(letter)
+    )
+    text = APOSTROPHES.sub("", text)
+    return SEPARATORS.sub(" ", text).strip()
+
+
+class StationNameIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        # sorted (normalized name from one of its words on, station id)
+        self._keys = []
+        # names and their words, the candidates of fuzzy matching
+        self._ids_by_term = {}
+
+    def _load(self, version):
+        keys = []
+        ids_by_term = {}
+        for station_id, name in Station.objects.values_list("id", "name"):
+            name = normalize(name)
+            if not name:
+                continue
+            words = name.split(" ")
+            for term in {name, *words}:
+                ids_by_term.setdefault(term, set()).add(station_id)
+            for start in range(len(words)):
+                keys.append((" ".join(words[start:]), station_id))
+        keys.sort()
+        self._keys = keys
+        self._ids_by_term = ids_by_term
+        self._version = version
+
+    def _current(self):
+        version = model_version(Station)
+        with self._lock:
+            if version != self._version:
+                self._load(version)
+            return self._keys, self._ids_by_term
+
+    def invalidate(self):
+        with self._lock:
+            self._version = None
+
+    def resolve(self, query):
+        """Ids of the stations whose name starts with query, or failing
+        that of the closest names or words, an empty set if none is
+        close"""
+        return self.resolve_all([query])[0]
+
+    def resolve_all(self, queries):
+        """resolve of each of queries, the version is read once"""
+        keys, ids_by_term = self._current()
+        return [self._resolve(query, keys, ids_by_term) for query in queries]
+
+    @staticmethod
+    def _resolve(query, keys, ids_by_term):
+        query = normalize(query)
+        if not query:
+            return set()
+
+        ids = set()
+        position = bisect.bisect_left(keys, (query,))
+        while position < len(keys) and keys[position][0].startswith(query):
+            ids.add(keys[position][1])
+            position += 1
+        if ids:
+            return ids
+
+        for term in difflib.get_close_matches(
+                query,
+                ids_by_term,
+                n=settings.STATION_NAME_FUZZY_MATCHES,
+                cutoff=settings.STATION_NAME_FUZZY_CUTOFF
+        ):
+            ids |= ids_by_term[term]
+        return ids
+
+
+station_names = StationNameIndex()
@@ -0,0 +1,126 @@
+"""Guard against queries whose number grows with the data (N+1).
+
+Every case builds its data for 1 and 100 objects in a
+savepoint that is rolled back, counts the queries of one request and
+fails if the counts differ or exceed the pinned maximum.
+
+A case marked known_n_plus_one is still held to its pin for 1 object, and
+fails once its count stops growing, until the mark is removed.
+"""
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from train.journeys import journey_index
+from train.station_names import station_names
+
+QueryCountCase = namedtuple(
+    "QueryCountCase",
+    [
+        "name",
+        "method",
+        "path",
+        "data",
+        "setup",
+        "max_queries",
+        "known_n_plus_one",
+    ]
+)
+
+
+def query_count_case(name, method, path, setup, max_queries, data=None,
+                     known_n_plus_one=False):
+    """path and data are callables of the context returned by setup(size)"""
+    return QueryCountCase(
+        name, method, path, data, setup, max_queries, known_n_plus_one
+    )
+
+
+class QueryCountTestMixin:
+    sizes = (1, 100)
+
+    def request_queries(self, case, context):
+        # no cached payloads, throttle history or in-process indexes
+        cache.clear()
+        journey_index.invalidate()
+        station_names.invalidate()
+        if "user" in context:
+            self.client.force_authenticate(context["user"])
+
+        data = case.data(context) if case.data else None
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, case.method)(
+                case.path(context), data, format="json"
+            )
+            if response.streaming:
+                b"".join(response.streaming_content)
+
+        self.assertLess(
+            response.status_code,
+            400,
+            f"{case.name} failed: {getattr(response, 'data', '')}"
+        )
+        return queries
+
+    def query_counts(self, case):
+        """{size: queries} of the request, and the queries of the last"""
+        counts = {}
+        for size in self.sizes:
+            with transaction.atomic():
+                queries = self.request_queries(case, case.setup(size))
+                counts[size] = len(queries)
+                transaction.set_rollback(True)
+        return counts, queries
+
+    def assert_query_count_constant(self, case):
+        counts, queries = self.query_counts(case)
+        smallest, largest = counts[self.sizes[0]], counts[self.sizes[-1]]
+        self.assertEqual(
+            smallest,
+            largest,
+            f"{case.name}: {smallest} queries for {self.sizes[0]} objects, "
+            f"{largest} for {self.sizes[-1]}. Last queries:\n"
+            + "\n".join(
+                query["sql"] for query in queries.captured_queries[-5:]
+            )
+        )
+        self.assertLessEqual(
+            smallest,
+            case.max_queries,
+            f"{case.name}: {smallest} queries, pinned at {case.max_queries}"
+        )
+
+    def assert_known_n_plus_one(self, case):
+        counts, queries = self.query_counts(case)
+        smallest, largest = counts[self.sizes[0]], counts[self.sizes[-1]]
+        self.assertLessEqual(
+            smallest,
+            case.max_queries,
+            f"{case.name}: {smallest} queries for {self.sizes[0]} objects, "
+            f"pinned at {case.max_queries}"
+        )
+        self.assertGreater(
+            largest,
+            smallest,
+            f"{case.name} no longer grows with the data, "
+            "remove its known_n_plus_one mark"
+        )
+
+
+def generate_tests(cases):
+    """Class decorator adding a test_<case name> method per case"""
+    def decorator(cls):
+        for case in cases:
+            def test(self, case=case):
+                if case.known_n_plus_one:
+                    self.assert_known_n_plus_one(case)
+                else:
+                    self.assert_query_count_constant(case)
+
+            test.__name__ = f"test_{case.name}"
+            setattr(cls, test.__name__, test)
+        return cls
+
+    return decorator
@@ -0,0 +1,228 @@
+import asyncio
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import AsyncClient, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from train.async_views import (
+    AsyncStationListView,
+    AsyncTripListView,
+    AsyncTripSeatsView
+)
+from train.models import (
+    Order,
+    Ticket,
+    Trip,
+    Route,
+    Station,
+    TrainType,
+    Train
+)
+
+TRIP_URL = reverse("train:trip-list")
+ASYNC_TRIP_URL = reverse("train:async-trip-list")
+STATION_URL = reverse("train:station-list")
+ASYNC_STATION_URL = reverse("train:async-station-list")
+
+
+def seats_url(trip_id):
+    return reverse("train:trip-seats", args=[trip_id])
+
+
+def async_seats_url(trip_id):
+    return reverse("train:async-trip-seats", args=[trip_id])
+
+
+def sample_trip(**params):
+    route = Route.objects.create(
+        source=Station.objects.create(name="Lviv", latitude=1, longitude=1),
+        destination=Station.objects.create(
+            name="Kyiv", latitude=2, longitude=2
+        ),
+        distance=3
+    )
+    train = Train.objects.create(
+        name="tr1",
+        cargo_num=2,
+        places_in_cargo=4,
+        train_type=TrainType.objects.create(name="type1")
+    )
+    defaults = {
+        "route": route,
+        "train": train,
+        "departure_time": "2023-12-08T19:54:28+02:00",
+        "arrival_time": "2023-12-10T19:54:28+02:00",
+    }
+    defaults.update(params)
+
+    return Trip.objects.create(**defaults)
+
+
+class AsyncViewsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        self.trip = sample_trip()
+        Trip.objects.create(
+            route=self.trip.route,
+            train=self.trip.train,
+            departure_time="2023-12-09T10:00:00+02:00",
+            arrival_time="2023-12-09T20:00:00+02:00",
+        )
+        Ticket.objects.create(
+            trip=self.trip,
+            order=Order.objects.create(user=self.user),
+            cargo=2,
+            seat=3
+        )
+
+    def test_trip_list_matches_sync_view(self):
+        for query in ("", "?departure_time=2023-12-09"):
+            sync = self.client.get(TRIP_URL + query)
+            res = self.client.get(ASYNC_TRIP_URL + query)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res.content, sync.content)
+
+        sync = self.client.get(TRIP_URL + "?limit=1&offset=1")
+        res = self.client.get(ASYNC_TRIP_URL + "?limit=1&offset=1")
+        self.assertEqual(res.data["results"], sync.data["results"])
+        self.assertEqual(res.data["count"], 2)
+
+    def test_seat_map_matches_sync_view(self):
+        for query in ("", "?format=bin"):
+            sync = self.client.get(seats_url(self.trip.id) + query)
+            res = self.client.get(async_seats_url(self.trip.id) + query)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res.content, sync.content)
+            self.assertEqual(res["Content-Type"], sync["Content-Type"])
+
+    def test_seat_map_of_unknown_trip(self):
+        res = self.client.get(async_seats_url(0))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_station_list_is_served_from_cache(self):
+        sync = self.client.get(STATION_URL + "?name=ly")
+        first = self.client.get(ASYNC_STATION_URL + "?name=ly")
+
+        # the table versions only
+        with self.assertNumQueries(1):
+            second = self.client.get(ASYNC_STATION_URL + "?name=ly")
+
+        self.assertEqual(first.content, sync.content)
+        self.assertEqual(second.content, sync.content)
+
+        res = self.client.get(
+            ASYNC_STATION_URL + "?name=ly",
+            HTTP_IF_NONE_MATCH=second["ETag"]
+        )
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_station_list_pages_match_sync_view(self):
+        Station.objects.create(name="Lutsk", latitude=3, longitude=3)
+
+        for query in ("?limit=1", "?limit=1&offset=1", "?name=l&limit=2"):
+            sync = self.client.get(STATION_URL + query)
+            res = self.client.get(ASYNC_STATION_URL + query)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res.data["results"], sync.data["results"])
+            self.assertEqual(res.data["count"], sync.data["count"])
+
+    def test_trip_list_runs_the_queries_of_sync_view(self):
+        with CaptureQueriesContext(connection) as sync:
+            self.client.get(TRIP_URL + "?limit=1")
+        with CaptureQueriesContext(connection) as res:
+            self.client.get(ASYNC_TRIP_URL + "?limit=1")
+
+        self.assertEqual(
+            [query["sql"] for query in res.captured_queries],
+            [query["sql"] for query in sync.captured_queries]
+        )
+
+    def test_views_are_coroutine_functions(self):
+        for view in (
+            AsyncTripListView,
+            AsyncTripSeatsView,
+            AsyncStationListView
+        ):
+            self.assertTrue(asyncio.iscoroutinefunction(view.as_view()))
+
+    def test_writes_are_rejected(self):
+        admin = get_user_model().objects.create_superuser(
+            "admin@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(admin)
+
+        res = self.client.post(ASYNC_STATION_URL, {"name": "Odesa"})
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_auth_required(self):
+        res = APIClient().get(ASYNC_TRIP_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class AsgiRequestTests(TestCase):
+    """The views through the ASGI handler, with a JWT.
+
+    AsyncClient of Django 4.0 takes the raw header names.
+    """
+
+    def setUp(self):
+        cache.clear()
+        user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.trip = sample_trip()
+        self.auth = f"Bearer {AccessToken.for_user(user)}"
+
+    async def test_trip_list(self):
+        res = await AsyncClient().get(
+            ASYNC_TRIP_URL, AUTHORIZATION=self.auth
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()[0]["id"], self.trip.id)
+        self.assertEqual(res.json()[0]["tickets_available"], 8)
+
+    async def test_seat_map(self):
+        res = await AsyncClient().get(
+            async_seats_url(self.trip.id) + "?format=bin",
+            AUTHORIZATION=self.auth
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.content, bytes(1))
+
+    async def test_station_list(self):
+        res = await AsyncClient().get(
+            ASYNC_STATION_URL, AUTHORIZATION=self.auth
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [station["name"] for station in res.json()], ["Lviv", "Kyiv"]
+        )
+
+    async def test_anonymous(self):
+        res = await AsyncClient().get(ASYNC_STATION_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
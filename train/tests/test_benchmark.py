@@ -0,0 +1,76 @@
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import call_command, CommandError
+from django.test import TestCase
+
+from train import benchmark
+from train.models import Order, Ticket, Trip
+
+
+class BenchmarkTests(TestCase):
+    def setUp(self):
+        benchmark.seed(scale=0.0005, batch_size=20, log=lambda message: None)
+
+    def test_seed(self):
+        self.assertEqual(Trip.objects.count(), 50)
+        self.assertGreater(Ticket.objects.count(), 0)
+        for trip in Trip.objects.all():
+            self.assertEqual(trip.sold_count, trip.tickets.count())
+        # the cargo summary matches the tickets too
+        call_command(
+            "rebuild_sold_counts", "--check", stdout=io.StringIO()
+        )
+
+    def test_report(self):
+        orders = Order.objects.count()
+
+        report = benchmark.run(
+            iterations=2, warmup=1, order_sizes=(1, 3), log=lambda m: None
+        )
+
+        self.assertEqual(
+            set(report["results"]),
+            {
+                "trip_list",
+                "trip_list_deep_offset",
+                "trip_list_cursor",
+                "trip_list_by_departure_day",
+                "ticket_list_by_trips",
+                "order_list",
+                "order_create_1_tickets",
+                "order_create_3_tickets",
+            }
+        )
+        for result in report["results"].values():
+            self.assertGreater(result["queries"], 0)
+            self.assertEqual(
+                set(result["latency_ms"]),
+                {"p50", "p90", "p95", "p99", "min", "max", "mean"}
+            )
+        self.assertEqual(report["meta"]["rows"]["trip"], 50)
+        self.assertEqual(Order.objects.count(), orders)
+
+    def test_command_fails_on_regression(self):
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = os.path.join(directory, "baseline.json")
+            call_command(
+                "benchmark", "--iterations", "1", "--warmup", "0",
+                "--case", "order_list", "--output", baseline,
+                stderr=io.StringIO(),
+            )
+            with open(baseline) as file:
+                report = json.load(file)
+            report["results"]["order_list"]["queries"] -= 1
+            with open(baseline, "w") as file:
+                json.dump(report, file)
+
+            with self.assertRaisesMessage(CommandError, "order_list"):
+                call_command(
+                    "benchmark", "--iterations", "1", "--warmup", "0",
+                    "--case", "order_list", "--baseline", baseline,
+                    "--tolerance", "1000",
+                    stdout=io.StringIO(), stderr=io.StringIO(),
+                )
@@ -0,0 +1,279 @@
+import os
+import tempfile
+import threading
+import time
+
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+
+from train.db.pool import (
+    ConnectionPool,
+    PoolTimeout,
+    close_pools,
+    pool_stats
+)
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, sql):
+        if self.connection.broken:
+            raise OSError("server closed the connection")
+
+    def fetchone(self):
+        return (1,)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.broken = False
+        self.closed = False
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.opened = []
+
+    def connect(self):
+        connection = FakeConnection()
+        self.opened.append(connection)
+        return connection
+
+    def pool(self, **options):
+        options.setdefault("min_size", 0)
+        options.setdefault("clock", self.clock)
+        return ConnectionPool("test", **options)
+
+    def test_connections_are_reused(self):
+        pool = self.pool()
+
+        first = pool.acquire(self.connect)
+        pool.release(first)
+        second = pool.acquire(self.connect)
+
+        self.assertIs(first, second)
+        self.assertEqual(len(self.opened), 1)
+        self.assertEqual(first.rollbacks, 1)
+        self.assertEqual(
+            {
+                key: value for key, value in pool.stats().items()
+                if key in ("size", "idle", "in_use", "requests", "connects")
+            },
+            {"size": 1, "idle": 0, "in_use": 1, "requests": 2, "connects": 1}
+        )
+
+    def test_fill_opens_min_size(self):
+        pool = self.pool(min_size=3, max_size=5)
+
+        connection = pool.acquire(self.connect)
+        self.assertEqual(pool.fill(self.connect), 2)
+        self.assertEqual(pool.fill(self.connect), 0)
+
+        self.assertEqual(pool.stats()["size"], 3)
+        self.assertEqual(pool.stats()["idle"], 2)
+        pool.release(connection)
+
+    def test_exhausted_pool_times_out(self):
+        pool = ConnectionPool("test", min_size=0, max_size=1, timeout=0.05)
+        pool.acquire(self.connect)
+
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(self.connect)
+
+        stats = pool.stats()
+        self.assertEqual(stats["waits"], 1)
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertGreaterEqual(stats["wait_seconds_max"], 0.05)
+        self.assertEqual(len(self.opened), 1)
+
+    def test_waiting_thread_gets_released_connection(self):
+        pool = ConnectionPool("test", min_size=0, max_size=1, timeout=5)
+        connection = pool.acquire(self.connect)
+        acquired = []
+
+        waiter = threading.Thread(
+            target=lambda: acquired.append(pool.acquire(self.connect))
+        )
+        waiter.start()
+        while not pool.stats()["waiting"]:
+            time.sleep(0.001)
+        pool.release(connection)
+        waiter.join(5)
+
+        self.assertEqual(acquired, [connection])
+        self.assertEqual(pool.stats()["waits"], 1)
+        self.assertEqual(pool.stats()["timeouts"], 0)
+
+    def test_idle_connection_is_checked(self):
+        pool = self.pool(check_after=10)
+        connection = pool.acquire(self.connect)
+        pool.release(connection)
+
+        connection.broken = True
+        self.clock.now = 5
+        # idle for less than check_after: handed out unchecked
+        self.assertIs(pool.acquire(self.connect), connection)
+        pool.release(connection)
+
+        self.clock.now = 20
+        fresh = pool.acquire(self.connect)
+
+        self.assertIsNot(fresh, connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()["failed_checks"], 1)
+        self.assertEqual(pool.stats()["size"], 1)
+
+    def test_release_after_errors_checks_connection(self):
+        pool = self.pool()
+        connection = pool.acquire(self.connect)
+
+        connection.broken = True
+        pool.release(connection, check=True)
+
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()["size"], 0)
+
+    def test_idle_connections_expire_down_to_min_size(self):
+        pool = self.pool(min_size=1, max_size=3, max_idle=60)
+        connections = [pool.acquire(self.connect) for _ in range(3)]
+        for connection in connections[:2]:
+            pool.release(connection)
+
+        # not idle for max_idle yet
+        self.clock.now = 30
+        pool.release(connections[2])
+        self.assertEqual(pool.stats()["size"], 3)
+
+        self.clock.now = 80
+        pool.release(pool.acquire(self.connect))
+        # the two idle since 0 are closed, down to min_size
+        self.assertEqual(
+            [connection.closed for connection in connections],
+            [True, True, False]
+        )
+        self.assertEqual(pool.stats()["size"], 1)
+
+        self.clock.now = 1000
+        pool.release(pool.acquire(self.connect))
+        self.assertEqual(pool.stats()["size"], 1)
+
+    def test_failed_connect_frees_slot(self):
+        pool = self.pool(max_size=1)
+
+        def refuse():
+            raise OSError("connection refused")
+
+        with self.assertRaises(OSError):
+            pool.acquire(refuse)
+
+        self.assertEqual(pool.stats()["size"], 0)
+        self.assertIsNotNone(pool.acquire(self.connect))
+
+    def test_closed_pool_closes_returned_connections(self):
+        pool = self.pool()
+        idle, in_use = pool.acquire(self.connect), pool.acquire(self.connect)
+        pool.release(idle)
+
+        pool.close()
+        self.assertTrue(idle.closed)
+        self.assertFalse(in_use.closed)
+
+        pool.release(in_use)
+        self.assertTrue(in_use.closed)
+        self.assertEqual(pool.stats()["size"], 0)
+
+
+class PooledBackendTests(SimpleTestCase):
+    """train.db.backends.sqlite3, the SQLite fallback of the pool"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.name = os.path.join(directory.name, "pooled.sqlite3")
+        self.connections = ConnectionHandler({
+            "default": {
+                "ENGINE": "django.db.backends.sqlite3",
+                "NAME": ":memory:",
+            },
+            "pooled": {
+                "ENGINE": "train.db.backends.sqlite3",
+                "NAME": self.name,
+                "POOL": {"MIN_SIZE": 1, "MAX_SIZE": 1, "TIMEOUT": 5},
+            }
+        })
+        self.addCleanup(close_pools, "pooled")
+        self.addCleanup(self.connections.close_all)
+
+    def query(self):
+        connection = self.connections["pooled"]
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            self.assertEqual(cursor.fetchone(), (1,))
+        raw = connection.connection
+        connection.close()
+        return raw
+
+    def test_close_returns_connection_to_pool(self):
+        first = self.query()
+        second = self.query()
+
+        self.assertIs(first, second)
+        stats = pool_stats()[f"pooled:{self.name}"]
+        self.assertEqual(stats["connects"], 1)
+        self.assertEqual(stats["requests"], 2)
+        self.assertEqual(stats["idle"], 1)
+
+    def test_threads_share_the_pool(self):
+        connection = self.connections["pooled"]
+        connection.ensure_connection()
+        raw = []
+
+        worker = threading.Thread(target=lambda: raw.append(self.query()))
+        worker.start()
+        # MAX_SIZE is 1: the other thread waits for our connection
+        while not pool_stats()[f"pooled:{self.name}"]["waiting"]:
+            time.sleep(0.001)
+        own = connection.connection
+        connection.close()
+        worker.join(5)
+
+        self.assertEqual(raw, [own])
+        self.assertEqual(pool_stats()[f"pooled:{self.name}"]["waits"], 1)
+
+    def test_transaction_left_open_is_rolled_back(self):
+        connection = self.connections["pooled"]
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE TABLE seat (id integer)")
+        connection.set_autocommit(False)
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO seat VALUES (1)")
+        connection.close()
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM seat")
+            self.assertEqual(cursor.fetchone(), (0,))
+        connection.close()
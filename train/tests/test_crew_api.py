@@ -188,3 +188,18 @@ class AdminCrewApiTests(TestCase):
         self.assertEqual(trips.count(), 2)
         self.assertIn(trip1, trips)
         self.assertIn(trip2, trips)
+
+    def test_create_crew_with_invalid_trips(self):
+        for trips, message in (
+            ([0], 'Invalid pk "0" - object does not exist.'),
+            (["x"], "Incorrect type. Expected pk value, received str."),
+            ([True], "Incorrect type. Expected pk value, received bool."),
+        ):
+            res = self.client.post(
+                CREW_URL,
+                {"first_name": "a", "last_name": "b", "trips": trips},
+                format="json"
+            )
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(res.data["trips"], [message])
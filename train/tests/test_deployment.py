@@ -0,0 +1,164 @@
+import importlib
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+
+from train import health
+from train_station import workers
+
+HEALTH_LIVE_URL = reverse("health-live")
+HEALTH_READY_URL = reverse("health-ready")
+
+
+def failing_check():
+    raise health.HealthCheckError("down")
+
+
+class HealthCheckTests(TestCase):
+    def test_live(self):
+        res = self.client.get(HEALTH_LIVE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), {"status": "ok"})
+        self.assertIn("no-cache", res["Cache-Control"])
+
+    def test_ready(self):
+        res = self.client.get(HEALTH_READY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()["status"], "ok")
+        self.assertEqual(
+            res.json()["checks"], {"database": "ok", "cache": "ok"}
+        )
+
+    def test_not_ready(self):
+        checks = (
+            ("database", health.check_database),
+            ("cache", failing_check),
+        )
+        with mock.patch.object(health, "CHECKS", checks), self.assertLogs(
+                "train.health", "ERROR"
+        ) as logs:
+            res = self.client.get(HEALTH_READY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(
+            res.json()["checks"], {"database": "ok", "cache": "failed"}
+        )
+        self.assertNotIn(b"down", res.content)
+        self.assertIn("HealthCheckError: down", logs.output[0])
+
+    def test_ready_outside_monitoring_network(self):
+        res = self.client.get(HEALTH_READY_URL, REMOTE_ADDR="203.0.113.7")
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(MONITORING_ALLOWED_IPS=["10.0.0.0/8"])
+    def test_ready_from_monitoring_network(self):
+        res = self.client.get(HEALTH_READY_URL, REMOTE_ADDR="10.1.2.3")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_no_writes(self):
+        res = self.client.post(HEALTH_READY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+class WorkerSizingTests(SimpleTestCase):
+    def cgroup(self, files):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        for name, content in files.items():
+            path = os.path.join(directory.name, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as file:
+                file.write(content)
+        return directory.name
+
+    def test_worker_count(self):
+        gib = 1 << 30
+        self.assertEqual(workers.worker_count(4, 64 * gib, gib // 4), 9)
+        self.assertEqual(
+            workers.worker_count(4, 64 * gib, gib // 4, asynchronous=True),
+            4
+        )
+        # memory bound
+        self.assertEqual(workers.worker_count(4, gib, gib // 4), 4)
+        self.assertEqual(workers.worker_count(4, gib // 8, gib // 4), 1)
+        self.assertEqual(
+            workers.worker_count(4, None, gib // 4, max_workers=2), 2
+        )
+
+    def test_cgroup_v2_limits(self):
+        root = self.cgroup({
+            "cpu.max": "150000 100000\n",
+            "memory.max": f"{512 << 20}\n",
+        })
+
+        self.assertEqual(
+            workers.cpu_count(root), min(2, workers.cpu_count("/nowhere"))
+        )
+        self.assertEqual(workers.memory_bytes(root), 512 << 20)
+
+    def test_cgroup_v1_limits(self):
+        root = self.cgroup({
+            "cpu/cpu.cfs_quota_us": "100000\n",
+            "cpu/cpu.cfs_period_us": "100000\n",
+            "memory/memory.limit_in_bytes": f"{256 << 20}\n",
+        })
+
+        self.assertEqual(workers.cpu_count(root), 1)
+        self.assertEqual(workers.memory_bytes(root), 256 << 20)
+
+    def test_no_limits(self):
+        root = self.cgroup({
+            "cpu.max": "max 100000\n",
+            "memory.max": "max\n",
+        })
+
+        self.assertEqual(workers.cpu_count(root), workers.cpu_count("/none"))
+        self.assertEqual(
+            workers.memory_bytes(root), workers.memory_bytes("/none")
+        )
+
+
+class ProductionSettingsTests(SimpleTestCase):
+    def test_production_profile(self):
+        with mock.patch.dict(
+            os.environ,
+            {"DJANGO_ALLOWED_HOSTS": "api.example.com", "CONN_MAX_AGE": "30"}
+        ):
+            production = importlib.reload(
+                importlib.import_module("train_station.settings.production")
+            )
+        base = importlib.import_module("train_station.settings.base")
+
+        self.assertFalse(production.DEBUG)
+        self.assertNotIn("debug_toolbar", production.INSTALLED_APPS)
+        self.assertFalse(
+            any("debug_toolbar" in name for name in production.MIDDLEWARE)
+        )
+        self.assertEqual(production.ALLOWED_HOSTS, ["api.example.com"])
+        self.assertEqual(production.DATABASES["default"]["CONN_MAX_AGE"], 30)
+        self.assertNotIn("CONN_MAX_AGE", base.DATABASES["default"])
+
+    def test_pooled_connections(self):
+        with mock.patch.dict(
+            os.environ, {"DB_POOL_MAX_SIZE": "8", "DB_POOL_TIMEOUT": "2"}
+        ):
+            production = importlib.reload(
+                importlib.import_module("train_station.settings.production")
+            )
+
+        database = production.DATABASES["default"]
+        self.assertEqual(database["ENGINE"], "train.db.backends.postgresql")
+        self.assertEqual(database["CONN_MAX_AGE"], 0)
+        self.assertEqual(database["POOL"]["MAX_SIZE"], 8)
+        self.assertEqual(database["POOL"]["MIN_SIZE"], 1)
+        self.assertEqual(database["POOL"]["TIMEOUT"], 2.0)
@@ -0,0 +1,154 @@
+import csv
+import io
+import json
+import os
+import tempfile
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from train.models import (
+    Order,
+    Ticket,
+    Trip,
+    Route,
+    Station,
+    TrainType,
+    Train
+)
+
+
+def export_url(kind):
+    return reverse("train:export", args=[kind])
+
+
+def sample_trip():
+    route = Route.objects.create(
+        source=Station.objects.create(name="st1", latitude=1, longitude=1),
+        destination=Station.objects.create(
+            name="st2", latitude=2, longitude=2
+        ),
+        distance=3
+    )
+    train = Train.objects.create(
+        name="tr1",
+        cargo_num=10,
+        places_in_cargo=10,
+        train_type=TrainType.objects.create(name="type1")
+    )
+    return Trip.objects.create(
+        route=route,
+        train=train,
+        departure_time="2023-12-08T19:54:28+02:00",
+        arrival_time="2023-12-10T19:54:28+02:00",
+    )
+
+
+def sample_order(user, trip, day, seats):
+    order = Order.objects.create(user=user)
+    Order.objects.filter(pk=order.pk).update(
+        created_at=timezone.make_aware(datetime(2024, 1, day, 12))
+    )
+    for seat in seats:
+        Ticket.objects.create(cargo=1, seat=seat, trip=trip, order=order)
+    return order
+
+
+def content(response):
+    return b"".join(response.streaming_content).decode()
+
+
+class ExportApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.admin = get_user_model().objects.create_superuser(
+            "admin@admin.com",
+            "testpass",
+        )
+        trip = sample_trip()
+        self.first = sample_order(self.user, trip, 1, [1, 2])
+        self.second = sample_order(self.user, trip, 5, [3])
+
+    def test_admin_required(self):
+        self.client.force_authenticate(self.user)
+
+        res = self.client.get(export_url("tickets"))
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_unknown_export(self):
+        self.client.force_authenticate(self.admin)
+
+        res = self.client.get(export_url("users"))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tickets_csv(self):
+        self.client.force_authenticate(self.admin)
+
+        res = self.client.get(export_url("tickets"))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "text/csv")
+        self.assertIn('filename="tickets.csv"', res["Content-Disposition"])
+        rows = list(csv.DictReader(io.StringIO(content(res))))
+        self.assertEqual([row["seat"] for row in rows], ["1", "2", "3"])
+        self.assertEqual(rows[0]["order_id"], str(self.first.id))
+        self.assertEqual(rows[0]["user_email"], "test@test.com")
+        self.assertEqual(rows[0]["source"], "st1")
+
+    def test_orders_ndjson(self):
+        self.client.force_authenticate(self.admin)
+
+        res = self.client.get(export_url("orders"), {"output": "ndjson"})
+
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in content(res).splitlines()]
+        self.assertEqual(
+            [(row["order_id"], row["tickets"]) for row in rows],
+            [(self.first.id, 2), (self.second.id, 1)]
+        )
+
+    def test_date_filter(self):
+        self.client.force_authenticate(self.admin)
+
+        res = self.client.get(
+            export_url("orders"),
+            {"output": "ndjson", "date_from": "2024-01-02",
+             "date_to": "2024-01-05"}
+        )
+
+        rows = [json.loads(line) for line in content(res).splitlines()]
+        self.assertEqual([row["order_id"] for row in rows], [self.second.id])
+
+    def test_invalid_params(self):
+        self.client.force_authenticate(self.admin)
+
+        res = self.client.get(export_url("orders"), {"output": "xml"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_data_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "tickets.csv")
+            call_command(
+                "export_data", "tickets", "--to", "2024-01-01",
+                "--file", path
+            )
+            with open(path, newline="") as file:
+                rows = list(csv.DictReader(file))
+
+        self.assertEqual([row["seat"] for row in rows], ["1", "2"])
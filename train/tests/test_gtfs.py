@@ -0,0 +1,156 @@
+import csv
+import io
+import tempfile
+import zipfile
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from train import gtfs
+from train.models import Route, Station, TrainType, Train, Trip
+
+GTFS_URL = reverse("train:gtfs-feed")
+
+
+def sample_trip(**params):
+    route = Route.objects.create(
+        source=Station.objects.create(
+            name="Kyiv", latitude=50.45, longitude=30.52
+        ),
+        destination=Station.objects.create(
+            name="Odesa", latitude=46.48, longitude=30.72
+        ),
+        distance=660
+    )
+    train = Train.objects.create(
+        name="105",
+        cargo_num=10,
+        places_in_cargo=36,
+        train_type=TrainType.objects.create(name="Night")
+    )
+    defaults = {
+        "route": route,
+        "train": train,
+        "departure_time": "2024-01-01T22:00:00+02:00",
+        "arrival_time": "2024-01-02T07:10:00+02:00",
+    }
+    defaults.update(params)
+
+    return Trip.objects.create(**defaults)
+
+
+def read_feed(root):
+    with zipfile.ZipFile(gtfs.feed_path(root)) as archive:
+        return {
+            name: list(csv.reader(io.TextIOWrapper(archive.open(name))))
+            for name in archive.namelist()
+        }
+
+
+class GtfsFeedTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        with self.captureOnCommitCallbacks(execute=True):
+            self.trip = sample_trip()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_build_feed(self):
+        rebuilt = gtfs.build_feed(self.root)
+
+        self.assertEqual(rebuilt, [name for name, _, _ in gtfs.FILES])
+        feed = read_feed(self.root)
+        route = self.trip.route
+        self.assertEqual(
+            feed["stops.txt"][1:],
+            [
+                [str(route.source_id), "Kyiv", "50.45", "30.52"],
+                [str(route.destination_id), "Odesa", "46.48", "30.72"],
+            ]
+        )
+        self.assertEqual(
+            feed["trips.txt"][1:],
+            [[str(route.id), "20240101", str(self.trip.id), "105"]]
+        )
+        self.assertEqual(
+            [row[1:5] for row in feed["stop_times.txt"][1:]],
+            [
+                ["22:00:00", "22:00:00", str(route.source_id), "1"],
+                ["31:10:00", "31:10:00", str(route.destination_id), "2"],
+            ]
+        )
+        self.assertEqual(
+            feed["calendar_dates.txt"][1:], [["20240101", "20240101", "1"]]
+        )
+
+    def test_rebuilds_only_changed_files(self):
+        gtfs.build_feed(self.root)
+        self.assertEqual(gtfs.build_feed(self.root), [])
+
+        station = Station.objects.get(name="Kyiv")
+        station.name = "Kyiv-Pasazhyrskyi"
+        # the table version is bumped on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            station.save()
+
+        self.assertEqual(
+            gtfs.build_feed(self.root), ["stops.txt", "routes.txt"]
+        )
+        feed = read_feed(self.root)
+        self.assertEqual(feed["stops.txt"][1][1], "Kyiv-Pasazhyrskyi")
+        self.assertEqual(
+            feed["routes.txt"][1][3], "Kyiv-Pasazhyrskyi - Odesa"
+        )
+        self.assertEqual(len(feed["trips.txt"]), 2)
+
+    def test_feed_imports_back_unchanged(self):
+        gtfs.build_feed(self.root)
+        out = io.StringIO()
+
+        call_command(
+            "import_timetable", gtfs.feed_path(self.root), stdout=out
+        )
+
+        self.assertIn("trips created: 0", out.getvalue())
+        self.assertIn("trips updated: 0", out.getvalue())
+        self.assertIn("routes created: 0", out.getvalue())
+
+
+class GtfsFeedViewTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.client = APIClient()
+        sample_trip()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_not_built(self):
+        with override_settings(GTFS_ROOT=self.directory.name):
+            res = self.client.get(GTFS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_serves_cacheable_feed(self):
+        with override_settings(GTFS_ROOT=self.directory.name):
+            gtfs.build_feed()
+            res = self.client.get(GTFS_URL)
+            content = b"".join(res.streaming_content)
+            revalidated = self.client.get(
+                GTFS_URL, HTTP_IF_NONE_MATCH=res["ETag"]
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "application/zip")
+        self.assertIn("public", res["Cache-Control"])
+        self.assertIn("Last-Modified", res)
+        self.assertTrue(zipfile.is_zipfile(io.BytesIO(content)))
+        self.assertEqual(
+            revalidated.status_code, status.HTTP_304_NOT_MODIFIED
+        )
@@ -0,0 +1,189 @@
+import io
+import os
+import tempfile
+
+from django.core.management import call_command, CommandError
+from django.test import TestCase
+
+from train.cache import model_version
+from train.models import Crew, Route, Station, Train, TrainType, Trip
+
+CSV_HEADER = (
+    "source,source_latitude,source_longitude,"
+    "destination,destination_latitude,destination_longitude,distance,"
+    "train,train_type,cargo_num,places_in_cargo,"
+    "departure_time,arrival_time,crew\n"
+)
+
+
+class ImportTimetableTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w") as feed_file:
+            feed_file.write(content)
+        return path
+
+    def import_csv(self, rows):
+        path = self.write("timetable.csv", CSV_HEADER + rows)
+        call_command("import_timetable", path, stdout=io.StringIO())
+
+    def test_import_csv(self):
+        self.import_csv(
+            "Kyiv,50.45,30.52,Lviv,49.84,24.03,540,"
+            "IC-743,Intercity,9,60,"
+            "2024-01-01T07:00:00+02:00,2024-01-01T12:30:00+02:00,"
+            "Ivan Franko; Lesya Ukrainka\n"
+            "Lviv,,,Kyiv,,,,"
+            "IC-743,,,,"
+            "2024-01-01T15:00:00+02:00,2024-01-01T20:30:00+02:00,"
+            "Ivan Franko\n"
+        )
+
+        self.assertEqual(Station.objects.count(), 2)
+        kyiv = Station.objects.get(name="Kyiv")
+        self.assertTrue(kyiv.geohash.startswith("u8v"))
+        self.assertEqual(TrainType.objects.count(), 1)
+        self.assertEqual(Train.objects.get().capacity, 540)
+        self.assertEqual(Route.objects.count(), 2)
+        back = Route.objects.get(source__name="Lviv")
+        self.assertAlmostEqual(back.distance, 467, delta=5)
+        self.assertEqual(Crew.objects.count(), 2)
+
+        trips = Trip.objects.order_by("departure_time")
+        self.assertEqual(trips.count(), 2)
+        self.assertEqual(trips[0].crews.count(), 2)
+        self.assertEqual(
+            list(trips[1].crews.values_list("first_name", flat=True)),
+            ["Ivan"]
+        )
+
+    def test_reimport_updates_on_natural_keys(self):
+        row = (
+            "Kyiv,50.45,30.52,Lviv,49.84,24.03,540,"
+            "IC-743,Intercity,9,60,"
+            "2024-01-01T07:00:00+02:00,{arrival},{crew}\n"
+        )
+        self.import_csv(
+            row.format(
+                arrival="2024-01-01T12:30:00+02:00",
+                crew="Ivan Franko; Lesya Ukrainka",
+            )
+        )
+        trip = Trip.objects.get()
+
+        self.import_csv(
+            row.format(arrival="2024-01-01T13:00:00+02:00", crew="Ivan Franko")
+        )
+
+        self.assertEqual(Trip.objects.count(), 1)
+        self.assertEqual(Station.objects.count(), 2)
+        self.assertEqual(Train.objects.count(), 1)
+        trip.refresh_from_db()
+        self.assertEqual(
+            trip.arrival_time.isoformat(), "2024-01-01T11:00:00+00:00"
+        )
+        self.assertEqual(
+            list(trip.crews.values_list("first_name", flat=True)), ["Ivan"]
+        )
+
+    def test_import_expires_trip_searches(self):
+        version = model_version(Trip)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.import_csv(
+                "Kyiv,50.45,30.52,Lviv,49.84,24.03,540,"
+                "IC-743,Intercity,9,60,"
+                "2024-01-01T07:00:00+02:00,2024-01-01T12:30:00+02:00,\n"
+            )
+
+        self.assertNotEqual(model_version(Trip), version)
+
+    def test_unknown_train_without_capacity(self):
+        path = self.write(
+            "timetable.csv",
+            "source,destination,train,departure_time,arrival_time\n"
+            "Kyiv,Lviv,IC-743,2024-01-01T07:00,2024-01-01T12:30\n",
+        )
+
+        with self.assertRaisesMessage(CommandError, "line 2"):
+            call_command("import_timetable", path)
+        self.assertFalse(Trip.objects.exists())
+
+    def test_import_gtfs_feed(self):
+        self.write(
+            "stops.txt",
+            "stop_id,stop_name,stop_lat,stop_lon\n"
+            "1,Kyiv,50.45,30.52\n"
+            "2,Vinnytsia,49.23,28.47\n"
+            "3,Odesa,46.48,30.72\n"
+        )
+        self.write(
+            "trains.txt",
+            "train_name,train_type,cargo_num,places_in_cargo\n"
+            "105,Night,10,36\n"
+        )
+        self.write(
+            "trips.txt",
+            "route_id,service_id,trip_id,trip_short_name\n"
+            "r1,night,t1,105\n"
+        )
+        self.write(
+            "calendar_dates.txt",
+            "service_id,date,exception_type\n"
+            "night,20240101,1\n"
+            "night,20240102,1\n"
+        )
+        self.write(
+            "stop_times.txt",
+            "trip_id,arrival_time,departure_time,stop_id,stop_sequence,"
+            "shape_dist_traveled\n"
+            "t1,22:00:00,22:00:00,1,1,0\n"
+            "t1,24:30:00,24:35:00,2,2,260\n"
+            "t1,31:10:00,31:10:00,3,3,660\n"
+        )
+
+        call_command(
+            "import_timetable",
+            self.directory.name,
+            stdout=io.StringIO(),
+        )
+
+        route = Route.objects.get()
+        self.assertEqual(
+            (route.source.name, route.destination.name, route.distance),
+            ("Kyiv", "Odesa", 660)
+        )
+        self.assertEqual(
+            [
+                (
+                    trip.departure_time.isoformat(),
+                    trip.arrival_time.isoformat(),
+                )
+                for trip in Trip.objects.order_by("departure_time")
+            ],
+            [
+                ("2024-01-01T20:00:00+00:00", "2024-01-02T05:10:00+00:00"),
+                ("2024-01-02T20:00:00+00:00", "2024-01-03T05:10:00+00:00"),
+            ]
+        )
+
+    def test_invalid_stop_sequence(self):
+        self.write("stops.txt", "stop_id,stop_name\n1,Kyiv\n")
+        self.write(
+            "stop_times.txt",
+            "trip_id,arrival_time,departure_time,stop_id,stop_sequence\n"
+            "t1,22:00:00,22:00:00,1,1\n"
+            "t1,23:00:00,23:00:00,1,second\n"
+        )
+
+        with self.assertRaisesMessage(
+                CommandError, "line 3: stop_times.txt: invalid stop_sequence"
+        ):
+            call_command("import_timetable", self.directory.name)
+        self.assertFalse(Trip.objects.exists())
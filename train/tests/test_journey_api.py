@@ -0,0 +1,214 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings
+)
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from train.journeys import Connection, ConnectionIndex, journey_index
+from train.models import (
+    Trip,
+    Route,
+    Station,
+    TrainType,
+    Train
+)
+
+JOURNEY_URL = reverse("train:journey-list")
+
+
+class JourneyPlannerTests(TransactionTestCase):
+    def setUp(self):
+        journey_index.invalidate()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        self.lviv, self.kyiv, self.odesa, self.dnipro = (
+            Station.objects.create(name=name, latitude=1, longitude=1)
+            for name in ("Lviv", "Kyiv", "Odesa", "Dnipro")
+        )
+        self.train = Train.objects.create(
+            name="tr1",
+            cargo_num=2,
+            places_in_cargo=3,
+            train_type=TrainType.objects.create(name="type1")
+        )
+
+    def tearDown(self):
+        journey_index.invalidate()
+
+    def trip(self, source, destination, departure, arrival):
+        route, _ = Route.objects.get_or_create(
+            source=source, destination=destination, defaults={"distance": 1}
+        )
+        return Trip.objects.create(
+            route=route,
+            train=self.train,
+            departure_time=f"2023-12-08T{departure}:00+02:00",
+            arrival_time=f"2023-12-08T{arrival}:00+02:00",
+        )
+
+    def search(self, source, destination, **params):
+        params.update(
+            source=source.id,
+            destination=destination.id,
+            departure="2023-12-08T00:00:00+02:00",
+        )
+        res = self.client.get(JOURNEY_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    @staticmethod
+    def legs(itinerary):
+        return [leg["trip"] for leg in itinerary["legs"]]
+
+    def test_earliest_arrival_and_fewest_transfers(self):
+        direct = self.trip(self.lviv, self.odesa, "08:00", "20:00")
+        first = self.trip(self.lviv, self.kyiv, "07:00", "12:00")
+        second = self.trip(self.kyiv, self.odesa, "12:30", "18:00")
+
+        data = self.search(self.lviv, self.odesa)
+
+        self.assertEqual(
+            self.legs(data["earliest_arrival"]), [first.id, second.id]
+        )
+        self.assertEqual(data["earliest_arrival"]["transfers"], 1)
+        self.assertEqual(self.legs(data["fewest_transfers"]), [direct.id])
+
+    def test_min_connection_time(self):
+        self.trip(self.lviv, self.kyiv, "07:00", "12:00")
+        self.trip(self.kyiv, self.odesa, "12:30", "18:00")
+
+        data = self.search(self.lviv, self.odesa, min_connection=45)
+
+        self.assertIsNone(data["earliest_arrival"])
+        self.assertIsNone(data["fewest_transfers"])
+
+    def test_max_transfers(self):
+        self.trip(self.lviv, self.kyiv, "07:00", "12:00")
+        self.trip(self.kyiv, self.dnipro, "12:30", "15:00")
+        last = self.trip(self.dnipro, self.odesa, "15:30", "20:00")
+
+        self.assertIsNone(
+            self.search(self.lviv, self.odesa, max_transfers=1)[
+                "earliest_arrival"
+            ]
+        )
+        data = self.search(self.lviv, self.odesa, max_transfers=2)
+        self.assertEqual(self.legs(data["earliest_arrival"])[-1], last.id)
+
+    @override_settings(JOURNEY_MAX_DURATION=timedelta(hours=15))
+    def test_max_duration(self):
+        self.trip(self.lviv, self.kyiv, "07:00", "12:00")
+        self.trip(self.kyiv, self.odesa, "12:30", "16:00")
+
+        self.assertIsNotNone(
+            self.search(self.lviv, self.kyiv)["earliest_arrival"]
+        )
+        self.assertIsNone(
+            self.search(self.lviv, self.odesa)["earliest_arrival"]
+        )
+
+    def test_index_follows_trip_changes(self):
+        trip = self.trip(self.lviv, self.kyiv, "07:00", "12:00")
+        self.assertIsNotNone(
+            self.search(self.lviv, self.kyiv)["earliest_arrival"]
+        )
+
+        trip.departure_time = "2023-12-07T07:00:00+02:00"
+        trip.save()
+        self.assertIsNone(
+            self.search(self.lviv, self.kyiv)["earliest_arrival"]
+        )
+
+        later = self.trip(self.lviv, self.kyiv, "09:00", "14:00")
+        self.assertEqual(
+            self.legs(self.search(self.lviv, self.kyiv)["earliest_arrival"]),
+            [later.id]
+        )
+
+        later.delete()
+        self.assertIsNone(
+            self.search(self.lviv, self.kyiv)["earliest_arrival"]
+        )
+
+
+class ScannedConnection(Connection):
+    """Connection recording the trips whose source is read by the scan"""
+
+    __slots__ = ()
+    scanned = []
+
+    @property
+    def source(self):
+        self.scanned.append(self.trip_id)
+        return self[2]
+
+
+class ConnectionScanTests(SimpleTestCase):
+    def setUp(self):
+        ScannedConnection.scanned.clear()
+
+    @staticmethod
+    def index(connections):
+        index = ConnectionIndex()
+        index._connections = sorted(
+            ScannedConnection(*connection) for connection in connections
+        )
+        index._loaded_at = time.monotonic()
+        return index
+
+    def test_scan_stops_at_the_arrival_cutoff(self):
+        index = self.index(
+            [(1, 2, "A", "B", 1), (3, 4, "B", "C", 2)]
+            + [(100 + n, 200 + n, "X", "Y", 3 + n) for n in range(50)]
+        )
+
+        earliest, fewest = index.search("A", "C", 0, max_duration=50)
+
+        self.assertEqual(earliest.trip_ids, [1, 2])
+        self.assertEqual(fewest.trip_ids, [1, 2])
+        self.assertEqual(set(ScannedConnection.scanned), {1, 2})
+
+    def test_rounds_start_at_the_earliest_improved_arrival(self):
+        index = self.index([
+            (1, 5, "A", "B", 1),
+            (2, 3, "A", "X", 2),
+            (6, 7, "B", "C", 3),
+        ])
+
+        earliest, _ = index.search("A", "C", 0)
+
+        self.assertEqual(earliest.trip_ids, [1, 3])
+        # the second round starts at the trips leaving at 3 or later
+        self.assertEqual(ScannedConnection.scanned.count(2), 1)
+
+
+class JourneyValidationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_same_source_and_destination(self):
+        station = Station.objects.create(name="st", latitude=1, longitude=1)
+
+        res = self.client.get(
+            JOURNEY_URL, {"source": station.id, "destination": station.id}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,137 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from train.models import (
+    Order,
+    Ticket,
+    Trip,
+    Route,
+    Station,
+    TrainType,
+    Train
+)
+from train.pagination import KeysetPagination
+
+TICKET_URL = reverse("train:ticket-list")
+TRIP_URL = reverse("train:trip-list")
+ORDER_URL = reverse("train:order-list")
+
+
+class KeysetPaginationApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        route = Route.objects.create(
+            source=Station.objects.create(name="st1", latitude=1, longitude=1),
+            destination=Station.objects.create(
+                name="st2", latitude=2, longitude=2
+            ),
+            distance=3
+        )
+        train = Train.objects.create(
+            name="tr1",
+            cargo_num=3,
+            places_in_cargo=4,
+            train_type=TrainType.objects.create(name="type1")
+        )
+        self.trips = [
+            Trip.objects.create(
+                route=route,
+                train=train,
+                departure_time=f"2023-12-{day:02d}T10:00:00+02:00",
+                arrival_time=f"2023-12-{day:02d}T20:00:00+02:00",
+            )
+            for day in (5, 3, 4, 1, 2)
+        ]
+
+    def walk(self, url, params):
+        results = []
+        res = self.client.get(url, params)
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            results.extend(res.data["results"])
+            if res.data["next"] is None:
+                return results, res
+            res = self.client.get(res.data["next"])
+
+    def test_tickets_follow_trip_cargo_seat_id(self):
+        order = Order.objects.create(user=self.user)
+        seats = [(cargo, seat) for seat in (4, 1, 3) for cargo in (2, 1)]
+        for trip in reversed(self.trips[:2]):
+            for cargo, seat in seats:
+                Ticket.objects.create(
+                    trip=trip, order=order, cargo=cargo, seat=seat
+                )
+
+        results, _ = self.walk(
+            TICKET_URL, {"pagination": "cursor", "page_size": 4}
+        )
+
+        first, second = sorted(trip.id for trip in self.trips[:2])
+        self.assertEqual(
+            [
+                (ticket["trip"]["id"], ticket["cargo"], ticket["seat"])
+                for ticket in results
+            ],
+            [
+                (trip, cargo, seat)
+                for trip in (first, second)
+                for cargo in (1, 2) for seat in (1, 3, 4)
+            ]
+        )
+
+    def test_page_seeks_on_the_leading_field(self):
+        condition = KeysetPagination._after(
+            [7, 2, 3, 40], ("trip_id", "cargo", "seat", "id")
+        )
+
+        sql = str(Ticket.objects.filter(condition).query)
+        self.assertIn('"train_ticket"."trip_id" >= 7 AND', sql)
+
+    def test_trips_by_departure_and_previous_page(self):
+        results, last_page = self.walk(
+            TRIP_URL, {"pagination": "cursor", "page_size": 2}
+        )
+
+        self.assertEqual(
+            [trip["departure_time"][:10] for trip in results],
+            [f"2023-12-0{day}" for day in range(1, 6)]
+        )
+
+        res = self.client.get(last_page.data["previous"])
+        self.assertEqual(
+            [trip["departure_time"][:10] for trip in res.data["results"]],
+            ["2023-12-03", "2023-12-04"]
+        )
+
+    def test_orders_newest_first(self):
+        orders = [Order.objects.create(user=self.user) for _ in range(3)]
+
+        results, _ = self.walk(
+            ORDER_URL, {"pagination": "cursor", "page_size": 2}
+        )
+
+        self.assertEqual(
+            [order["id"] for order in results],
+            [order.id for order in reversed(orders)]
+        )
+
+    def test_invalid_cursor(self):
+        res = self.client.get(TRIP_URL, {"cursor": "garbage"})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_default_pagination_unchanged(self):
+        res = self.client.get(TRIP_URL)
+
+        self.assertEqual(len(res.data), 5)
@@ -0,0 +1,208 @@
+import asyncio
+
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework.serializers import BaseSerializer
+from rest_framework.test import APIClient
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from train import metrics
+from train.models import Route, Station, Train, TrainType, Trip
+
+TRIP_URL = reverse("train:trip-list")
+METRICS_URL = reverse("metrics")
+
+
+def sample_trip():
+    route = Route.objects.create(
+        source=Station.objects.create(name="st1", latitude=1, longitude=1),
+        destination=Station.objects.create(
+            name="st2", latitude=2, longitude=2
+        ),
+        distance=3
+    )
+    train = Train.objects.create(
+        name="tr1",
+        cargo_num=3,
+        places_in_cargo=5,
+        train_type=TrainType.objects.create(name="type1")
+    )
+    return Trip.objects.create(
+        route=route,
+        train=train,
+        departure_time="2023-12-08T19:54:28+02:00",
+        arrival_time="2023-12-10T19:54:28+02:00",
+    )
+
+
+def server_timing(response):
+    """{metric: {param: value}} of the Server-Timing header"""
+    timings = {}
+    for entry in response["Server-Timing"].split(", "):
+        name, *params = entry.split(";")
+        timings[name] = dict(param.split("=", 1) for param in params)
+    return timings
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user("test@test.com", "test1234")
+        )
+        self.trip = sample_trip()
+        metrics.registry.clear()
+        self.addCleanup(metrics.registry.clear)
+
+    def totals(self, *labels):
+        return metrics.registry.snapshot()[labels]
+
+    def test_request_is_timed_and_tagged(self):
+        res = self.client.get(TRIP_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        timings = server_timing(res)
+        self.assertEqual(set(timings), {"db", "serializer", "total"})
+        self.assertEqual(timings["db"]["desc"], '"3 queries"')
+        self.assertGreater(float(timings["serializer"]["dur"]), 0)
+        self.assertGreaterEqual(
+            float(timings["total"]["dur"]),
+            float(timings["db"]["dur"]) + float(timings["serializer"]["dur"])
+        )
+
+        totals = self.totals("TripViewSet.list", "GET", "200")
+        self.assertEqual(totals.count, 1)
+        self.assertEqual(totals.queries, 3)
+        self.assertEqual(totals.response_bytes, len(res.content))
+        self.assertEqual(sum(totals.buckets), 1)
+
+    def test_action_tag(self):
+        self.client.get(reverse("train:trip-seats", args=[self.trip.id]))
+        self.client.get(reverse("train:trip-seats", args=[self.trip.id]))
+
+        self.assertEqual(
+            self.totals("TripViewSet.seats", "GET", "200").count, 2
+        )
+
+    def test_unresolved_and_function_views(self):
+        self.client.get("/nowhere/")
+        self.client.get(reverse("health-live"))
+
+        self.assertEqual(self.totals("unresolved", "GET", "404").count, 1)
+        self.assertEqual(self.totals("health_live", "GET", "200").count, 1)
+
+    def test_metrics_endpoint(self):
+        self.client.get(TRIP_URL)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res["Content-Type"].startswith("text/plain"))
+        body = res.content.decode()
+        labels = 'view="TripViewSet.list",method="GET",status="200"'
+        self.assertIn(f"train_http_requests_total{{{labels}}} 1\n", body)
+        self.assertIn(f"train_http_request_db_queries_total{{{labels}}} 3\n",
+                      body)
+        self.assertIn(
+            f'train_http_request_duration_seconds_bucket{{{labels},le="+Inf"}}'
+            f" 1\n",
+            body
+        )
+
+    def test_metrics_endpoint_outside_monitoring_network(self):
+        res = self.client.get(METRICS_URL, REMOTE_ADDR="203.0.113.7")
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_uninstrumented_serializers(self):
+        metrics.uninstrument_serializers()
+        self.addCleanup(metrics.instrument_serializers)
+
+        res = self.client.get(reverse("train:order-list"))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIs(BaseSerializer.data, metrics._serializer_data)
+        self.assertEqual(float(server_timing(res)["serializer"]["dur"]), 0)
+
+
+class AsgiRequestMetricsTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            "test@test.com", "test1234"
+        )
+        self.auth = f"Bearer {AccessToken.for_user(user)}"
+        sample_trip()
+        metrics.registry.clear()
+        self.addCleanup(metrics.registry.clear)
+
+    async def test_async_view(self):
+        res = await AsyncClient().get(
+            reverse("train:async-trip-list"), AUTHORIZATION=self.auth
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertGreater(float(server_timing(res)["serializer"]["dur"]), 0)
+        totals = metrics.registry.snapshot()[
+            ("AsyncTripListView.get", "GET", "200")
+        ]
+        self.assertEqual(totals.queries, 4)
+
+    def test_middleware_stays_async(self):
+        async def get_response(request):
+            pass
+
+        self.assertTrue(asyncio.iscoroutinefunction(
+            metrics.RequestMetricsMiddleware(get_response)
+        ))
+
+
+class RenderTests(SimpleTestCase):
+    def test_histogram_is_cumulative(self):
+        registry = metrics.Registry(buckets=(0.1, 1.0))
+        for duration in (0.05, 0.5, 0.7, 3):
+            registry.observe(
+                ("TripViewSet.list", "GET", "200"),
+                duration,
+                metrics.RequestMetrics(),
+                10
+            )
+
+        body = metrics.render(registry, pools={})
+
+        buckets = [
+            line.rsplit(" ", 1)[1] for line in body.splitlines()
+            if line.startswith("train_http_request_duration_seconds_bucket")
+        ]
+        self.assertEqual(buckets, ["1", "3", "4"])
+        self.assertIn(
+            'train_http_response_bytes_total{view="TripViewSet.list",'
+            'method="GET",status="200"} 40',
+            body
+        )
+
+    def test_pool_stats(self):
+        stats = {
+            "size": 3, "idle": 1, "in_use": 2, "waiting": 0,
+            "min_size": 1, "max_size": 5, "requests": 9, "connects": 3,
+            "waits": 1, "wait_seconds_total": 0.25, "wait_seconds_max": 0.25,
+            "timeouts": 0, "failed_checks": 0,
+        }
+
+        body = metrics.render(metrics.Registry(), pools={"default:db": stats})
+
+        self.assertIn(
+            'train_db_pool_connections{pool="default:db",state="in_use"} 2',
+            body
+        )
+        self.assertIn('train_db_pool_waits_total{pool="default:db"} 1', body)
+        self.assertIn(
+            'train_db_pool_wait_seconds_total{pool="default:db"} 0.25', body
+        )
+
+    def test_label_values_are_escaped(self):
+        self.assertEqual(
+            metrics._labels(view='a"b\\c'), 'view="a\\"b\\\\c"'
+        )
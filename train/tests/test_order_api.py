@@ -0,0 +1,176 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from train.models import (
+    Crew,
+    Order,
+    Ticket,
+    Trip,
+    Route,
+    Station,
+    TrainType,
+    Train
+)
+
+ORDER_URL = reverse("train:order-list")
+
+
+def sample_trip(**params):
+    route = Route.objects.create(
+        source=Station.objects.create(name="st1", latitude=1, longitude=1),
+        destination=Station.objects.create(
+            name="st2", latitude=2, longitude=2
+        ),
+        distance=3
+    )
+    train = Train.objects.create(
+        name="tr1",
+        cargo_num=10,
+        places_in_cargo=10,
+        train_type=TrainType.objects.create(name="type1")
+    )
+    defaults = {
+        "route": route,
+        "train": train,
+        "departure_time": "2023-12-08T19:54:28+02:00",
+        "arrival_time": "2023-12-10T19:54:28+02:00",
+    }
+    defaults.update(params)
+
+    return Trip.objects.create(**defaults)
+
+
+class UnauthenticatedOrderApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        res = self.client.get(ORDER_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class CreateOrderApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        self.trip = sample_trip()
+
+    def book(self, seats, trip=None):
+        trip_id = trip if trip is not None else self.trip.id
+        payload = {
+            "tickets": [
+                {"cargo": cargo, "seat": seat, "trip": trip_id}
+                for cargo, seat in seats
+            ]
+        }
+        return self.client.post(ORDER_URL, payload, format="json")
+
+    def test_create_order(self):
+        res = self.book([(1, 1), (1, 2)])
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        order = Order.objects.get(id=res.data["id"])
+        self.assertEqual(order.user, self.user)
+        self.assertEqual(
+            list(order.tickets.values_list("trip", "cargo", "seat")),
+            [(self.trip.id, 1, 1), (self.trip.id, 1, 2)]
+        )
+        self.assertEqual(
+            [ticket["trip"] for ticket in res.data["tickets"]],
+            [self.trip.id, self.trip.id]
+        )
+
+    def test_query_count_does_not_grow_with_tickets(self):
+        with self.assertNumQueries(15):
+            res = self.book([(1, 1)])
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        with self.assertNumQueries(15):
+            res = self.book(
+                [(cargo, seat) for cargo in range(2, 7)
+                 for seat in range(1, 11)]
+            )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Ticket.objects.count(), 51)
+
+    def test_errors_are_reported_per_seat(self):
+        res = self.book([(1, 2), (11, 1), (1, 2)])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = res.data["tickets"]
+        self.assertEqual(errors[0], {})
+        self.assertEqual(
+            errors[1]["cargo"],
+            ["cargo number must be in available "
+             "(range: 1, cargo_num): (1, 10)"]
+        )
+        self.assertIn("non_field_errors", errors[2])
+        self.assertEqual(Ticket.objects.count(), 0)
+
+    def test_sold_seat_is_rejected(self):
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(trip=self.trip, order=order, cargo=1, seat=1)
+
+        res = self.book([(1, 1), (1, 2)])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = res.data["tickets"]
+        self.assertIn("non_field_errors", errors[0])
+        self.assertEqual(errors[1], {})
+        self.assertEqual(Ticket.objects.count(), 1)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_unknown_trip(self):
+        res = self.book([(1, 1)], trip=self.trip.id + 1)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("trip", res.data["tickets"][0])
+
+
+class ListOrderApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        self.trip = sample_trip()
+        self.trip.crews.add(
+            Crew.objects.create(first_name="Ivan", last_name="Franko")
+        )
+        for index in range(50):
+            order = Order.objects.create(user=self.user)
+            Ticket.objects.create(
+                trip=self.trip,
+                order=order,
+                cargo=index // 10 + 1,
+                seat=index % 10 + 1
+            )
+
+    def test_list_orders(self):
+        res = self.client.get(ORDER_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["count"], 50)
+        trip = res.data["results"][0]["tickets"][0]["trip"]
+        self.assertEqual(trip["train"], "tr1")
+        self.assertEqual(trip["crews"], [{"full_name": "Ivan Franko"}])
+        self.assertEqual(trip["tickets_available"], 50)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        for page_size in (1, 50):
+            with self.assertNumQueries(5):
+                res = self.client.get(
+                    ORDER_URL,
+                    {"pagination": "cursor", "page_size": page_size}
+                )
+            self.assertEqual(len(res.data["results"]), page_size)
@@ -0,0 +1,144 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from train.models import Crew, Route, Station, Train, TrainType, Trip
+from train.profiling import QueryProfile, sql_shape
+from train.serializers import CrewListOrRetrieveSerializer
+
+TRIP_URL = reverse("train:trip-list")
+
+
+def sample_trip():
+    route = Route.objects.create(
+        source=Station.objects.create(name="st1", latitude=1, longitude=1),
+        destination=Station.objects.create(
+            name="st2", latitude=2, longitude=2
+        ),
+        distance=3
+    )
+    train = Train.objects.create(
+        name="tr1",
+        cargo_num=3,
+        places_in_cargo=5,
+        train_type=TrainType.objects.create(name="type1")
+    )
+    return Trip.objects.create(
+        route=route,
+        train=train,
+        departure_time="2023-12-08T19:54:28+02:00",
+        arrival_time="2023-12-10T19:54:28+02:00",
+    )
+
+
+class QueryProfileTests(TestCase):
+    def setUp(self):
+        trip = sample_trip()
+        for number in range(4):
+            crew = Crew.objects.create(
+                first_name=f"first{number}", last_name="last"
+            )
+            crew.trips.add(trip)
+
+    def test_sql_shape(self):
+        self.assertEqual(
+            sql_shape('SELECT 1 FROM "t" WHERE "id" IN (%s, %s, %s)'),
+            sql_shape('SELECT 1 FROM "t" WHERE "id" IN (%s)'),
+        )
+
+    def test_repeated_query_names_serializer_field(self):
+        with QueryProfile(repeat_threshold=3, slow_ms=1000) as profile:
+            CrewListOrRetrieveSerializer(Crew.objects.all(), many=True).data
+
+        findings = {
+            tuple(finding["fields"]): finding
+            for finding in profile.findings()
+        }
+        # the trips of every crew, then the crews of every trip
+        self.assertEqual(
+            set(findings),
+            {
+                ("CrewListOrRetrieveSerializer.trips",),
+                ("CrewListOrRetrieveSerializer.trips", "TripSerializer.crews"),
+            }
+        )
+        finding = findings[("CrewListOrRetrieveSerializer.trips",)]
+        self.assertEqual(finding["kind"], "repeated_query")
+        self.assertEqual(finding["count"], 4)
+        self.assertIn('"train_trip_crews"."crew_id" = %s', finding["sql"])
+        self.assertTrue(
+            finding["location"].startswith("train/tests/test_profiling.py:")
+        )
+
+    def test_prefetched_queries_are_not_repeated(self):
+        with QueryProfile(repeat_threshold=3, slow_ms=1000) as profile:
+            CrewListOrRetrieveSerializer(
+                Crew.objects.prefetch_related("trips__crews"), many=True
+            ).data
+
+        self.assertEqual(profile.findings(), [])
+
+    def test_slow_query(self):
+        with QueryProfile(repeat_threshold=3, slow_ms=0) as profile:
+            Crew.objects.count()
+
+        [finding] = profile.findings()
+        self.assertEqual(finding["kind"], "slow_query")
+        self.assertIn("COUNT(*)", finding["sql"])
+        self.assertEqual(finding["fields"], [])
+
+
+class QueryProfilerMiddlewareTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "test1234"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        sample_trip()
+
+    @override_settings(
+        QUERY_PROFILER_SAMPLE_RATE=1.0, QUERY_PROFILER_REPEAT_THRESHOLD=0
+    )
+    def test_sampled_request_is_logged(self):
+        with self.assertLogs("train.queries", "WARNING") as logs:
+            self.client.get(TRIP_URL)
+
+        findings = [
+            json.loads(record.getMessage()) for record in logs.records
+        ]
+        self.assertTrue(findings)
+        for finding in findings:
+            self.assertEqual(finding["view"], "TripViewSet.list")
+            self.assertEqual(finding["path"], TRIP_URL)
+            self.assertEqual(finding["kind"], "repeated_query")
+
+    @override_settings(
+        QUERY_PROFILER_SAMPLE_RATE=0.0, QUERY_PROFILER_REPEAT_THRESHOLD=0
+    )
+    def test_unsampled_request_is_not_watched(self):
+        with self.assertNoLogs("train.queries"):
+            self.client.get(TRIP_URL)
+
+    @override_settings(
+        QUERY_PROFILER_SAMPLE_RATE=1.0, QUERY_PROFILER_REPEAT_THRESHOLD=0
+    )
+    async def test_async_request_is_logged(self):
+        auth = f"Bearer {AccessToken.for_user(self.user)}"
+
+        with self.assertLogs("train.queries", "WARNING") as logs:
+            await AsyncClient().get(
+                reverse("train:async-trip-list"), AUTHORIZATION=auth
+            )
+
+        findings = [
+            json.loads(record.getMessage()) for record in logs.records
+        ]
+        self.assertTrue(findings)
+        for finding in findings:
+            self.assertEqual(finding["view"], "AsyncTripListView.get")
@@ -0,0 +1,543 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+
+from train.models import (
+    Crew,
+    Order,
+    Route,
+    SeatHold,
+    Station,
+    Ticket,
+    Train,
+    TrainType,
+    Trip
+)
+from train.tests.query_counts import (
+    QueryCountTestMixin,
+    generate_tests,
+    query_count_case
+)
+
+DEPARTURE = timezone.now().replace(microsecond=0) + timedelta(days=30)
+# hashed once, hashing a password per created user is slow
+PASSWORD = make_password("testpass")
+
+
+def url(name, *keys):
+    """Path of a route whose arguments are looked up in the context"""
+    return lambda context: reverse(
+        name, args=[context[key] for key in keys]
+    )
+
+
+def users():
+    user_model = get_user_model()
+    return {
+        "user": user_model.objects.create(
+            email="user@test.com", password=PASSWORD
+        ),
+        "admin": user_model.objects.create(
+            email="admin@test.com",
+            password=PASSWORD,
+            is_staff=True,
+            is_superuser=True,
+        ),
+    }
+
+
+def as_admin(context):
+    context["user"] = context["admin"]
+    return context
+
+
+def make_station(number):
+    return Station.objects.create(
+        name=f"Station {number}",
+        latitude=50 + number / 1000,
+        longitude=30 + number / 1000,
+    )
+
+
+def make_train(number=0, train_type=None):
+    return Train.objects.create(
+        name=f"Train {number}",
+        cargo_num=10,
+        places_in_cargo=20,
+        train_type=train_type or TrainType.objects.create(name="Type"),
+    )
+
+
+def make_route(number=0):
+    return Route.objects.create(
+        source=make_station(2 * number),
+        destination=make_station(2 * number + 1),
+        distance=100 + number,
+    )
+
+
+def make_trip(route=None, train=None, crews=(), offset=0):
+    trip = Trip.objects.create(
+        route=route or make_route(),
+        train=train or make_train(),
+        departure_time=DEPARTURE + timedelta(hours=offset),
+        arrival_time=DEPARTURE + timedelta(hours=offset + 5),
+    )
+    trip.crews.set(crews)
+    return trip
+
+
+def make_crews(size):
+    return [
+        Crew.objects.create(first_name=f"First{number}", last_name="Last")
+        for number in range(size)
+    ]
+
+
+def seats(size):
+    return [
+        {"cargo": index // 20 + 1, "seat": index % 20 + 1}
+        for index in range(size)
+    ]
+
+
+# setups, each returns the context of its requests for size objects
+
+def crews_on_trips(size):
+    route, train = make_route(), make_train()
+    crews = make_crews(size)
+    for number, crew in enumerate(crews):
+        make_trip(route, train, [crew], offset=number)
+    return as_admin(users())
+
+
+def crew_with_trips(size):
+    route, train = make_route(), make_train()
+    crew = make_crews(1)[0]
+    for number in range(size):
+        make_trip(route, train, [crew], offset=number)
+    return as_admin({**users(), "crew": crew.id})
+
+
+def trips_for_crew(size):
+    route, train = make_route(), make_train()
+    trips = [make_trip(route, train, offset=number) for number in range(size)]
+    return as_admin({
+        **users(),
+        "crew": make_crews(1)[0].id,
+        "trips": [trip.id for trip in trips],
+    })
+
+
+def train_types_with_trains(size):
+    for number in range(size):
+        make_train(number, TrainType.objects.create(name=f"Type {number}"))
+    return as_admin(users())
+
+
+def train_type_with_trains(size):
+    train_type = TrainType.objects.create(name="Type")
+    for number in range(size):
+        make_train(number, train_type)
+    return as_admin({**users(), "train_type": train_type.id})
+
+
+def routes(size):
+    for number in range(size):
+        make_route(number)
+    return as_admin({**users(), "route": Route.objects.first().id})
+
+
+def stations(size):
+    created = [make_station(number) for number in range(size + 1)]
+    return as_admin({
+        **users(),
+        "station": created[0].id,
+        "other_station": created[1].id,
+    })
+
+
+def trains(size):
+    train_type = TrainType.objects.create(name="Type")
+    for number in range(size):
+        make_train(number, train_type)
+    return as_admin({
+        **users(),
+        "train": Train.objects.first().id,
+        "train_type": train_type.id,
+    })
+
+
+def trips_with_crews(size):
+    route, train = make_route(), make_train()
+    crews = make_crews(2)
+    for number in range(size):
+        make_trip(route, train, crews, offset=number)
+    return as_admin({**users(), "trip": Trip.objects.first().id})
+
+
+def trip_with_crews(size):
+    trip = make_trip(crews=make_crews(size))
+    return as_admin({
+        **users(),
+        "trip": trip.id,
+        "route": trip.route_id,
+        "train": trip.train_id,
+        "crews": [crew.id for crew in trip.crews.all()],
+    })
+
+
+def trip_with_tickets(size):
+    context = users()
+    trip = make_trip()
+    order = Order.objects.create(user=context["user"])
+    for seat in seats(size):
+        Ticket.objects.create(trip=trip, order=order, **seat)
+    return as_admin({
+        **context,
+        "trip": trip.id,
+        "ticket": trip.tickets.first().id,
+    })
+
+
+def tickets_on_trips(size):
+    context = users()
+    route, train = make_route(), make_train()
+    order = Order.objects.create(user=context["user"])
+    trips = [make_trip(route, train, make_crews(1), offset=number)
+             for number in range(size)]
+    for trip in trips:
+        Ticket.objects.create(trip=trip, order=order, cargo=1, seat=1)
+    return {
+        **context,
+        "trips": ",".join(str(trip.id) for trip in trips),
+    }
+
+
+def orders_with_tickets(size):
+    context = users()
+    route, train = make_route(), make_train()
+    trips = [make_trip(route, train, make_crews(1), offset=number)
+             for number in range(size)]
+    for trip in trips:
+        order = Order.objects.create(user=context["user"])
+        Ticket.objects.create(trip=trip, order=order, cargo=1, seat=1)
+    return context
+
+
+def seats_to_book(size):
+    return {**users(), "trip": make_trip().id, "seats": seats(size)}
+
+
+def held_seats(size):
+    context = users()
+    trip = make_trip()
+    for seat in seats(size):
+        SeatHold.objects.create(
+            trip=trip,
+            user=context["user"],
+            expires_at=timezone.now() + timedelta(minutes=10),
+            **seat,
+        )
+    context["hold"] = SeatHold.objects.first().id
+    return context
+
+
+def journeys(size):
+    route, train = make_route(), make_train()
+    for number in range(size):
+        make_trip(route, train, offset=number)
+    return {
+        **users(),
+        "params": {
+            "source": route.source_id,
+            "destination": route.destination_id,
+            "departure": DEPARTURE.isoformat(),
+        },
+    }
+
+
+def trips_to_search(size):
+    route, train = make_route(), make_train()
+    for number in range(size):
+        make_trip(route, train, make_crews(1), offset=number)
+    return {
+        **users(),
+        "params": {
+            "source": route.source_id,
+            "destination": route.destination_id,
+            "departure_after": DEPARTURE.isoformat(),
+            "departure_before": (DEPARTURE + timedelta(days=7)).isoformat(),
+        },
+    }
+
+
+def other_users(size):
+    user_model = get_user_model()
+    user_model.objects.bulk_create(
+        user_model(email=f"user{number}@test.com", password=PASSWORD)
+        for number in range(size)
+    )
+    return users()
+
+
+def booking(context):
+    return {
+        "tickets": [
+            {"trip": context["trip"], **seat} for seat in context["seats"]
+        ]
+    }
+
+
+def hold_request(context):
+    return {"trip": context["trip"], "seats": context["seats"]}
+
+
+def trip_data(context):
+    return {
+        "route": context["route"],
+        "train": context["train"],
+        "departure_time": DEPARTURE.isoformat(),
+        "arrival_time": (DEPARTURE + timedelta(hours=1)).isoformat(),
+        "crews": context["crews"],
+    }
+
+
+CASES = [
+    # crews
+    query_count_case(
+        "crew_list", "get", url("train:crew-list"), crews_on_trips, 4,
+    ),
+    query_count_case(
+        "crew_retrieve", "get", url("train:crew-detail", "crew"),
+        crew_with_trips, 3,
+    ),
+    query_count_case(
+        "crew_create", "post", url("train:crew-list"), trips_for_crew, 5,
+        data=lambda context: {
+            "first_name": "New", "last_name": "Crew",
+            "trips": context["trips"],
+        },
+    ),
+    query_count_case(
+        "crew_update", "put", url("train:crew-detail", "crew"),
+        trips_for_crew, 7,
+        data=lambda context: {
+            "first_name": "New", "last_name": "Crew",
+            "trips": context["trips"],
+        },
+    ),
+    query_count_case(
+        "crew_destroy", "delete", url("train:crew-detail", "crew"),
+        crew_with_trips, 4,
+    ),
+    # train types
+    query_count_case(
+        "train_type_list", "get", url("train:traintype-list"),
+        train_types_with_trains, 3,
+    ),
+    query_count_case(
+        "train_type_retrieve", "get",
+        url("train:traintype-detail", "train_type"),
+        train_type_with_trains, 3,
+    ),
+    query_count_case(
+        "train_type_create", "post", url("train:traintype-list"),
+        train_type_with_trains, 2,
+        data=lambda context: {"name": "New type"},
+    ),
+    query_count_case(
+        "train_type_update", "put",
+        url("train:traintype-detail", "train_type"),
+        train_type_with_trains, 3,
+        data=lambda context: {"name": "New type"},
+    ),
+    # routes
+    query_count_case(
+        "route_list", "get", url("train:route-list"), routes, 2,
+    ),
+    query_count_case(
+        "route_list_by_stations", "get",
+        lambda context: reverse("train:route-list")
+        + "?source=Station%200&destination=station%201",
+        routes, 4,
+    ),
+    query_count_case(
+        "route_retrieve", "get", url("train:route-detail", "route"),
+        routes, 2,
+    ),
+    query_count_case(
+        "route_create", "post", url("train:route-list"), stations, 9,
+        data=lambda context: {
+            "source": context["station"],
+            "destination": context["other_station"],
+            "distance": 10,
+        },
+    ),
+    query_count_case(
+        "route_destroy", "delete", url("train:route-detail", "route"),
+        routes, 4,
+    ),
+    # stations
+    query_count_case(
+        "station_list", "get", url("train:station-list"), stations, 2,
+    ),
+    query_count_case(
+        "station_retrieve", "get", url("train:station-detail", "station"),
+        stations, 2,
+    ),
+    query_count_case(
+        "station_nearby", "get",
+        lambda context: reverse("train:station-nearby")
+        + "?lat=50.05&lon=30.05&radius_km=50&limit=100",
+        stations, 1,
+    ),
+    query_count_case(
+        "station_create", "post", url("train:station-list"), stations, 2,
+        data=lambda context: {
+            "name": "New", "latitude": 50, "longitude": 30
+        },
+    ),
+    query_count_case(
+        "station_update", "put", url("train:station-detail", "station"),
+        stations, 3,
+        data=lambda context: {
+            "name": "New", "latitude": 50, "longitude": 30
+        },
+    ),
+    # trains
+    query_count_case(
+        "train_list", "get", url("train:train-list"), trains, 2,
+    ),
+    query_count_case(
+        "train_retrieve", "get", url("train:train-detail", "train"),
+        trains, 2,
+    ),
+    query_count_case(
+        "train_create", "post", url("train:train-list"), trains, 3,
+        data=lambda context: {
+            "name": "New",
+            "cargo_num": 5,
+            "places_in_cargo": 5,
+            "train_type": context["train_type"],
+        },
+    ),
+    # trips
+    query_count_case(
+        "trip_list", "get", url("train:trip-list"), trips_with_crews, 3,
+    ),
+    query_count_case(
+        "trip_list_cursor", "get",
+        lambda context: reverse("train:trip-list") + "?pagination=cursor",
+        trips_with_crews, 3,
+    ),
+    query_count_case(
+        "trip_retrieve", "get", url("train:trip-detail", "trip"),
+        trip_with_crews, 3,
+    ),
+    query_count_case(
+        "trip_search", "get",
+        lambda context: reverse("train:trip-search"), trips_to_search, 5,
+        data=lambda context: context["params"],
+    ),
+    query_count_case(
+        "trip_seats", "get", url("train:trip-seats", "trip"),
+        trip_with_tickets, 2,
+    ),
+    query_count_case(
+        "trip_create", "post", url("train:trip-list"), trip_with_crews, 8,
+        data=trip_data,
+    ),
+    query_count_case(
+        "trip_update", "put", url("train:trip-detail", "trip"),
+        trip_with_crews, 10, data=trip_data,
+    ),
+    query_count_case(
+        "trip_destroy", "delete", url("train:trip-detail", "trip"),
+        trip_with_tickets, 9,
+    ),
+    # tickets
+    query_count_case(
+        "ticket_list_by_trips", "get",
+        lambda context: reverse("train:ticket-list")
+        + f"?trips={context['trips']}",
+        tickets_on_trips, 3,
+    ),
+    query_count_case(
+        "ticket_retrieve", "get", url("train:ticket-detail", "ticket"),
+        trip_with_tickets, 4,
+    ),
+    # orders
+    query_count_case(
+        "order_list", "get", url("train:order-list"),
+        orders_with_tickets, 6,
+    ),
+    query_count_case(
+        "order_create", "post", url("train:order-list"), seats_to_book,
+        15, data=booking,
+    ),
+    # seat holds
+    query_count_case(
+        "hold_list", "get", url("train:seathold-list"), held_seats, 1,
+    ),
+    query_count_case(
+        "hold_create", "post", url("train:seathold-list"), seats_to_book,
+        11, data=hold_request,
+    ),
+    query_count_case(
+        "hold_confirm", "post", url("train:seathold-confirm"), held_seats,
+        17,
+    ),
+    query_count_case(
+        "hold_destroy", "delete", url("train:seathold-detail", "hold"),
+        held_seats, 2,
+    ),
+    # journeys
+    query_count_case(
+        "journey_list", "get",
+        lambda context: reverse("train:journey-list"), journeys, 5,
+        data=lambda context: context["params"],
+    ),
+    # exports
+    query_count_case(
+        "export_tickets", "get",
+        lambda context: reverse("train:export", args=["tickets"]),
+        lambda size: as_admin(trip_with_tickets(size)), 1,
+    ),
+    query_count_case(
+        "export_orders", "get",
+        lambda context: reverse("train:export", args=["orders"]),
+        lambda size: as_admin(orders_with_tickets(size)), 1,
+    ),
+    # users
+    query_count_case(
+        "user_register", "post", url("user:create"), other_users, 2,
+        data=lambda context: {"email": "new@test.com", "password": "12345"},
+    ),
+    query_count_case(
+        "user_token", "post", url("user:token_obtain_pair"), other_users,
+        1,
+        data=lambda context: {
+            "email": "user@test.com", "password": "testpass"
+        },
+    ),
+    query_count_case(
+        "user_me", "get", url("user:manage"), other_users, 0,
+    ),
+    query_count_case(
+        "user_me_update", "patch", url("user:manage"), other_users, 2,
+        data=lambda context: {"email": "renamed@test.com"},
+    ),
+]
+
+
+@generate_tests(CASES)
+class QueryCountTests(QueryCountTestMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
@@ -0,0 +1,204 @@
+from datetime import datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from train.models import (
+    Crew,
+    Order,
+    Route,
+    Station,
+    Ticket,
+    Train,
+    TrainType,
+    Trip
+)
+from train.readers import TicketRows, TripRows
+from train.renderers import FastJSONRenderer
+from train.serializers import (
+    TicketListSerializer,
+    TripListOrRetrieveSerializer
+)
+from train.views import TicketViewSet, TripViewSet
+
+TRIP_URL = reverse("train:trip-list")
+TICKET_URL = reverse("train:ticket-list")
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+class ReaderParityTests(TestCase):
+    """The readers give the bytes of the serializers they replace"""
+
+    @classmethod
+    def setUpTestData(cls):
+        kyiv = Station.objects.create(
+            name="Київ", latitude=50.45, longitude=30.52
+        )
+        lviv = Station.objects.create(
+            name="Львів", latitude=49.84, longitude=24.03
+        )
+        route = Route.objects.create(
+            source=kyiv, destination=lviv, distance=540
+        )
+        train_type = TrainType.objects.create(name="Інтерсіті+")
+        trains = [
+            Train.objects.create(
+                name="Ukrzaliznytsia 743",
+                cargo_num=3,
+                places_in_cargo=4,
+                train_type=train_type
+            ),
+            Train.objects.create(
+                name='Нічний\u2028"експрес"\u2029',
+                cargo_num=1,
+                places_in_cargo=2,
+                train_type=train_type
+            ),
+        ]
+        crews = [
+            Crew.objects.create(first_name="Олена", last_name="Петренко"),
+            Crew.objects.create(first_name="John", last_name="O'Neil"),
+        ]
+        user = get_user_model().objects.create_user(
+            "reader@test.com", "testpass"
+        )
+        order = Order.objects.create(user=user)
+
+        # winter (+02:00), summer (+03:00) and microseconds
+        departures = [
+            timezone.make_aware(datetime(2024, 1, 15, 8, 30)),
+            timezone.make_aware(datetime(2024, 7, 1, 23, 5, 0, 120000)),
+            timezone.make_aware(datetime(2024, 7, 1, 23, 5)),
+        ]
+        cls.trips = []
+        for number, departure in enumerate(departures):
+            trip = Trip.objects.create(
+                route=route,
+                train=trains[number % 2],
+                departure_time=departure,
+                arrival_time=departure + timedelta(hours=7)
+            )
+            trip.crews.set(crews[:number])
+            cls.trips.append(trip)
+
+        for trip, cargo, seat in (
+                (cls.trips[0], 1, 1),
+                (cls.trips[0], 1, 2),
+                (cls.trips[0], 3, 4),
+                (cls.trips[1], 1, 2),
+                (cls.trips[2], 2, 1),
+        ):
+            Ticket.objects.create(
+                trip=trip, order=order, cargo=cargo, seat=seat
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.get(email="reader@test.com")
+        )
+
+    def test_trip_rows_match_serializer(self):
+        trips = TripViewSet.queryset.order_by("id")
+        rows = list(trips.prefetch_related(None).values(*TripRows().fields))
+
+        self.assertEqual(
+            render(TripRows().represent(rows)),
+            render(TripListOrRetrieveSerializer(trips, many=True).data)
+        )
+
+    def test_ticket_rows_match_serializer(self):
+        tickets = TicketViewSet.queryset.order_by("id")
+        rows = list(
+            tickets.prefetch_related(None).values(*TicketRows().fields)
+        )
+
+        self.assertEqual(
+            render(TicketRows().represent(rows)),
+            render(TicketListSerializer(tickets, many=True).data)
+        )
+
+    def test_trip_list_response_matches_serializer(self):
+        res = self.client.get(TRIP_URL, {"pagination": "cursor"})
+
+        trips = TripViewSet.queryset.order_by("departure_time", "id")
+        self.assertEqual(
+            res.content,
+            render({
+                "next": None,
+                "previous": None,
+                "results": TripListOrRetrieveSerializer(
+                    trips, many=True
+                ).data,
+            })
+        )
+
+    def test_ticket_list_response_matches_serializer(self):
+        res = self.client.get(
+            TICKET_URL, {"pagination": "cursor", "page_size": 2}
+        )
+
+        tickets = TicketViewSet.queryset.order_by(
+            "trip_id", "cargo", "seat", "id"
+        )[:2]
+        self.assertEqual(
+            res.content,
+            render({
+                "next": res.data["next"],
+                "previous": None,
+                "results": TicketListSerializer(tickets, many=True).data,
+            })
+        )
+
+    def test_filtered_ticket_list_matches_serializer(self):
+        trip = self.trips[0]
+        res = self.client.get(
+            TICKET_URL, {"trips": str(trip.id), "limit": 10}
+        )
+
+        tickets = TicketViewSet.queryset.filter(trip=trip)
+        self.assertEqual(
+            res.content,
+            render({
+                "count": 3,
+                "next": None,
+                "previous": None,
+                "results": TicketListSerializer(tickets, many=True).data,
+            })
+        )
+
+    def test_empty_list(self):
+        res = self.client.get(TRIP_URL, {"departure_time": "2000-01-01"})
+
+        self.assertEqual(res.content, b"[]")
+
+
+class FastJSONRendererTests(TestCase):
+    data = {
+        "name": 'Київ\u2028\u2029 "quoted"',
+        "numbers": [1, 2.5, None, True],
+        "nested": {"1": {"empty": []}},
+    }
+
+    def test_same_bytes_as_json_renderer(self):
+        self.assertEqual(
+            FastJSONRenderer().render(self.data),
+            JSONRenderer().render(self.data)
+        )
+
+    def test_indent_is_left_to_json_renderer(self):
+        media_type = "application/json; indent=2"
+        self.assertEqual(
+            FastJSONRenderer().render(self.data, media_type),
+            JSONRenderer().render(self.data, media_type)
+        )
+
+    def test_none(self):
+        self.assertEqual(FastJSONRenderer().render(None), b"")
@@ -0,0 +1,167 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from train.models import Route, Station, TableVersion, TrainType
+
+STATION_URL = reverse("train:station-list")
+ROUTE_URL = reverse("train:route-list")
+
+
+def detail_station_url(station_id):
+    return reverse("train:station-detail", args=[station_id])
+
+
+class ReferenceCacheTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        self.station = Station.objects.create(
+            name="Lviv", latitude=49.8, longitude=24.0
+        )
+
+    def test_list_is_served_from_cache(self):
+        first = self.client.get(STATION_URL)
+
+        # the table versions only
+        with self.assertNumQueries(1):
+            second = self.client.get(STATION_URL)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(first["ETag"], second["ETag"])
+
+    def test_write_expires_cached_payloads(self):
+        self.client.get(STATION_URL)
+        self.client.get(detail_station_url(self.station.id))
+
+        self.station.name = "Lviv-Holovnyi"
+        self.station.save()
+
+        res = self.client.get(STATION_URL)
+        self.assertEqual(res.data[0]["name"], "Lviv-Holovnyi")
+        res = self.client.get(detail_station_url(self.station.id))
+        self.assertEqual(res.data["name"], "Lviv-Holovnyi")
+
+    def test_write_of_another_worker_expires_payloads(self):
+        self.client.get(STATION_URL)
+
+        # another worker, with its own cache, renames the station
+        Station.objects.filter(pk=self.station.pk).update(name="Lemberg")
+        TableVersion.bump(Station)
+
+        res = self.client.get(STATION_URL)
+        self.assertEqual(res.data[0]["name"], "Lemberg")
+
+    def test_dependent_model_expires_payload(self):
+        Route.objects.create(
+            source=self.station,
+            destination=Station.objects.create(
+                name="Kyiv", latitude=50.4, longitude=30.5
+            ),
+            distance=540
+        )
+        self.assertEqual(
+            self.client.get(ROUTE_URL).data[0]["source"], "Lviv"
+        )
+
+        self.station.name = "Lemberg"
+        self.station.save()
+
+        self.assertEqual(
+            self.client.get(ROUTE_URL).data[0]["source"], "Lemberg"
+        )
+
+    def test_if_none_match(self):
+        etag = self.client.get(STATION_URL)["ETag"]
+
+        # the table versions only
+        with self.assertNumQueries(1):
+            res = self.client.get(STATION_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Station.objects.create(name="Kyiv", latitude=50.4, longitude=30.5)
+        res = self.client.get(STATION_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+
+    @override_settings(ALLOWED_HOSTS=["a.example", "b.example"])
+    def test_pagination_links_of_the_requested_host(self):
+        Station.objects.create(name="Kyiv", latitude=50.4, longitude=30.5)
+        for host in ("a.example", "b.example"):
+            res = self.client.get(
+                STATION_URL, {"limit": 1}, HTTP_HOST=host
+            )
+            self.assertTrue(res.data["next"].startswith(f"http://{host}/"))
+
+
+class ReferenceCachePermissionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_cache_does_not_bypass_auth(self):
+        user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        client.get(STATION_URL)
+
+        res = APIClient().get(STATION_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class TableVersionTests(TestCase):
+    def setUp(self):
+        TableVersion.bump(Station, TrainType)
+
+    def test_writes_of_a_transaction_bump_once_on_commit(self):
+        before = TableVersion.current(Station, TrainType)
+
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                for name in ("Lviv", "Kyiv", "Odesa"):
+                    Station.objects.create(name=name, latitude=1, longitude=1)
+                TrainType.objects.create(name="type1")
+
+                self.assertEqual(
+                    TableVersion.current(Station, TrainType), before
+                )
+
+        self.assertEqual(
+            TableVersion.current(Station, TrainType),
+            {Station: before[Station] + 1, TrainType: before[TrainType] + 1}
+        )
+        updates = [
+            query["sql"] for query in queries.captured_queries
+            if query["sql"].startswith('UPDATE "train_tableversion"')
+        ]
+        self.assertEqual(len(updates), 1)
+
+    def test_rolled_back_writes_are_not_bumped(self):
+        before = TableVersion.current(Station, TrainType)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    TrainType.objects.create(name="type1")
+                    raise RuntimeError
+            Station.objects.create(name="Lviv", latitude=1, longitude=1)
+
+        self.assertEqual(
+            TableVersion.current(Station, TrainType),
+            {Station: before[Station] + 1, TrainType: before[TrainType]}
+        )
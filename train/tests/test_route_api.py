@@ -0,0 +1,152 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from train.models import Route, Station, TableVersion
+from train.station_names import normalize, station_names
+
+ROUTE_URL = reverse("train:route-list")
+
+
+class NormalizeTests(SimpleTestCase):
+    def test_case_diacritics_and_script_are_folded(self):
+        for name in ("Київ", "КИЇВ", "Kyiv", "kyïv", " kyiv "):
+            self.assertEqual(normalize(name), "kyiv")
+
+    def test_ukrainian_transliteration(self):
+        for name, latin in (
+                ("Львів", "lviv"),
+                ("Запоріжжя", "zaporizhzhia"),
+                ("Ямпіль", "yampil"),
+                ("Згорани", "zghorany"),
+                ("Мар'янівка", "marianivka"),
+                ("Київ-Пасажирський", "kyiv pasazhyrskyi"),
+        ):
+            self.assertEqual(normalize(name), latin)
+
+    def test_no_letters(self):
+        self.assertEqual(normalize(" - "), "")
+
+
+class RouteSearchTests(TestCase):
+    def setUp(self):
+        # no cached payloads, a fresh Station version for the index
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        self.kyiv, self.kyiv_darnytsia, self.lviv, self.odesa = (
+            Station.objects.create(name=name, latitude=1, longitude=1)
+            for name in ("Київ-Пасажирський", "Київ-Дарниця", "Lviv", "Odesa")
+        )
+        self.routes = {
+            (source, destination): Route.objects.create(
+                source=source, destination=destination, distance=1
+            )
+            for source, destination in (
+                (self.kyiv, self.lviv),
+                (self.kyiv_darnytsia, self.odesa),
+                (self.lviv, self.kyiv),
+                (self.lviv, self.odesa),
+            )
+        }
+
+    def search(self, **params):
+        res = self.client.get(ROUTE_URL, params)
+        self.assertEqual(res.status_code, 200)
+        return {route["id"] for route in res.data}
+
+    def route_ids(self, *pairs):
+        return {self.routes[pair].id for pair in pairs}
+
+    def test_destination_is_filtered_by_destination(self):
+        self.assertEqual(
+            self.search(destination="Odesa"),
+            self.route_ids(
+                (self.kyiv_darnytsia, self.odesa), (self.lviv, self.odesa)
+            )
+        )
+
+    def test_source_and_destination(self):
+        self.assertEqual(
+            self.search(source="lviv", destination="odesa"),
+            self.route_ids((self.lviv, self.odesa))
+        )
+
+    def test_prefix_of_the_name_or_of_a_word(self):
+        self.assertEqual(
+            self.search(source="Kyiv"),
+            self.route_ids(
+                (self.kyiv, self.lviv), (self.kyiv_darnytsia, self.odesa)
+            )
+        )
+        self.assertEqual(
+            self.search(source="darn"),
+            self.route_ids((self.kyiv_darnytsia, self.odesa))
+        )
+
+    def test_cyrillic_query_of_latin_name(self):
+        self.assertEqual(
+            self.search(source="ЛЬВІВ"),
+            self.route_ids((self.lviv, self.kyiv), (self.lviv, self.odesa))
+        )
+
+    def test_fuzzy_match_when_no_name_starts_with_query(self):
+        self.assertEqual(
+            self.search(destination="Odessa"),
+            self.route_ids(
+                (self.kyiv_darnytsia, self.odesa), (self.lviv, self.odesa)
+            )
+        )
+        self.assertEqual(
+            self.search(source="Lvov", destination="Kiev"),
+            self.route_ids((self.lviv, self.kyiv))
+        )
+
+    def test_unknown_station(self):
+        self.assertEqual(self.search(source="Kharkiv"), set())
+
+    def test_search_query_count(self):
+        station_names.invalidate()
+        # versions of the cache key and of the index, the stations, the
+        # routes
+        with self.assertNumQueries(4):
+            self.search(source="Lviv", destination="Odesa")
+
+
+class StationNameIndexTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.station = Station.objects.create(
+            name="Lviv", latitude=1, longitude=1
+        )
+
+    def test_rename_is_picked_up(self):
+        self.assertEqual(station_names.resolve("Lviv"), {self.station.id})
+
+        self.station.name = "Lviv-Holovnyi"
+        self.station.save()
+        other = Station.objects.create(name="Lutsk", latitude=1, longitude=1)
+
+        self.assertEqual(station_names.resolve("holov"), {self.station.id})
+        self.assertEqual(station_names.resolve("Lutsk"), {other.id})
+
+    def test_write_of_another_process_is_picked_up(self):
+        self.assertEqual(station_names.resolve("Rivne"), set())
+
+        # no signal reaches this process, only the version row changes
+        Station.objects.bulk_create(
+            [Station(name="Rivne", latitude=1, longitude=1)]
+        )
+        TableVersion.bump(Station)
+
+        self.assertEqual(
+            station_names.resolve("Rivne"),
+            {Station.objects.get(name="Rivne").id}
+        )
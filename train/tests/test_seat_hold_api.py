@@ -0,0 +1,172 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from train.models import (
+    SeatHold,
+    Ticket,
+    Trip,
+    Route,
+    Station,
+    TrainType,
+    Train
+)
+
+HOLD_URL = reverse("train:seathold-list")
+CONFIRM_URL = reverse("train:seathold-confirm")
+ORDER_URL = reverse("train:order-list")
+
+
+def sample_trip(**params):
+    route = Route.objects.create(
+        source=Station.objects.create(name="st1", latitude=1, longitude=1),
+        destination=Station.objects.create(
+            name="st2", latitude=2, longitude=2
+        ),
+        distance=3
+    )
+    train = Train.objects.create(
+        name="tr1",
+        cargo_num=2,
+        places_in_cargo=3,
+        train_type=TrainType.objects.create(name="type1")
+    )
+    defaults = {
+        "route": route,
+        "train": train,
+        "departure_time": "2023-12-08T19:54:28+02:00",
+        "arrival_time": "2023-12-10T19:54:28+02:00",
+    }
+    defaults.update(params)
+
+    return Trip.objects.create(**defaults)
+
+
+class SeatHoldApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.other = get_user_model().objects.create_user(
+            "other@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        self.trip = sample_trip()
+
+    def hold(self, seats):
+        payload = {
+            "trip": self.trip.id,
+            "seats": [{"cargo": cargo, "seat": seat} for cargo, seat in seats]
+        }
+        return self.client.post(HOLD_URL, payload, format="json")
+
+    def test_hold_seats(self):
+        res = self.hold([(1, 1), (2, 3)])
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 2)
+        self.assertEqual(
+            SeatHold.objects.filter(user=self.user).count(), 2
+        )
+
+    def test_seat_out_of_train(self):
+        res = self.hold([(1, 1), (1, 4)])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data["seats"][0], {})
+        self.assertIn("seat", res.data["seats"][1])
+
+    def test_seat_held_by_another_user(self):
+        SeatHold.objects.create(
+            trip=self.trip,
+            cargo=1,
+            seat=1,
+            user=self.other,
+            expires_at=timezone.now() + timedelta(minutes=5)
+        )
+
+        res = self.hold([(1, 1)])
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        payload = {
+            "tickets": [{"cargo": 1, "seat": 1, "trip": self.trip.id}]
+        }
+        res = self.client.post(ORDER_URL, payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_expired_hold_does_not_block(self):
+        SeatHold.objects.create(
+            trip=self.trip,
+            cargo=1,
+            seat=1,
+            user=self.other,
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        res = self.hold([(1, 1)])
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(SeatHold.objects.get().user, self.user)
+
+    def test_confirm_holds(self):
+        self.hold([(1, 1), (1, 2)])
+
+        res = self.client.post(CONFIRM_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data["tickets"]), 2)
+        self.assertFalse(SeatHold.objects.exists())
+        self.trip.refresh_from_db()
+        self.assertEqual(self.trip.sold_count, 2)
+
+    def test_confirm_without_holds(self):
+        res = self.client.post(CONFIRM_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_held_seats_are_taken_on_seat_map(self):
+        self.hold([(1, 1)])
+
+        res = self.client.get(reverse("train:trip-seats", args=[self.trip.id]))
+
+        self.assertEqual(res.data["taken"], 1)
+
+
+class ReleaseExpiredHoldsCommandTests(TestCase):
+    def test_release_expired_holds(self):
+        user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        trip = sample_trip()
+        now = timezone.now()
+        for seat, expires_at in [
+            (1, now - timedelta(minutes=1)),
+            (2, now - timedelta(minutes=2)),
+            (3, now + timedelta(minutes=1)),
+        ]:
+            SeatHold.objects.create(
+                trip=trip, cargo=1, seat=seat, user=user, expires_at=expires_at
+            )
+
+        call_command(
+            "release_expired_holds", "--batch-size", "1", stdout=StringIO()
+        )
+
+        self.assertEqual(
+            list(SeatHold.objects.values_list("seat", flat=True)), [3]
+        )
@@ -0,0 +1,120 @@
+import base64
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from train.models import (
+    Order,
+    Ticket,
+    Trip,
+    Route,
+    Station,
+    TrainType,
+    Train
+)
+from train.seats import SeatMap
+
+
+def sample_trip(**params):
+    route = Route.objects.create(
+        source=Station.objects.create(name="st1", latitude=1, longitude=1),
+        destination=Station.objects.create(
+            name="st2", latitude=2, longitude=2
+        ),
+        distance=3
+    )
+    train = Train.objects.create(
+        name="tr1",
+        cargo_num=3,
+        places_in_cargo=5,
+        train_type=TrainType.objects.create(name="type1")
+    )
+    defaults = {
+        "route": route,
+        "train": train,
+        "departure_time": "2023-12-08T19:54:28+02:00",
+        "arrival_time": "2023-12-10T19:54:28+02:00",
+    }
+    defaults.update(params)
+
+    return Trip.objects.create(**defaults)
+
+
+def seat_map_url(trip_id):
+    return reverse("train:trip-seats", args=[trip_id])
+
+
+class SeatMapTests(TestCase):
+    def test_bits_are_packed_cargo_by_cargo(self):
+        seat_map = SeatMap(cargo_num=2, places_in_cargo=5)
+        seat_map.take(1, 1)
+        seat_map.take(2, 4)
+        seat_map.take(2, 4)
+
+        self.assertEqual(seat_map.taken, 2)
+        self.assertEqual(seat_map.to_bytes(), bytes([0b10000000, 0b10000000]))
+        self.assertTrue(seat_map.is_taken(2, 4))
+        self.assertFalse(seat_map.is_taken(2, 5))
+
+    def test_seat_out_of_train_rejected(self):
+        seat_map = SeatMap(cargo_num=2, places_in_cargo=5)
+
+        with self.assertRaises(IndexError):
+            seat_map.take(3, 1)
+
+
+class UnauthenticatedSeatMapApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        trip = sample_trip()
+
+        res = self.client.get(seat_map_url(trip.id))
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class AuthenticatedSeatMapApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        self.trip = sample_trip()
+        order = Order.objects.create(user=self.user)
+        for cargo, seat in [(1, 2), (3, 5)]:
+            Ticket.objects.create(
+                trip=self.trip, order=order, cargo=cargo, seat=seat
+            )
+
+    def test_seat_map_json(self):
+        res = self.client.get(seat_map_url(self.trip.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["cargo_num"], 3)
+        self.assertEqual(res.data["places_in_cargo"], 5)
+        self.assertEqual(res.data["taken"], 2)
+        self.assertEqual(
+            base64.b64decode(res.data["bitmap"]),
+            bytes([0b01000000, 0b00000010])
+        )
+
+    def test_seat_map_binary(self):
+        res = self.client.get(seat_map_url(self.trip.id), {"format": "bin"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "application/octet-stream")
+        self.assertEqual(res["X-Places-In-Cargo"], "5")
+        self.assertEqual(res.content, bytes([0b01000000, 0b00000010]))
+
+    def test_seat_map_of_missing_trip(self):
+        res = self.client.get(seat_map_url(self.trip.id + 1))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,272 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command, CommandError
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from train.models import (
+    CargoOccupancy,
+    Order,
+    Ticket,
+    Trip,
+    Route,
+    Station,
+    TrainType,
+    Train
+)
+
+ORDER_URL = reverse("train:order-list")
+TRIP_URL = reverse("train:trip-list")
+
+
+def sample_trip(**params):
+    route = Route.objects.create(
+        source=Station.objects.create(name="st1", latitude=1, longitude=1),
+        destination=Station.objects.create(
+            name="st2", latitude=2, longitude=2
+        ),
+        distance=3
+    )
+    train = Train.objects.create(
+        name="tr1",
+        cargo_num=2,
+        places_in_cargo=3,
+        train_type=TrainType.objects.create(name="type1")
+    )
+    defaults = {
+        "route": route,
+        "train": train,
+        "departure_time": "2023-12-08T19:54:28+02:00",
+        "arrival_time": "2023-12-10T19:54:28+02:00",
+    }
+    defaults.update(params)
+
+    return Trip.objects.create(**defaults)
+
+
+class SoldCountTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        self.trip = sample_trip()
+
+    def test_order_increments_sold_count(self):
+        payload = {
+            "tickets": [
+                {"cargo": 1, "seat": 1, "trip": self.trip.id},
+                {"cargo": 2, "seat": 3, "trip": self.trip.id},
+            ]
+        }
+
+        res = self.client.post(ORDER_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.trip.refresh_from_db()
+        self.assertEqual(self.trip.sold_count, 2)
+        trip = Trip.objects.with_tickets_available().get(pk=self.trip.pk)
+        self.assertEqual(trip.tickets_available, 4)
+
+    def test_delete_decrements_sold_count(self):
+        order = Order.objects.create(user=self.user)
+        ticket = Ticket.objects.create(
+            trip=self.trip, order=order, cargo=1, seat=1
+        )
+        Ticket.objects.create(trip=self.trip, order=order, cargo=1, seat=2)
+
+        ticket.delete()
+        self.trip.refresh_from_db()
+        self.assertEqual(self.trip.sold_count, 1)
+
+        order.delete()
+        self.trip.refresh_from_db()
+        self.assertEqual(self.trip.sold_count, 0)
+
+    def test_bulk_delete_decrements_sold_seats(self):
+        order = Order.objects.create(user=self.user)
+        for cargo, seat in ((1, 1), (1, 2), (2, 1)):
+            Ticket.objects.create(
+                trip=self.trip, order=order, cargo=cargo, seat=seat
+            )
+
+        Ticket.objects.filter(trip=self.trip, seat=1).delete()
+
+        self.trip.refresh_from_db()
+        self.assertEqual(self.trip.sold_count, 1)
+        self.assertEqual(
+            dict(self.trip.cargo_occupancy.values_list("cargo", "sold")),
+            {1: 1, 2: 0}
+        )
+
+    def test_moving_ticket_to_another_trip(self):
+        other_trip = Trip.objects.create(
+            route=self.trip.route,
+            train=self.trip.train,
+            departure_time="2023-12-11T19:54:28+02:00",
+            arrival_time="2023-12-12T19:54:28+02:00",
+        )
+        order = Order.objects.create(user=self.user)
+        ticket = Ticket.objects.create(
+            trip=self.trip, order=order, cargo=1, seat=1
+        )
+
+        ticket.trip = other_trip
+        ticket.save()
+
+        self.trip.refresh_from_db()
+        other_trip.refresh_from_db()
+        self.assertEqual(self.trip.sold_count, 0)
+        self.assertEqual(other_trip.sold_count, 1)
+
+
+class CargoOccupancyTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        self.trip = sample_trip()
+        self.order = Order.objects.create(user=self.user)
+
+    def free_seats(self):
+        return Trip.objects.get(pk=self.trip.pk).free_seats_by_cargo
+
+    def test_order_fills_cargos(self):
+        payload = {
+            "tickets": [
+                {"cargo": 1, "seat": 1, "trip": self.trip.id},
+                {"cargo": 1, "seat": 2, "trip": self.trip.id},
+                {"cargo": 2, "seat": 3, "trip": self.trip.id},
+            ]
+        }
+
+        res = self.client.post(ORDER_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.free_seats(), {1: 1, 2: 2})
+
+    def test_delete_frees_seat(self):
+        ticket = Ticket.objects.create(
+            trip=self.trip, order=self.order, cargo=2, seat=1
+        )
+        self.assertEqual(self.free_seats(), {1: 3, 2: 2})
+
+        ticket.delete()
+        self.assertEqual(self.free_seats(), {1: 3, 2: 3})
+
+    def test_moving_ticket_to_another_cargo(self):
+        ticket = Ticket.objects.create(
+            trip=self.trip, order=self.order, cargo=1, seat=1
+        )
+
+        ticket.cargo = 2
+        ticket.save()
+
+        self.assertEqual(self.free_seats(), {1: 3, 2: 2})
+        self.assertEqual(
+            dict(
+                CargoOccupancy.objects.filter(
+                    trip=self.trip
+                ).values_list("cargo", "sold")
+            ),
+            {1: 0, 2: 1}
+        )
+
+    def test_trip_list_shows_free_seats_by_cargo(self):
+        Ticket.objects.create(
+            trip=self.trip, order=self.order, cargo=2, seat=1
+        )
+
+        res = self.client.get(TRIP_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data[0]["free_seats_by_cargo"], {"1": 3, "2": 2}
+        )
+        self.assertEqual(res.data[0]["tickets_available"], 5)
+
+
+class RebuildSoldCountsCommandTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.trip = sample_trip()
+        order = Order.objects.create(user=user)
+        Ticket.objects.create(trip=self.trip, order=order, cargo=1, seat=1)
+        Trip.objects.filter(pk=self.trip.pk).update(sold_count=5)
+
+    def test_check_reports_drift(self):
+        with self.assertRaises(CommandError):
+            call_command("rebuild_sold_counts", "--check", stdout=StringIO())
+
+        self.trip.refresh_from_db()
+        self.assertEqual(self.trip.sold_count, 5)
+
+    def test_rebuild_fixes_drift(self):
+        call_command("rebuild_sold_counts", stdout=StringIO())
+
+        self.trip.refresh_from_db()
+        self.assertEqual(self.trip.sold_count, 1)
+        call_command("rebuild_sold_counts", "--check", stdout=StringIO())
+
+    def test_rebuild_fixes_cargo_drift(self):
+        Trip.objects.filter(pk=self.trip.pk).update(sold_count=1)
+        CargoOccupancy.objects.filter(trip=self.trip).delete()
+        CargoOccupancy.objects.create(trip=self.trip, cargo=2, sold=2)
+        with self.assertRaises(CommandError):
+            call_command("rebuild_sold_counts", "--check", stdout=StringIO())
+
+        call_command("rebuild_sold_counts", stdout=StringIO())
+
+        self.assertEqual(
+            dict(
+                CargoOccupancy.objects.filter(
+                    trip=self.trip
+                ).values_list("cargo", "sold")
+            ),
+            {1: 1, 2: 0}
+        )
+        call_command("rebuild_sold_counts", "--check", stdout=StringIO())
+
+
+class CascadeDeleteTests(TransactionTestCase):
+    """Deletes committed for real: foreign keys are checked"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "admin@test.com", "testpass", is_staff=True
+        )
+        self.trip = sample_trip()
+        order = Order.objects.create(user=self.user)
+        for cargo, seat in ((1, 1), (1, 2), (2, 1)):
+            Ticket.objects.create(
+                trip=self.trip, order=order, cargo=cargo, seat=seat
+            )
+
+    def test_delete_trip_with_tickets(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        res = client.delete(reverse("train:trip-detail", args=[self.trip.id]))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Ticket.objects.exists())
+        self.assertFalse(CargoOccupancy.objects.exists())
+
+    def test_delete_train_with_tickets(self):
+        self.trip.train.delete()
+
+        self.assertFalse(Trip.objects.exists())
+        self.assertFalse(Ticket.objects.exists())
+        self.assertFalse(CargoOccupancy.objects.exists())
@@ -0,0 +1,94 @@
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from train import geo
+from train.models import Station
+
+NEARBY_URL = reverse("train:station-nearby")
+
+KYIV = (50.4401, 30.4895)
+
+
+class GeohashTests(SimpleTestCase):
+    def test_encode(self):
+        self.assertEqual(geo.encode(57.64911, 10.40744, 11), "u4pruydqqvj")
+
+    def test_haversine(self):
+        lviv = (49.8397, 24.0297)
+        self.assertAlmostEqual(
+            geo.haversine_km(*KYIV, *lviv), 466, delta=5
+        )
+
+    def test_cells_cover_circle(self):
+        for radius_km in (0.5, 5, 50, 300):
+            cells = geo.covering_cells(*KYIV, radius_km)
+            self.assertTrue(cells)
+            for lat_step in (-1, 0, 1):
+                for lon_step in (-1, 0, 1):
+                    # points just inside the circle, in each direction
+                    lat = KYIV[0] + lat_step * radius_km * 0.99 / 111.2
+                    lon = KYIV[1] + lon_step * radius_km * 0.99 / 71.0
+                    if geo.haversine_km(*KYIV, lat, lon) > radius_km:
+                        continue
+                    geohash = geo.encode(lat, lon)
+                    self.assertTrue(
+                        any(geohash.startswith(cell) for cell in cells)
+                    )
+
+    def test_huge_radius_is_not_covered(self):
+        self.assertEqual(geo.covering_cells(*KYIV, 20000), set())
+
+
+class NearbyStationsApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_nearby_stations(self):
+        Station.objects.create(
+            name="Kyiv-Pasazhyrskyi", latitude=50.4401, longitude=30.4895
+        )
+        Station.objects.create(
+            name="Darnytsia", latitude=50.4558, longitude=30.6292
+        )
+        Station.objects.create(
+            name="Lviv", latitude=49.8397, longitude=24.0297
+        )
+
+        res = self.client.get(
+            NEARBY_URL, {"lat": 50.45, "lon": 30.5, "radius_km": 20}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [station["name"] for station in res.data],
+            ["Kyiv-Pasazhyrskyi", "Darnytsia"]
+        )
+        self.assertLess(res.data[0]["distance_km"], res.data[1]["distance_km"])
+
+    def test_limit(self):
+        for index in range(5):
+            Station.objects.create(
+                name=f"st{index}", latitude=50 + index / 100, longitude=30
+            )
+
+        res = self.client.get(
+            NEARBY_URL, {"lat": 50, "lon": 30, "radius_km": 50, "limit": 2}
+        )
+
+        self.assertEqual(
+            [station["name"] for station in res.data], ["st0", "st1"]
+        )
+
+    def test_coordinates_required(self):
+        res = self.client.get(NEARBY_URL, {"lat": 50})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
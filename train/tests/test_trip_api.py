@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
 
@@ -19,6 +20,7 @@ from train.serializers import (
 )
 
 TRIP_URL = reverse("train:trip-list")
+TRIP_SEARCH_URL = reverse("train:trip-search")
 
 
 def sample_crew(**params):
@@ -174,3 +176,143 @@ class AdminTripApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_201_CREATED)
         self.assertEqual(payload["departure_time"], res.data["departure_time"])
         self.assertEqual(payload["arrival_time"], res.data["arrival_time"])
+
+
+class TripSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        # the table versions are bumped on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            self.route = sample_route()
+            self.intercity = sample_type_train(name="intercity")
+            self.train = sample_train(train_type=self.intercity)
+
+    def trip(self, departure, route=None, train=None):
+        return Trip.objects.create(
+            route=route or self.route,
+            train=train or self.train,
+            departure_time=departure,
+            arrival_time="2023-12-31T00:00:00+02:00",
+        )
+
+    def search(self, **params):
+        params.setdefault("source", self.route.source_id)
+        params.setdefault("destination", self.route.destination_id)
+        params.setdefault("departure_after", "2023-12-09T00:00:00+02:00")
+        params.setdefault("departure_before", "2023-12-11T00:00:00+02:00")
+        return self.client.get(TRIP_SEARCH_URL, params)
+
+    def test_route_and_departure_window(self):
+        saturday = self.trip("2023-12-09T08:00:00+02:00")
+        sunday = self.trip("2023-12-10T23:00:00+02:00")
+        self.trip("2023-12-08T23:59:00+02:00")
+        self.trip("2023-12-11T00:00:00+02:00")
+        self.trip(
+            "2023-12-09T08:00:00+02:00",
+            route=sample_route(
+                source=self.route.destination,
+                destination=self.route.source
+            )
+        )
+
+        res = self.search()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [trip["id"] for trip in res.data["results"]], [saturday.id, sunday.id]
+        )
+        self.assertEqual(res.data["results"][0]["tickets_available"], 6)
+
+    def test_min_seats(self):
+        full = self.trip("2023-12-09T08:00:00+02:00")
+        free = self.trip("2023-12-09T09:00:00+02:00")
+        Trip.objects.filter(pk=full.pk).update(sold_count=5)
+
+        res = self.search(min_seats=2)
+
+        self.assertEqual([trip["id"] for trip in res.data["results"]], [free.id])
+
+    def test_train_type(self):
+        self.trip("2023-12-09T08:00:00+02:00")
+        regional = self.trip(
+            "2023-12-09T09:00:00+02:00",
+            train=sample_train(
+                train_type=sample_type_train(name="regional")
+            )
+        )
+
+        res = self.search(train_type=regional.train.train_type_id)
+
+        self.assertEqual([trip["id"] for trip in res.data["results"]], [regional.id])
+
+    def test_results_are_cached(self):
+        self.trip("2023-12-09T08:00:00+02:00")
+        self.search()
+
+        # the table versions only
+        with self.assertNumQueries(1):
+            res = self.search()
+        self.assertEqual(res.data["count"], 1)
+
+    def test_equivalent_searches_share_the_cache(self):
+        self.trip("2023-12-09T08:00:00+02:00")
+        self.search()
+
+        # the table versions only
+        with self.assertNumQueries(1):
+            res = self.search(
+                departure_after="2023-12-08T22:00:00Z",
+                departure_before="2023-12-10T22:00:00Z",
+                min_seats=1,
+            )
+        self.assertEqual(res.data["count"], 1)
+
+    def test_trip_writes_expire_cached_results(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.trip("2023-12-09T08:00:00+02:00")
+        self.search()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.trip("2023-12-09T09:00:00+02:00")
+
+        self.assertEqual(self.search().data["count"], 2)
+
+    def test_default_page(self):
+        for hour in range(25):
+            self.trip(f"2023-12-09T{hour % 24:02d}:30:00+02:00")
+
+        # table versions, count, page, crews and cargo occupancy
+        with self.assertNumQueries(5):
+            res = self.search()
+
+        self.assertEqual(res.data["count"], 25)
+        self.assertEqual(len(res.data["results"]), 20)
+        self.assertIsNotNone(res.data["next"])
+
+        res = self.search(limit=5, offset=20)
+        self.assertEqual(len(res.data["results"]), 5)
+
+    def test_invalid_window(self):
+        res = self.search(departure_before="2023-12-09T00:00:00+02:00")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.search(departure_before="2024-12-09T00:00:00+02:00")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_default_window_is_a_day(self):
+        trip = self.trip("2023-12-09T23:00:00+02:00")
+        self.trip("2023-12-10T01:00:00+02:00")
+
+        res = self.client.get(TRIP_SEARCH_URL, {
+            "source": self.route.source_id,
+            "destination": self.route.destination_id,
+            "departure_after": "2023-12-09T00:00:00+02:00",
+        })
+
+        self.assertEqual([trip["id"] for trip in res.data["results"]], [trip.id])
@@ -0,0 +1,93 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command, CommandError
+from django.db.utils import OperationalError
+from django.test import TransactionTestCase
+
+from train import health
+
+
+class FakeClock:
+    """time.monotonic and time.sleep of the command"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 3))
+        self.now += seconds
+
+
+class WaitForDbTests(TransactionTestCase):
+    # a failed database check closes the connection, which TestCase
+    # does not allow inside its transaction
+
+    def setUp(self):
+        clock = FakeClock()
+        self.sleeps = clock.sleeps
+        patcher = mock.patch(
+            "train.management.commands.wait_for_db.time",
+            monotonic=clock.monotonic,
+            sleep=clock.sleep,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def wait(self, *args):
+        out = StringIO()
+        call_command("wait_for_db", *args, stdout=out)
+        return out.getvalue()
+
+    def test_database_available(self):
+        out = self.wait()
+
+        self.assertIn("Database available!", out)
+        self.assertEqual(self.sleeps, [])
+
+    def test_retries_with_exponential_backoff(self):
+        down = OperationalError("connection refused")
+        with mock.patch.object(
+            health,
+            "check_database",
+            side_effect=[down, down, down, down, None]
+        ) as check:
+            out = self.wait("--initial-delay", "0.5", "--max-delay", "2")
+
+        self.assertEqual(check.call_count, 5)
+        self.assertEqual(self.sleeps, [0.5, 1, 2, 2])
+        self.assertIn("Database unavailable (connection refused)", out)
+        self.assertIn("Database available!", out)
+
+    def test_gives_up_after_timeout(self):
+        with mock.patch.object(
+            health,
+            "check_database",
+            side_effect=OperationalError("connection refused")
+        ):
+            with self.assertRaises(CommandError):
+                self.wait("--timeout", "3", "--initial-delay", "1")
+
+        # 1 + 2, never sleeping past the deadline
+        self.assertEqual(self.sleeps, [1, 2])
+
+    def test_waits_for_cache_and_migrations(self):
+        with mock.patch.object(
+            health,
+            "check_migrations",
+            side_effect=[health.HealthCheckError("1 unapplied"), None]
+        ):
+            out = self.wait("--cache", "--migrations")
+
+        self.assertIn("Cache available!", out)
+        self.assertIn("Migrations unavailable (1 unapplied)", out)
+        self.assertIn("Migrations available!", out)
+        self.assertEqual(len(self.sleeps), 1)
+
+    def test_check_migrations(self):
+        # the test database is fully migrated
+        health.check_migrations()
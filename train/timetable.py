@@ -0,0 +1,593 @@
+"""Bulk import of seasonal timetables.
+
+A timetable is read either from a flat CSV file (one trip per line) or
+from a GTFS-like feed (a directory or .zip with stops.txt, trips.txt,
+stop_times.txt and optionally calendar_dates.txt and trains.txt).
+
+Rows are imported in batches. Every batch resolves its stations, train
+types, trains, routes and crews through in-memory maps filled from the
+database once, inserts what is missing with bulk_create and updates
+what changed with bulk_update. Trips are upserted on their natural key
+(train, departure_time). The crews of a trip are written directly to
+the Trip.crews through table.
+
+bulk_create bypasses Model.save() and the signals, so the importer
+sets Station.geohash itself, bumps the table versions and refreshes
+the journey index and the reference data cache once committed.
+"""
+import csv
+import io
+import os
+import zipfile
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from train import geo
+from train.journeys import journey_index
+from train.models import (
+    Crew,
+    Route,
+    Station,
+    TableVersion,
+    Train,
+    TrainType,
+    Trip
+)
+
+StopRecord = namedtuple("StopRecord", ["name", "latitude", "longitude"])
+
+TrainRecord = namedtuple(
+    "TrainRecord", ["name", "train_type", "cargo_num", "places_in_cargo"]
+)
+
+TimetableRow = namedtuple(
+    "TimetableRow",
+    [
+        "line",
+        "source",
+        "destination",
+        "distance",
+        "train",
+        "departure_time",
+        "arrival_time",
+        "crews",
+    ]
+)
+
+CSV_REQUIRED_COLUMNS = (
+    "source", "destination", "train", "departure_time", "arrival_time"
+)
+
+
+class TimetableError(ValueError):
+    def __init__(self, line, message):
+        self.line = line
+        super(TimetableError, self).__init__(f"line {line}: {message}")
+
+
+def _optional(value, convert):
+    value = (value or "").strip()
+    return convert(value) if value else None
+
+
+def _aware(value):
+    """UTC datetime, naive values are in the current time zone.
+
+    Aware datetimes in a local zone hash and compare inconsistently
+    around DST changes, which breaks the natural key lookups.
+    """
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value.astimezone(dt_timezone.utc)
+
+
+def _parse_datetime(value):
+    parsed = parse_datetime(value.strip())
+    if parsed is None:
+        raise ValueError(f"invalid datetime {value!r}")
+    return _aware(parsed)
+
+
+def _parse_crews(value):
+    """'Ivan Franko; Lesya Ukrainka' -> [("Ivan", "Franko"), ...]"""
+    crews = []
+    for full_name in (value or "").split(";"):
+        first_name, _, last_name = full_name.strip().partition(" ")
+        if first_name:
+            crews.append((first_name, last_name.strip()))
+    return crews
+
+
+def read_csv(csv_file):
+    """TimetableRows of a CSV file, one trip per line.
+
+    Required columns: source, destination, train, departure_time and
+    arrival_time (ISO 8601). Optional: source_latitude,
+    source_longitude, destination_latitude, destination_longitude and
+    distance, train_type, cargo_num and places_in_cargo for trains that
+    do not exist yet, and crew ("First Last; First Last").
+    """
+    reader = csv.DictReader(csv_file)
+    missing = set(CSV_REQUIRED_COLUMNS) - set(reader.fieldnames or ())
+    if missing:
+        raise TimetableError(
+            1, f"missing columns {', '.join(sorted(missing))}"
+        )
+    has_crews = "crew" in reader.fieldnames
+
+    for line, row in enumerate(reader, start=2):
+        try:
+            yield TimetableRow(
+                line=line,
+                source=StopRecord(
+                    row["source"].strip(),
+                    _optional(row.get("source_latitude"), float),
+                    _optional(row.get("source_longitude"), float),
+                ),
+                destination=StopRecord(
+                    row["destination"].strip(),
+                    _optional(row.get("destination_latitude"), float),
+                    _optional(row.get("destination_longitude"), float),
+                ),
+                distance=_optional(row.get("distance"), int),
+                train=TrainRecord(
+                    row["train"].strip(),
+                    _optional(row.get("train_type"), str),
+                    _optional(row.get("cargo_num"), int),
+                    _optional(row.get("places_in_cargo"), int),
+                ),
+                departure_time=_parse_datetime(row["departure_time"]),
+                arrival_time=_parse_datetime(row["arrival_time"]),
+                crews=_parse_crews(row["crew"]) if has_crews else None,
+            )
+        except (TypeError, ValueError) as error:
+            raise TimetableError(line, error)
+
+
+class _Feed:
+    """Text files of a GTFS-like feed, in a directory or a zip"""
+
+    def __init__(self, path):
+        self.path = path
+        self.archive = (
+            zipfile.ZipFile(path) if zipfile.is_zipfile(path) else None
+        )
+
+    def exists(self, name):
+        if self.archive:
+            return name in self.archive.namelist()
+        return os.path.exists(os.path.join(self.path, name))
+
+    def rows(self, name):
+        if not self.exists(name):
+            raise TimetableError(1, f"{name} is missing from the feed")
+        if self.archive:
+            csv_file = io.TextIOWrapper(
+                self.archive.open(name), encoding="utf-8-sig"
+            )
+        else:
+            csv_file = open(
+                os.path.join(self.path, name), encoding="utf-8-sig", newline=""
+            )
+        with csv_file:
+            yield from csv.DictReader(csv_file)
+
+
+def _gtfs_time(service_date, value):
+    """GTFS HH:MM:SS is counted from the service day and may exceed 24h"""
+    hours, minutes, seconds = (int(part) for part in value.split(":"))
+    midnight = datetime.combine(service_date, datetime.min.time())
+    return _aware(midnight) + timedelta(
+        hours=hours, minutes=minutes, seconds=seconds
+    )
+
+
+def read_gtfs(path):
+    """TimetableRows of a GTFS-like feed.
+
+    Every dated trip runs from its first to its last stop. The train of
+    a trip is its trip_short_name, trains missing from the database are
+    described by the non-standard trains.txt (train_name, train_type,
+    cargo_num, places_in_cargo). Without calendar_dates.txt the
+    service_id is the YYYYMMDD date of service.
+    """
+    feed = _Feed(path)
+
+    stops = {
+        row["stop_id"]: StopRecord(
+            row["stop_name"].strip(),
+            _optional(row.get("stop_lat"), float),
+            _optional(row.get("stop_lon"), float),
+        )
+        for row in feed.rows("stops.txt")
+    }
+
+    trains = {}
+    if feed.exists("trains.txt"):
+        for row in feed.rows("trains.txt"):
+            name = row["train_name"].strip()
+            trains[name] = TrainRecord(
+                name,
+                _optional(row.get("train_type"), str),
+                _optional(row.get("cargo_num"), int),
+                _optional(row.get("places_in_cargo"), int),
+            )
+
+    service_dates = {}
+    if feed.exists("calendar_dates.txt"):
+        for row in feed.rows("calendar_dates.txt"):
+            if row.get("exception_type", "1").strip() == "1":
+                service_dates.setdefault(row["service_id"], []).append(
+                    datetime.strptime(row["date"].strip(), "%Y%m%d").date()
+                )
+
+    # first and last stop of every trip, stop_times.txt is the big file
+    ends = {}
+    for line, row in enumerate(feed.rows("stop_times.txt"), start=2):
+        try:
+            sequence = int(row["stop_sequence"])
+        except (TypeError, ValueError):
+            raise TimetableError(
+                line,
+                f"stop_times.txt: invalid stop_sequence "
+                f"{row['stop_sequence']!r}"
+            )
+        first, last = ends.get(row["trip_id"], (None, None))
+        if first is None or sequence < first[0]:
+            first = (sequence, row)
+        if last is None or sequence > last[0]:
+            last = (sequence, row)
+        ends[row["trip_id"]] = (first, last)
+
+    for line, row in enumerate(feed.rows("trips.txt"), start=2):
+        try:
+            first, last = ends[row["trip_id"]]
+            first, last = first[1], last[1]
+            name = (row.get("trip_short_name") or "").strip()
+            train = trains.get(name, TrainRecord(name, None, None, None))
+            dates = service_dates.get(row["service_id"]) or [
+                datetime.strptime(row["service_id"].strip(), "%Y%m%d").date()
+            ]
+            distance = _optional(last.get("shape_dist_traveled"), float)
+            for service_date in dates:
+                yield TimetableRow(
+                    line=line,
+                    source=stops[first["stop_id"]],
+                    destination=stops[last["stop_id"]],
+                    distance=round(distance) if distance else None,
+                    train=train,
+                    departure_time=_gtfs_time(
+                        service_date, first["departure_time"]
+                    ),
+                    arrival_time=_gtfs_time(
+                        service_date, last["arrival_time"]
+                    ),
+                    crews=None,
+                )
+        except KeyError as error:
+            raise TimetableError(line, f"unknown reference {error}")
+        except ValueError as error:
+            raise TimetableError(line, error)
+
+
+def read_timetable(path, fmt=None):
+    if fmt is None:
+        fmt = "csv" if path.lower().endswith(".csv") else "gtfs"
+    if fmt == "gtfs":
+        return read_gtfs(path)
+
+    def rows():
+        with open(path, encoding="utf-8-sig", newline="") as csv_file:
+            yield from read_csv(csv_file)
+
+    return rows()
+
+
+class TimetableImporter:
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.stats = dict.fromkeys(
+            (
+                "rows",
+                "stations_created",
+                "stations_updated",
+                "trains_created",
+                "trains_updated",
+                "routes_created",
+                "routes_updated",
+                "crews_created",
+                "trips_created",
+                "trips_updated",
+                "trip_crews_created",
+                "trip_crews_deleted",
+            ),
+            0
+        )
+        # natural keys are not unique in the schema, the newest row wins
+        self.stations = {
+            station.name: station for station in Station.objects.order_by("id")
+        }
+        self.train_types = dict(
+            TrainType.objects.order_by("id").values_list("name", "id")
+        )
+        self.trains = {
+            train.name: train for train in Train.objects.order_by("id")
+        }
+        self.routes = {
+            (route.source_id, route.destination_id): route
+            for route in Route.objects.all()
+        }
+        self.crews = {
+            (first_name, last_name): crew_id
+            for crew_id, first_name, last_name in Crew.objects.order_by(
+                "id"
+            ).values_list("id", "first_name", "last_name")
+        }
+
+    def run(self, rows):
+        """Import the rows in one transaction, returns the stats"""
+        with transaction.atomic():
+            rows = iter(rows)
+            while True:
+                batch = list(islice(rows, self.batch_size))
+                if not batch:
+                    break
+                self.import_batch(batch)
+                self.stats["rows"] += len(batch)
+
+            TableVersion.bump_on_commit(
+                Station, TrainType, Train, Route, Trip
+            )
+            transaction.on_commit(journey_index.invalidate)
+        return self.stats
+
+    def import_batch(self, batch):
+        self._upsert_stations(batch)
+        self._upsert_trains(batch)
+        self._upsert_routes(batch)
+        self._create_crews(batch)
+        trips = self._upsert_trips(batch)
+        self._replace_trip_crews(batch, trips)
+
+    def _upsert_stations(self, batch):
+        new, changed = {}, {}
+        for row in batch:
+            for stop in (row.source, row.destination):
+                station = self.stations.get(stop.name) or new.get(stop.name)
+                if station is None:
+                    if stop.latitude is None or stop.longitude is None:
+                        raise TimetableError(
+                            row.line,
+                            f"unknown station {stop.name!r} without "
+                            "coordinates"
+                        )
+                    new[stop.name] = Station(
+                        name=stop.name,
+                        latitude=stop.latitude,
+                        longitude=stop.longitude,
+                    )
+                elif stop.latitude is not None and stop.longitude is not None:
+                    if (station.latitude, station.longitude) != (
+                            stop.latitude, stop.longitude
+                    ):
+                        station.latitude = stop.latitude
+                        station.longitude = stop.longitude
+                        if station.pk:
+                            changed[stop.name] = station
+
+        for station in list(new.values()) + list(changed.values()):
+            station.geohash = geo.encode(station.latitude, station.longitude)
+        self._create(Station, new, ("name",))
+        Station.objects.bulk_update(
+            changed.values(), ["latitude", "longitude", "geohash"]
+        )
+        self.stations.update(new)
+        self.stats["stations_created"] += len(new)
+        self.stats["stations_updated"] += len(changed)
+
+    def _upsert_trains(self, batch):
+        new_types = {
+            row.train.train_type: TrainType(name=row.train.train_type)
+            for row in batch
+            if row.train.train_type
+            and row.train.train_type not in self.train_types
+        }
+        self._create(TrainType, new_types, ("name",))
+        self.train_types.update(
+            (name, train_type.pk) for name, train_type in new_types.items()
+        )
+
+        new, changed = {}, {}
+        for row in batch:
+            record = row.train
+            if not record.name:
+                raise TimetableError(row.line, "trip without train")
+            train = self.trains.get(record.name) or new.get(record.name)
+            values = {
+                field: value
+                for field, value in (
+                    ("cargo_num", record.cargo_num),
+                    ("places_in_cargo", record.places_in_cargo),
+                    ("train_type_id", self.train_types.get(record.train_type)),
+                )
+                if value is not None
+            }
+            if train is None:
+                if len(values) < 3:
+                    raise TimetableError(
+                        row.line,
+                        f"unknown train {record.name!r} needs train_type, "
+                        "cargo_num and places_in_cargo"
+                    )
+                new[record.name] = Train(name=record.name, **values)
+            elif any(
+                    getattr(train, field) != value
+                    for field, value in values.items()
+            ):
+                for field, value in values.items():
+                    setattr(train, field, value)
+                if train.pk:
+                    changed[record.name] = train
+
+        self._create(Train, new, ("name",))
+        Train.objects.bulk_update(
+            changed.values(),
+            ["cargo_num", "places_in_cargo", "train_type_id"]
+        )
+        self.trains.update(new)
+        self.stats["trains_created"] += len(new)
+        self.stats["trains_updated"] += len(changed)
+
+    def _route_key(self, row):
+        return (
+            self.stations[row.source.name].pk,
+            self.stations[row.destination.name].pk,
+        )
+
+    def _upsert_routes(self, batch):
+        new, changed = {}, {}
+        for row in batch:
+            key = self._route_key(row)
+            distance = row.distance
+            if distance is None:
+                source = self.stations[row.source.name]
+                destination = self.stations[row.destination.name]
+                distance = round(geo.haversine_km(
+                    source.latitude, source.longitude,
+                    destination.latitude, destination.longitude,
+                ))
+            route = self.routes.get(key) or new.get(key)
+            if route is None:
+                new[key] = Route(
+                    source_id=key[0],
+                    destination_id=key[1],
+                    distance=distance
+                )
+            elif row.distance is not None and route.distance != distance:
+                route.distance = distance
+                if route.pk:
+                    changed[key] = route
+
+        self._create(Route, new, ("source_id", "destination_id"))
+        Route.objects.bulk_update(changed.values(), ["distance"])
+        self.routes.update(new)
+        self.stats["routes_created"] += len(new)
+        self.stats["routes_updated"] += len(changed)
+
+    def _create_crews(self, batch):
+        new = {
+            crew: Crew(first_name=crew[0], last_name=crew[1])
+            for row in batch
+            for crew in row.crews or ()
+            if crew not in self.crews
+        }
+        self._create(Crew, new, ("first_name", "last_name"))
+        self.crews.update((key, crew.pk) for key, crew in new.items())
+        self.stats["crews_created"] += len(new)
+
+    def _upsert_trips(self, batch):
+        """Trips of the batch by natural key, created or updated"""
+        existing = {
+            (trip.train_id, trip.departure_time): trip
+            for trip in Trip.objects.filter(
+                train_id__in={self.trains[row.train.name].pk for row in batch},
+                departure_time__in={row.departure_time for row in batch},
+            ).only("id", "route_id", "train_id", "departure_time",
+                   "arrival_time")
+        }
+
+        trips, new, changed = {}, {}, {}
+        for row in batch:
+            key = (self.trains[row.train.name].pk, row.departure_time)
+            route_id = self.routes[self._route_key(row)].pk
+            trip = existing.get(key) or new.get(key)
+            if trip is None:
+                trip = new[key] = Trip(
+                    train_id=key[0],
+                    departure_time=row.departure_time,
+                    route_id=route_id,
+                    arrival_time=row.arrival_time,
+                )
+            elif (trip.route_id, trip.arrival_time) != (
+                    route_id, row.arrival_time
+            ):
+                trip.route_id = route_id
+                trip.arrival_time = row.arrival_time
+                if trip.pk:
+                    changed[key] = trip
+            trips[key] = trip
+
+        self._create(Trip, new, ("train_id", "departure_time"))
+        Trip.objects.bulk_update(
+            changed.values(), ["route_id", "arrival_time"]
+        )
+        self.stats["trips_created"] += len(new)
+        self.stats["trips_updated"] += len(changed)
+        return trips
+
+    def _replace_trip_crews(self, batch, trips):
+        """Make the crews of every trip exactly the crews of its row"""
+        wanted = set()
+        trip_ids = set()
+        for row in batch:
+            if row.crews is None:
+                continue
+            trip_id = trips[
+                (self.trains[row.train.name].pk, row.departure_time)
+            ].pk
+            trip_ids.add(trip_id)
+            wanted.update((trip_id, self.crews[crew]) for crew in row.crews)
+        if not trip_ids:
+            return
+
+        trip_crew = Trip.crews.through
+        current = {
+            (trip_id, crew_id): pk
+            for pk, trip_id, crew_id in trip_crew.objects.filter(
+                trip_id__in=trip_ids
+            ).values_list("id", "trip_id", "crew_id")
+        }
+        stale = current.keys() - wanted
+        trip_crew.objects.filter(
+            id__in=[current[pair] for pair in stale]
+        ).delete()
+        trip_crew.objects.bulk_create(
+            [
+                trip_crew(trip_id=trip_id, crew_id=crew_id)
+                for trip_id, crew_id in wanted - current.keys()
+            ],
+            batch_size=self.batch_size,
+        )
+        self.stats["trip_crews_created"] += len(wanted - current.keys())
+        self.stats["trip_crews_deleted"] += len(stale)
+
+    def _create(self, model, objects, key_fields):
+        """bulk_create, then fill the primary keys the backend did not
+        return (databases without INSERT ... RETURNING)
+        """
+        objects = list(objects.values())
+        model.objects.bulk_create(objects, batch_size=self.batch_size)
+        missing = [obj for obj in objects if obj.pk is None]
+        if not missing:
+            return
+
+        def key(values):
+            return tuple(values[field] for field in key_fields)
+
+        lookup = {field: set() for field in key_fields}
+        for obj in missing:
+            for field in key_fields:
+                lookup[field].add(getattr(obj, field))
+        ids = {
+            key(values): values["id"]
+            for values in model.objects.filter(
+                **{f"{field}__in": values for field, values in lookup.items()}
+            ).order_by("id").values("id", *key_fields)
+        }
+        for obj in missing:
+            obj.pk = ids[tuple(getattr(obj, field) for field in key_fields)]
@@ -1,5 +1,11 @@
+from django.urls import path
 from rest_framework import routers
 
+from train.async_views import (
+    AsyncStationListView,
+    AsyncTripListView,
+    AsyncTripSeatsView
+)
 from train.views import (
     CrewViewSet,
     TrainTypeViewSet,
@@ -8,7 +14,11 @@ from train.views import (
     TrainViewSet,
     TripViewSet,
     TicketViewSet,
-    OrderViewSet
+    OrderViewSet,
+    SeatHoldViewSet,
+    JourneyViewSet,
+    ExportView,
+    gtfs_feed
 )
 
 router = routers.DefaultRouter()
@@ -20,8 +30,28 @@ router.register("trains", TrainViewSet)
 router.register("trips", TripViewSet)
 router.register("tickets", TicketViewSet)
 router.register("orders", OrderViewSet)
+router.register("holds", SeatHoldViewSet)
+router.register("journeys", JourneyViewSet, basename="journey")
 
 
-urlpatterns = router.urls
+urlpatterns = router.urls + [
+    path("exports/<str:kind>/", ExportView.as_view(), name="export"),
+    path("gtfs.zip", gtfs_feed, name="gtfs-feed"),
+    path(
+        "async/trips/",
+        AsyncTripListView.as_view(),
+        name="async-trip-list"
+    ),
+    path(
+        "async/trips/<int:pk>/seats/",
+        AsyncTripSeatsView.as_view(),
+        name="async-trip-seats"
+    ),
+    path(
+        "async/stations/",
+        AsyncStationListView.as_view(),
+        name="async-station-list"
+    ),
+]
 
 app_name = "train"
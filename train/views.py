@@ -1,12 +1,45 @@
-from datetime import datetime
-
-from django.db.models import F, Count
+import hashlib
+import os
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch, Q
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    JsonResponse,
+    StreamingHttpResponse
+)
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import condition, require_safe
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
-from rest_framework import viewsets, mixins
+from rest_framework import viewsets, mixins, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.pagination import PageNumberPagination
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet
-from train.permissions import IsAdminOrIfAuthenticatedReadOnly
+from train import exports, geo, gtfs, health, metrics, reservations
+from train.journeys import journey_index
+from train.cache import CachedReadMixin, model_versions
+from train.pagination import KeysetPaginationMixin, TripSearchPagination
+from train.permissions import (
+    IsAdminOrIfAuthenticatedReadOnly,
+    monitoring_only
+)
+from train.readers import RowListMixin, TicketRows, TripRows
+from train.renderers import SeatMapBinaryRenderer
+from train.seats import SeatMap
+from train.station_names import station_names
 
 from train.models import (
     Ticket,
@@ -16,7 +49,8 @@ from train.models import (
     Route,
     Station,
     Order,
-    Crew
+    Crew,
+    SeatHold
 )
 
 from train.serializers import (
@@ -34,7 +68,16 @@ from train.serializers import (
     TrainTypeListOrRetrieveSerializer,
     RouteListOrRetrieveSerializers,
     TrainListOrRetrieveSerializers,
-    TripListOrRetrieveSerializer
+    TripListOrRetrieveSerializer,
+    TripSearchSerializer,
+    TripSeatMapSerializer,
+    SeatHoldSerializer,
+    HoldSeatsSerializer,
+    JourneySearchSerializer,
+    JourneySerializer,
+    NearbyStationsSearchSerializer,
+    NearbyStationSerializer,
+    ExportSerializer
 )
 
 
@@ -43,7 +86,7 @@ class Pagination(PageNumberPagination):
     max_page_size = 100
 
 
-class CrewViewSet(viewsets.ModelViewSet):
+class CrewViewSet(KeysetPaginationMixin, viewsets.ModelViewSet):
     queryset = Crew.objects.prefetch_related("trips")
     serializer_class = CrewSerializer
     pagination_class = Pagination
@@ -57,10 +100,13 @@ class CrewViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         first_name = self.request.query_params.get("first_name")
-        queryset = self.queryset
+        queryset = super().get_queryset()
 
         if first_name:
             queryset = queryset.filter(first_name__icontains=first_name)
+        if self.action in ("list", "retrieve"):
+            # the crews of the trips, TripSerializer lists their ids
+            queryset = queryset.prefetch_related("trips__crews")
 
         return queryset
 
@@ -77,17 +123,24 @@ class CrewViewSet(viewsets.ModelViewSet):
         return super().list(request, *args, **kwargs)
 
 
-class TrainTypeViewSet(viewsets.ModelViewSet):
+class TrainTypeViewSet(
+    CachedReadMixin,
+    KeysetPaginationMixin,
+    viewsets.ModelViewSet
+):
     queryset = TrainType.objects.all()
     serializer_class = TrainTypeSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly, )
+    cache_models = (TrainType, Train)
 
     def get_queryset(self):
         name = self.request.query_params.get("name")
-        queryset = self.queryset
+        queryset = super().get_queryset()
 
         if name:
             queryset = queryset.filter(name__icontains=name)
+        if self.action in ("list", "retrieve"):
+            queryset = queryset.prefetch_related("trains")
 
         return queryset
 
@@ -110,10 +163,16 @@ class TrainTypeViewSet(viewsets.ModelViewSet):
         return super().list(request, *args, **kwargs)
 
 
-class RouteViewSet(viewsets.ModelViewSet):
+class RouteViewSet(
+    CachedReadMixin,
+    KeysetPaginationMixin,
+    viewsets.ModelViewSet
+):
     queryset = Route.objects.select_related("source", "destination")
     serializer_class = RouteSerializer
+    keyset_ordering = ("distance", "id")
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly, )
+    cache_models = (Route, Station)
 
     def get_serializer_class(self):
         if self.action == "list" or self.action == "retrieve":
@@ -124,13 +183,21 @@ class RouteViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         source = self.request.query_params.get("source")
         destination = self.request.query_params.get("destination")
-        queryset = self.queryset
+        queryset = super().get_queryset()
+
+        if not (source or destination):
+            return queryset
 
+        # names are resolved to station ids first, the routes are then
+        # looked up on the (source, destination) unique index
+        source_ids, destination_ids = station_names.resolve_all(
+            [source or "", destination or ""]
+        )
         if source:
-            queryset = queryset.filter(source__name__icontains=source)
+            queryset = queryset.filter(source_id__in=source_ids)
 
         if destination:
-            queryset = queryset.filter(destination__name__icontains=source)
+            queryset = queryset.filter(destination_id__in=destination_ids)
         return queryset
 
     @extend_schema(
@@ -138,12 +205,15 @@ class RouteViewSet(viewsets.ModelViewSet):
             OpenApiParameter(
                 "source",
                 type=str,
-                description="Filter by source. Example: ?source=Lviv"
+                description="Filter by the start of the source name, in "
+                            "Latin or Cyrillic, the closest names if none "
+                            "starts with it. Example: ?source=Lviv"
             ),
             OpenApiParameter(
                 "destination",
                 type=str,
-                description="Filter by destination. Example: ?destination=Kiev"
+                description="Filter by the start of the destination name, "
+                            "like source. Example: ?destination=Kyiv"
             ),
         ]
     )
@@ -151,14 +221,63 @@ class RouteViewSet(viewsets.ModelViewSet):
         return super().list(request, *args, **kwargs)
 
 
-class StationViewSet(viewsets.ModelViewSet):
+class StationViewSet(
+    CachedReadMixin,
+    KeysetPaginationMixin,
+    viewsets.ModelViewSet
+):
     queryset = Station.objects.all()
     serializer_class = StationSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly, )
+    cache_models = (Station,)
+
+    def get_serializer_class(self):
+        if self.action == "nearby":
+            return NearbyStationSerializer
+
+        return self.serializer_class
+
+    @extend_schema(
+        parameters=[NearbyStationsSearchSerializer],
+        responses=NearbyStationSerializer(many=True)
+    )
+    @action(methods=["GET"], detail=False, url_path="nearby")
+    def nearby(self, request):
+        """Stations within radius_km of (lat, lon), the nearest first.
+
+        Candidates come from an indexed geohash prefix lookup of the cells
+        around the point, only they are measured (haversine).
+        """
+        search = NearbyStationsSearchSerializer(data=request.query_params)
+        search.is_valid(raise_exception=True)
+        lat, lon, radius_km, limit = (
+            search.validated_data[param]
+            for param in ("lat", "lon", "radius_km", "limit")
+        )
+
+        queryset = Station.objects.all()
+        cells = geo.covering_cells(lat, lon, radius_km)
+        if cells:
+            in_cells = Q()
+            for cell in cells:
+                in_cells |= Q(geohash__startswith=cell)
+            queryset = queryset.filter(in_cells)
+
+        stations = []
+        for station in queryset:
+            station.distance_km = geo.haversine_km(
+                lat, lon, station.latitude, station.longitude
+            )
+            if station.distance_km <= radius_km:
+                stations.append(station)
+        stations.sort(key=lambda station: station.distance_km)
+
+        serializer = self.get_serializer(stations[:limit], many=True)
+        return Response(serializer.data)
 
     def get_queryset(self):
         name = self.request.query_params.get("name")
-        queryset = self.queryset
+        queryset = super().get_queryset()
 
         if name:
             queryset = queryset.filter(name__icontains=name)
@@ -178,14 +297,19 @@ class StationViewSet(viewsets.ModelViewSet):
         return super().list(request, *args, **kwargs)
 
 
-class TrainViewSet(viewsets.ModelViewSet):
+class TrainViewSet(
+    CachedReadMixin,
+    KeysetPaginationMixin,
+    viewsets.ModelViewSet
+):
     queryset = Train.objects.select_related("train_type")
     serializer_class = TrainSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly, )
+    cache_models = (Train, TrainType)
 
     def get_queryset(self):
         train_type = self.request.query_params.get("train_type")
-        queryset = self.queryset
+        queryset = super().get_queryset()
 
         if train_type:
             queryset = queryset.filter(train_type__name__icontains=train_type)
@@ -211,44 +335,174 @@ class TrainViewSet(viewsets.ModelViewSet):
         return super().list(request, *args, **kwargs)
 
 
-class TripViewSet(viewsets.ModelViewSet):
+class TripViewSet(
+    RowListMixin,
+    KeysetPaginationMixin,
+    viewsets.ModelViewSet
+):
     queryset = Trip.objects.select_related(
         "route",
         "train"
     ).prefetch_related(
-        "crews"
-    ).annotate(
-        tickets_available=(
-            F("train__cargo_num") * F("train__places_in_cargo")
-            - Count("tickets")
-        )
-    )
+        "crews",
+        "cargo_occupancy"
+    ).with_tickets_available()
 
     serializer_class = TripSerializer
+    row_reader = TripRows()
+    # models the search results are read from, see search_cache_key
+    search_cache_models = (Trip, Route, Train)
+    keyset_ordering = ("departure_time", "id")
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly, )
 
-    def get_queryset(self):
-        departure_time = self.request.query_params.get("departure_time")
-        arrival_time = self.request.query_params.get("arrival_time")
+    @staticmethod
+    def _day_range(value):
+        """[start, end) of a YYYY-MM-DD day in the current time zone.
+
+        Unlike __date, a range on the raw column can use its index.
+        """
+        day = datetime.strptime(value, "%Y-%m-%d")
+        return (
+            timezone.make_aware(day),
+            timezone.make_aware(day + timedelta(days=1))
+        )
 
-        queryset = self.queryset
+    @classmethod
+    def filter_by_days(cls, queryset, query_params):
+        departure_time = query_params.get("departure_time")
+        arrival_time = query_params.get("arrival_time")
 
         if departure_time:
-            date = datetime.strptime(departure_time, "%Y-%m-%d").date()
-            queryset = queryset.filter(departure_time__date=date)
+            start, end = cls._day_range(departure_time)
+            queryset = queryset.filter(
+                departure_time__gte=start,
+                departure_time__lt=end
+            )
 
         if arrival_time:
-            date = datetime.strptime(arrival_time, "%Y-%m-%d").date()
-            queryset = queryset.filter(arrival_time__date=date)
+            start, end = cls._day_range(arrival_time)
+            queryset = queryset.filter(
+                arrival_time__gte=start,
+                arrival_time__lt=end
+            )
 
         return queryset
 
+    def get_queryset(self):
+        return self.filter_by_days(
+            super().get_queryset(), self.request.query_params
+        )
+
     def get_serializer_class(self):
-        if self.action == "list" or self.action == "retrieve":
+        if self.action in ("list", "retrieve", "search"):
             return TripListOrRetrieveSerializer
 
+        if self.action == "seats":
+            return TripSeatMapSerializer
+
         return self.serializer_class
 
+    @extend_schema(
+        responses={
+            200: TripSeatMapSerializer,
+            (200, SeatMapBinaryRenderer.media_type): OpenApiTypes.BINARY,
+        }
+    )
+    @action(
+        methods=["GET"],
+        detail=True,
+        url_path="seats",
+        renderer_classes=(
+            api_settings.DEFAULT_RENDERER_CLASSES + [SeatMapBinaryRenderer]
+        ),
+    )
+    def seats(self, request, pk=None):
+        """Taken seats of the trip as a packed bitmap.
+
+        Use ?format=bin (or Accept: application/octet-stream)
+        to get the raw bitmap instead of base64 in JSON.
+        """
+        trip = get_object_or_404(Trip.objects.select_related("train"), pk=pk)
+        return self.seat_map_response(request, SeatMap.for_trip(trip))
+
+    @staticmethod
+    def seat_map_response(request, seat_map):
+        if request.accepted_renderer.format == SeatMapBinaryRenderer.format:
+            return Response(
+                seat_map.to_bytes(),
+                headers={
+                    "X-Cargo-Num": seat_map.cargo_num,
+                    "X-Places-In-Cargo": seat_map.places_in_cargo,
+                    "X-Taken": seat_map.taken,
+                }
+            )
+
+        return Response(TripSeatMapSerializer(seat_map).data)
+
+    def search_cache_key(self, request, search):
+        """Equivalent searches share a key: it is built from the
+        validated search (datetimes in UTC), the other parameters
+        (pagination) and the versions of search_cache_models"""
+        criteria = sorted(
+            (
+                name,
+                value.astimezone(dt_timezone.utc)
+                if isinstance(value, datetime) else value
+            )
+            for name, value in search.validated_data.items()
+        )
+        others = sorted(
+            (name, values)
+            for name, values in request.query_params.lists()
+            if name not in search.fields
+        )
+        digest = hashlib.md5(
+            "|".join(
+                (
+                    ".".join(model_versions(self.search_cache_models)),
+                    # pagination links are absolute
+                    request.build_absolute_uri(request.path),
+                    repr(criteria),
+                    repr(others),
+                )
+            ).encode()
+        ).hexdigest()
+        return f"trips:search:{digest}"
+
+    @extend_schema(
+        parameters=[TripSearchSerializer],
+        responses=TripListOrRetrieveSerializer(many=True)
+    )
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path="search",
+        pagination_class=TripSearchPagination
+    )
+    def search(self, request):
+        """Trips from source to destination leaving in a time window,
+        with at least min_seats free seats, the earliest first.
+
+        Pages of TripSearchPagination.default_limit trips by default, on
+        the route and departure time index: the free seats are counted
+        for the page only.
+        Results are cached for TRIP_SEARCH_CACHE_TIMEOUT seconds, their
+        seat counts may lag behind the bookings by that much.
+        """
+        search = TripSearchSerializer(data=request.query_params)
+        search.is_valid(raise_exception=True)
+
+        key = self.search_cache_key(request, search)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = self.row_response(
+            Trip.objects.search(**search.validated_data)
+        )
+        cache.set(key, response.data, settings.TRIP_SEARCH_CACHE_TIMEOUT)
+        return response
+
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -269,9 +523,25 @@ class TripViewSet(viewsets.ModelViewSet):
         return super().list(request, *args, **kwargs)
 
 
-class TicketViewSet(viewsets.ModelViewSet):
-    queryset = Ticket.objects.select_related("trip", "order")
+class TicketViewSet(
+    RowListMixin,
+    KeysetPaginationMixin,
+    viewsets.ModelViewSet
+):
+    # the trip graph TicketListSerializer reads, as in OrderViewSet
+    queryset = Ticket.objects.prefetch_related(
+        Prefetch(
+            "trip",
+            queryset=Trip.objects.select_related(
+                "train"
+            ).prefetch_related(
+                "crews", "cargo_occupancy"
+            ).with_tickets_available()
+        )
+    )
     serializer_class = TicketSerializer
+    row_reader = TicketRows()
+    keyset_ordering = ("trip_id", "cargo", "seat", "id")
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly, )
 
     def get_serializer_class(self):
@@ -289,7 +559,7 @@ class TicketViewSet(viewsets.ModelViewSet):
         """Retrieve the movies with filters"""
         trips = self.request.query_params.get("trips")
 
-        queryset = self.queryset
+        queryset = super().get_queryset()
 
         if trips:
             trips_ids = self._params_to_ints(trips)
@@ -311,19 +581,36 @@ class TicketViewSet(viewsets.ModelViewSet):
 
 
 class OrderViewSet(
+    KeysetPaginationMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     GenericViewSet,
 ):
+    # everything OrderListSerializer reads, in one query per level:
+    # orders -> tickets -> trips (with train and tickets_available)
+    # -> crews and cargo occupancy, however many orders are on the page
     queryset = Order.objects.prefetch_related(
-        "tickets__trip__train", "tickets__trip__route"
+        Prefetch(
+            "tickets",
+            queryset=Ticket.objects.prefetch_related(
+                Prefetch(
+                    "trip",
+                    queryset=Trip.objects.select_related(
+                        "train"
+                    ).prefetch_related(
+                        "crews", "cargo_occupancy"
+                    ).with_tickets_available()
+                )
+            )
+        )
     )
     serializer_class = OrderSerializer
+    keyset_ordering = ("-created_at", "-id")
     pagination_class = Pagination
     permission_classes = (IsAuthenticated,)
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        return super().get_queryset().filter(user=self.request.user)
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -333,3 +620,237 @@ class OrderViewSet(
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+
+
+class SeatHoldViewSet(
+    KeysetPaginationMixin,
+    mixins.ListModelMixin,
+    mixins.CreateModelMixin,
+    mixins.DestroyModelMixin,
+    GenericViewSet,
+):
+    queryset = SeatHold.objects.all()
+    serializer_class = SeatHoldSerializer
+    keyset_ordering = ("expires_at", "id")
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        return self.queryset.filter(
+            user=self.request.user,
+            expires_at__gt=timezone.now()
+        )
+
+    def get_serializer_class(self):
+        if self.action == "create":
+            return HoldSeatsSerializer
+
+        return self.serializer_class
+
+    @extend_schema(responses={201: SeatHoldSerializer(many=True)})
+    def create(self, request, *args, **kwargs):
+        """Hold seats of a trip for SEAT_HOLD_TTL.
+
+        Holding a seat you already hold extends the hold.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        holds = serializer.save(user=request.user)
+        return Response(
+            SeatHoldSerializer(holds, many=True).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    @extend_schema(
+        request=None,
+        parameters=[
+            OpenApiParameter(
+                "trip",
+                type=int,
+                description="Confirm only the holds of this trip. "
+                            "Example: ?trip=1"
+            )
+        ],
+        responses={201: OrderSerializer}
+    )
+    @action(methods=["POST"], detail=False, url_path="confirm")
+    def confirm(self, request):
+        """Book all your live holds as one order"""
+        trip = request.query_params.get("trip")
+        trip = get_object_or_404(Trip, pk=trip) if trip else None
+        try:
+            order = reservations.confirm_holds(request.user, trip)
+        except ValidationError as exc:
+            raise ValidationError({"tickets": exc.detail})
+
+        if order is None:
+            raise ValidationError({"detail": "You have no seats on hold."})
+
+        return Response(
+            OrderSerializer(order).data,
+            status=status.HTTP_201_CREATED
+        )
+
+
+class JourneyViewSet(viewsets.ViewSet):
+    permission_classes = (IsAuthenticated,)
+
+    @staticmethod
+    def _itinerary(itinerary, trips):
+        if itinerary is None or not all(
+                trip_id in trips for trip_id in itinerary.trip_ids
+        ):
+            # no journey, or a trip of it was deleted meanwhile
+            return None
+
+        legs = [trips[trip_id] for trip_id in itinerary.trip_ids]
+        return {
+            "departure_time": legs[0].departure_time,
+            "arrival_time": legs[-1].arrival_time,
+            "transfers": len(legs) - 1,
+            "legs": legs,
+        }
+
+    @extend_schema(
+        parameters=[JourneySearchSerializer],
+        responses=JourneySerializer
+    )
+    def list(self, request):
+        """Plan a journey between two stations, changing trains if needed.
+
+        Returns the itinerary arriving the earliest and the one with the
+        fewest changes (they may be the same), or nulls if there is none
+        within JOURNEY_MAX_DURATION of the departure.
+        """
+        search = JourneySearchSerializer(data=request.query_params)
+        search.is_valid(raise_exception=True)
+        params = search.validated_data
+
+        departure = params.get("departure", timezone.now())
+        min_connection = (
+            timedelta(minutes=params["min_connection"])
+            if "min_connection" in params
+            else settings.JOURNEY_MIN_CONNECTION
+        )
+        earliest_arrival, fewest_transfers = journey_index.search(
+            params["source"].id,
+            params["destination"].id,
+            departure.timestamp(),
+            min_connection=min_connection.total_seconds(),
+            max_legs=params["max_transfers"] + 1,
+            max_duration=settings.JOURNEY_MAX_DURATION.total_seconds(),
+        )
+
+        trip_ids = set()
+        for itinerary in (earliest_arrival, fewest_transfers):
+            if itinerary is not None:
+                trip_ids.update(itinerary.trip_ids)
+        trips = Trip.objects.select_related(
+            "route__source", "route__destination", "train"
+        ).in_bulk(trip_ids)
+
+        serializer = JourneySerializer(
+            {
+                "earliest_arrival": self._itinerary(earliest_arrival, trips),
+                "fewest_transfers": self._itinerary(fewest_transfers, trips),
+            }
+        )
+        return Response(serializer.data)
+
+
+class ExportView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    @extend_schema(
+        parameters=[ExportSerializer],
+        responses={(200, "text/csv"): OpenApiTypes.STR}
+    )
+    def get(self, request, kind):
+        """Stream every ticket or order, filtered by order date.
+
+        kind is tickets or orders, ?output=ndjson for one JSON per line.
+        """
+        if kind not in exports.EXPORTS:
+            raise NotFound(f"No {kind} export")
+
+        params = ExportSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        output = params.validated_data.pop("output")
+
+        response = StreamingHttpResponse(
+            exports.export_lines(kind, output, **params.validated_data),
+            content_type=exports.CONTENT_TYPES[output]
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{kind}.{output}"'
+        )
+        return response
+
+
+def _gtfs_feed_stat(request):
+    try:
+        return os.stat(gtfs.feed_path())
+    except FileNotFoundError:
+        return None
+
+
+def _gtfs_feed_etag(request):
+    stat = _gtfs_feed_stat(request)
+    return stat and f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def _gtfs_feed_last_modified(request):
+    stat = _gtfs_feed_stat(request)
+    return stat and datetime.fromtimestamp(stat.st_mtime, dt_timezone.utc)
+
+
+@require_safe
+@condition(
+    etag_func=_gtfs_feed_etag,
+    last_modified_func=_gtfs_feed_last_modified
+)
+def gtfs_feed(request):
+    """The GTFS zip built by `manage.py build_gtfs`, public and cacheable"""
+    try:
+        feed = open(gtfs.feed_path(), "rb")
+    except FileNotFoundError:
+        raise Http404("The GTFS feed has not been built yet")
+
+    response = FileResponse(
+        feed,
+        as_attachment=True,
+        filename=gtfs.FEED_NAME,
+        content_type="application/zip"
+    )
+    patch_cache_control(
+        response, public=True, max_age=settings.GTFS_FEED_MAX_AGE
+    )
+    return response
+
+
+@never_cache
+@require_safe
+def health_live(request):
+    """The worker serves requests"""
+    return JsonResponse({"status": "ok"})
+
+
+@never_cache
+@require_safe
+@monitoring_only
+def health_ready(request):
+    """The worker reaches the database and the cache, 503 otherwise"""
+    checks, healthy = health.run_checks()
+    return JsonResponse(
+        {"status": "ok" if healthy else "unavailable", "checks": checks},
+        status=200 if healthy else 503
+    )
+
+
+@never_cache
+@require_safe
+@monitoring_only
+def metrics_view(request):
+    """Request and connection pool totals of the worker, for Prometheus"""
+    return HttpResponse(
+        metrics.render(), content_type="text/plain; version=0.0.4"
+    )
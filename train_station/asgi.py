@@ -3,6 +3,11 @@ ASGI config for train_station project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with uvicorn for the async endpoints of train.async_views::
+
+    uvicorn train_station.asgi:application
+    gunicorn train_station.asgi:application -k uvicorn.workers.UvicornWorker
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.0/howto/deployment/asgi/
 """
@@ -11,6 +16,8 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "train_station.settings")
+os.environ.setdefault(
+    "DJANGO_SETTINGS_MODULE", "train_station.settings.production"
+)
 
 application = get_asgi_application()
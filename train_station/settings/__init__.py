@@ -0,0 +1,6 @@
+"""Settings of train_station, one module per environment.
+
+base holds everything they share, development adds DEBUG and the
+debug toolbar, production persistent database connections and
+logging to the console. Pick one with DJANGO_SETTINGS_MODULE.
+"""
@@ -1,7 +1,10 @@
 """
-Django settings for train_station project.
+Django settings for train_station project, shared by all environments.
 
-Generated by 'django-admin startproject' using Django 4.0.4.
+Generated by 'django-admin startproject' using Django 4.0.4. Run with
+train_station.settings.development (the default of manage.py) or
+train_station.settings.production (the default of the WSGI/ASGI
+servers), which extend this module.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.0/topics/settings/
@@ -15,16 +18,15 @@ from datetime import timedelta
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
-BASE_DIR = Path(__file__).resolve().parent.parent
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
 
-# Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.0/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.environ["SECRET_KEY"]
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = False
 
 ALLOWED_HOSTS = []
 
@@ -40,14 +42,14 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
     "rest_framework",
     "drf_spectacular",
-    "debug_toolbar",
     "train",
     "user"
 ]
 
 MIDDLEWARE = [
+    "train.metrics.RequestMetricsMiddleware",
+    "train.profiling.QueryProfilerMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -97,6 +99,30 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+# Local memory by default, e.g. CACHE_BACKEND=
+# django.core.cache.backends.filebased.FileBasedCache with a directory or
+# django.core.cache.backends.redis.RedisCache with a redis:// URL
+# as CACHE_LOCATION to share it between workers
+# (the cached reference payloads are keyed by the TableVersion rows in the
+# database, they are expired for every worker either way)
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND",
+            "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", ""),
+    }
+}
+
+# Seconds a serialized list/retrieve payload of stations, train types,
+# trains and routes stays cached (writes expire it earlier)
+REFERENCE_CACHE_TIMEOUT = 60 * 60
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 
@@ -173,3 +199,51 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
     "ROTATE_REFRESH_TOKENS": False,
 }
+
+# How long a seat stays reserved before it has to be confirmed into an order
+SEAT_HOLD_TTL = timedelta(minutes=10)
+
+# Seconds after which the in-memory journey planner index is fully reloaded
+# to pick up timetable changes made by other processes
+JOURNEY_INDEX_MAX_AGE = 300
+# Shortest change between two trains a planned journey may contain
+JOURNEY_MIN_CONNECTION = timedelta(minutes=10)
+# Longest planned journey: connections arriving later than this after the
+# requested departure are not scanned
+JOURNEY_MAX_DURATION = timedelta(days=2)
+
+# Station name search of /routes/ (see train.station_names): when no name
+# starts with the query, up to this many names at least this similar
+# (difflib ratio) are matched instead
+STATION_NAME_FUZZY_MATCHES = 5
+STATION_NAME_FUZZY_CUTOFF = 0.75
+
+# Longest departure window of /trips/search/, and seconds its results stay
+# cached (seat counts may lag behind bookings by that much)
+TRIP_SEARCH_MAX_WINDOW = timedelta(days=31)
+TRIP_SEARCH_CACHE_TIMEOUT = 30
+
+# The GTFS feed built by `manage.py build_gtfs` and served at
+# /api/train/gtfs.zip (public, cached by clients for GTFS_FEED_MAX_AGE s)
+GTFS_ROOT = os.path.join(MEDIA_ROOT, "gtfs")
+GTFS_FEED_MAX_AGE = 60 * 60
+GTFS_AGENCY = {
+    "agency_id": "train-station",
+    "agency_name": "Train Station",
+    "agency_url": os.environ.get("GTFS_AGENCY_URL", "http://127.0.0.1:8000/"),
+}
+
+# Clients allowed to read /metrics/ and /health/ready/, addresses or
+# networks ("10.0.0.0/8"): the load balancer and the Prometheus scraper
+MONITORING_ALLOWED_IPS = os.environ.get(
+    "MONITORING_ALLOWED_IPS", "127.0.0.1,::1"
+).split(",")
+
+# Share of the requests whose queries train.profiling watches for N+1s
+# (one SQL shape run more than QUERY_PROFILER_REPEAT_THRESHOLD times) and
+# for queries slower than QUERY_PROFILER_SLOW_MS, logged to "train.queries"
+QUERY_PROFILER_SAMPLE_RATE = float(
+    os.environ.get("QUERY_PROFILER_SAMPLE_RATE", 0)
+)
+QUERY_PROFILER_REPEAT_THRESHOLD = 5
+QUERY_PROFILER_SLOW_MS = 200
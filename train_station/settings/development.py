@@ -0,0 +1,11 @@
+"""Settings for a developer machine: `python manage.py runserver`."""
+from train_station.settings.base import *  # noqa: F401,F403
+from train_station.settings.base import INSTALLED_APPS, MIDDLEWARE
+
+DEBUG = True
+
+INSTALLED_APPS = INSTALLED_APPS + ["debug_toolbar"]
+
+MIDDLEWARE = MIDDLEWARE[:1] + [
+    "debug_toolbar.middleware.DebugToolbarMiddleware",
+] + MIDDLEWARE[1:]
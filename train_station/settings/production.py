@@ -0,0 +1,74 @@
+"""Settings for the gunicorn/uvicorn workers (see gunicorn.conf.py).
+
+No debug toolbar and no DEBUG: nothing records the SQL of every
+request in memory.
+"""
+import os
+
+from train_station.settings.base import *  # noqa: F401,F403
+from train_station.settings.base import DATABASES
+
+DEBUG = False
+
+ALLOWED_HOSTS = os.environ.get(
+    "DJANGO_ALLOWED_HOSTS", "localhost,127.0.0.1"
+).split(",")
+
+# Seconds a worker thread keeps its database connection open between
+# requests, instead of connecting for every request. Every thread then
+# holds a connection: keep workers x threads below max_connections of
+# the server. gunicorn.conf.py defaults it to 0 for uvicorn workers,
+# whose requests do not end on the thread that opened the connection.
+DATABASES = {
+    "default": {
+        **DATABASES["default"],
+        "CONN_MAX_AGE": int(os.environ.get("CONN_MAX_AGE", 60)),
+    }
+}
+
+# DB_POOL_MAX_SIZE > 0 switches to pooled connections (train.db.pool):
+# every worker process keeps DB_POOL_MIN_SIZE to DB_POOL_MAX_SIZE
+# connections open and lends them to its requests, a request waits at
+# most DB_POOL_TIMEOUT seconds for one. Connections are given back at
+# the end of the request, which CONN_MAX_AGE = 0 asks for.
+if int(os.environ.get("DB_POOL_MAX_SIZE", 0)):
+    DATABASES["default"].update({
+        "ENGINE": "train.db.backends.postgresql",
+        "CONN_MAX_AGE": 0,
+        "POOL": {
+            "MIN_SIZE": int(os.environ.get("DB_POOL_MIN_SIZE", 1)),
+            "MAX_SIZE": int(os.environ["DB_POOL_MAX_SIZE"]),
+            "TIMEOUT": float(os.environ.get("DB_POOL_TIMEOUT", 5)),
+            "CHECK_AFTER": float(os.environ.get("DB_POOL_CHECK_AFTER", 30)),
+            "MAX_IDLE": float(os.environ.get("DB_POOL_MAX_IDLE", 600)),
+        },
+    })
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "root": {
+        "handlers": ["console"],
+        "level": os.environ.get("DJANGO_LOG_LEVEL", "WARNING"),
+    },
+}
+
+# The N+1 and slow query findings of train.profiling go to a rotating
+# file when QUERY_PROFILER_LOG names one, to the console otherwise
+if os.environ.get("QUERY_PROFILER_LOG"):
+    LOGGING["handlers"]["queries"] = {
+        "class": "logging.handlers.RotatingFileHandler",
+        "filename": os.environ["QUERY_PROFILER_LOG"],
+        "maxBytes": 10 << 20,
+        "backupCount": 5,
+    }
+    LOGGING["loggers"] = {
+        "train.queries": {
+            "handlers": ["queries"],
+            "level": "WARNING",
+            "propagate": False,
+        },
+    }
@@ -13,6 +13,7 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import (
@@ -21,6 +22,8 @@ from drf_spectacular.views import (
     SpectacularRedocView
 )
 
+from train.views import health_live, health_ready, metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/doc/", SpectacularAPIView.as_view(), name="schema"),
@@ -36,5 +39,10 @@ urlpatterns = [
     ),
     path("api/train/", include("train.urls", namespace="train")),
     path("api/user/", include("user.urls", namespace="user")),
-    path("__debug__/", include("debug_toolbar.urls")),
+    path("health/live/", health_live, name="health-live"),
+    path("health/ready/", health_ready, name="health-ready"),
+    path("metrics/", metrics_view, name="metrics"),
 ]
+
+if "debug_toolbar" in settings.INSTALLED_APPS:
+    urlpatterns.append(path("__debug__/", include("debug_toolbar.urls")))
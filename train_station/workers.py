@@ -0,0 +1,87 @@
+"""Number of gunicorn workers for the machine, or container, we run on.
+
+CPUs and memory are read from the cgroup limits (v2, then v1) when
+there are any, a container sees the CPUs and RAM of its host otherwise.
+"""
+import math
+import os
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+
+def _read(path):
+    try:
+        with open(path) as file:
+            return file.read().strip()
+    except OSError:
+        return None
+
+
+def _cgroup_cpu_quota(root):
+    """CPUs allowed by the CFS quota, None without a quota"""
+    cpu_max = _read(os.path.join(root, "cpu.max"))
+    if cpu_max:
+        quota, period = cpu_max.split()
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+
+    quota = _read(os.path.join(root, "cpu", "cpu.cfs_quota_us"))
+    period = _read(os.path.join(root, "cpu", "cpu.cfs_period_us"))
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def _cgroup_memory_limit(root):
+    """Memory limit in bytes, None without a limit"""
+    for path in (
+            os.path.join(root, "memory.max"),
+            os.path.join(root, "memory", "memory.limit_in_bytes"),
+    ):
+        limit = _read(path)
+        if limit and limit != "max":
+            # v1 reports "no limit" as a huge number
+            if int(limit) < 1 << 60:
+                return int(limit)
+            return None
+    return None
+
+
+def cpu_count(cgroup_root=CGROUP_ROOT):
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    quota = _cgroup_cpu_quota(cgroup_root)
+    if quota:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
+
+
+def memory_bytes(cgroup_root=CGROUP_ROOT):
+    try:
+        memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        memory = None
+
+    limit = _cgroup_memory_limit(cgroup_root)
+    if limit and (memory is None or limit < memory):
+        memory = limit
+    return memory
+
+
+def worker_count(cpus, memory, worker_memory, asynchronous=False,
+                 max_workers=None):
+    """2 x CPUs + 1 workers (one per CPU for event loop workers, which
+    never wait on a thread), but no more than fit in memory.
+
+    worker_memory is the resident size of one worker, in bytes.
+    """
+    workers = cpus if asynchronous else 2 * cpus + 1
+    if memory:
+        workers = min(workers, memory // worker_memory)
+    if max_workers:
+        workers = min(workers, max_workers)
+    return max(1, workers)
@@ -11,6 +11,8 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "train_station.settings")
+os.environ.setdefault(
+    "DJANGO_SETTINGS_MODULE", "train_station.settings.production"
+)
 
 application = get_wsgi_application()